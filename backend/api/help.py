@@ -1,18 +1,106 @@
 from backend.app.analyze_repo import CodebaseAnalyzer
+from backend.app.spec_files import publish_spec
+from backend.app.spec_store import VersionConflict, get_default_spec_store
+from backend.helpers.rate_limiter import get_enrichment_rate_limiter
 import requests
+import asyncio
 import json
 
-def process_updates(url):
-    analyzer = CodebaseAnalyzer(repo_path=url)
-    api_spec = analyzer.analyze()
-    file_name = url.split("/")[-1].replace('.git', '').replace('/', '_') + '.json'
-    version = 0
+def spec_file_name(url):
+    return url.split("/")[-1].replace('.git', '').replace('/', '_') + '.json'
+
+def spec_name(url):
+    # The repository's key in the spec store
+    return spec_file_name(url)[: -len('.json')]
+
+def load_previous_spec(url):
+    store = get_default_spec_store()
+    if store is not None:
+        api_spec = store.get(spec_name(url))
+        if api_spec is not None:
+            return api_spec
     try:
-        with open("static/" + file_name, "r") as f:
-            version = json.load(f)["info"]["version"]
+        with open("static/" + spec_file_name(url), "r") as f:
+            return json.load(f)
     except FileNotFoundError:
-        version = 0
-    api_spec["info"]["version"] = f"1.0.{version + 1}"
+        return None
+
+def spec_version(api_spec):
+    if api_spec is None:
+        return 0
+    return int(api_spec["info"]["version"].split(".")[-1])
+
+def current_version(url):
+    store = get_default_spec_store()
+    head = store.head(spec_name(url)) if store is not None else None
+    if head is not None:
+        return head
+    return spec_version(load_previous_spec(url))
+
+def stamp_version(api_spec, version):
+    api_spec["info"]["version"] = f"1.0.{version}"
+
+def save_spec(url, api_spec, amend=None):
+    # Saves api_spec as a new version and returns its number. The store
+    # keeps every version as a delta of the one before and allocates the
+    # number when writing, so concurrent analyses of a repository cannot
+    # collide; static/ holds the latest, with its compressed variants, for
+    # serving. amend rewrites that version in place instead, or writes a
+    # new version when another one was saved since.
+    store = get_default_spec_store()
+    if store is None:
+        version = amend or current_version(url) + 1
+        stamp_version(api_spec, version)
+    elif amend is not None:
+        try:
+            version = store.amend(spec_name(url), api_spec, amend, stamp_version)
+        except VersionConflict:
+            version = store.put(spec_name(url), api_spec, stamp=stamp_version)
+    else:
+        version = store.put(spec_name(url), api_spec, stamp=stamp_version)
+    publish_spec("static", spec_file_name(url), api_spec)
+    return version
+
+def run_documentation_job(job, url, on_event=None):
+    # Runs on a JobManager worker thread; progress is shared with the job so
+    # status polls see live counts, and cancelling the job stops the analyzer
+    analyzer = CodebaseAnalyzer(
+        repo_path=url, cancel_event=job.cancel_event, on_event=on_event
+    )
+    job.progress = analyzer.progress
+    saved = {}
+
+    def on_spec(api_spec):
+        # The skeleton becomes a new version; enrichment patches amend it
+        saved["version"] = save_spec(url, api_spec, amend=saved.get("version"))
+
+    api_spec = asyncio.run(
+        analyzer.analyze_in_phases(
+            on_spec=on_spec, rate_limiter=get_enrichment_rate_limiter()
+        )
+    )
+    job.metrics = analyzer.run_metrics
+    return api_spec
+
+def process_updates(url, job=None):
+    # job, when given, gets live progress and can cancel the analysis
+    analyzer = CodebaseAnalyzer(
+        repo_path=url, cancel_event=job.cancel_event if job is not None else None
+    )
+    if job is not None:
+        job.progress = analyzer.progress
+    previous_spec = load_previous_spec(url)
+
+    if previous_spec is None:
+        api_spec = analyzer.analyze()
+    else:
+        # Only files changed since the last analyzed commit are re-processed
+        api_spec = analyzer.analyze_changes(previous_spec)
+    save_spec(url, api_spec)
+    if job is not None:
+        job.metrics = analyzer.run_metrics
+    return api_spec
 
-    with open("static/" + file_name, "w") as f:
-        json.dump(api_spec, f, indent=4)
\ No newline at end of file
+def run_update_job(job, url):
+    # Webhook rebuilds run as jobs so a newer push can supersede a stale one
+    return process_updates(url, job)
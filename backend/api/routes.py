@@ -1,38 +1,215 @@
 from fastapi import APIRouter, Body
-from backend.app.analyze_repo import CodebaseAnalyzer
+from backend.app.jobs import QueueFullError, SUCCEEDED, get_job_manager
+from backend.app.rebuilds import IGNORED, affects_api, get_rebuild_scheduler
+from backend.app.spec_store import get_default_spec_store
+from backend.search.function_search import get_default_search
 from pydantic import BaseModel
+import asyncio
 import json
-from fastapi import FastAPI, Request, BackgroundTasks, HTTPException
-from fastapi.responses import JSONResponse
-from backend.api.help import process_updates
+from fastapi import FastAPI, Request, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from backend.api.help import run_documentation_job, spec_file_name
 router = APIRouter()
 
 class DocumentationRequest(BaseModel):
     url: str
 
+
+def submit_documentation_job(url, on_event=None):
+    try:
+        return get_job_manager().submit(
+            "generate_documentation",
+            run_documentation_job,
+            url,
+            on_event=on_event,
+            params={"url": url},
+        )
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=f"Analysis queue is full: {e}")
+
+
+def get_job_or_404(job_id):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
 @router.post("/generate_documentation")
 async def generate_documentation(
     request: DocumentationRequest = Body(...)
 ):
+    # The analysis runs on the job pool so the event loop stays free
     url = request.url.replace(".git", "")
-    analyzer = CodebaseAnalyzer(repo_path=url)
-    api_spec = analyzer.analyze()
-    file_name = request.url.split("/")[-1].replace('.git', '').replace('/', '_') + '.json'
-    with open("static/" + file_name, "w") as f:
-        json.dump(api_spec, f, indent=4)
+    job = submit_documentation_job(url)
+    api_spec = await asyncio.wrap_future(job.future)
     return {"api_spec": api_spec}
 
 
+def encode_event(event, sse):
+    data = json.dumps(event)
+    if sse:
+        return f"event: {event['event']}\ndata: {data}\n\n"
+    return data + "\n"
+
+
+@router.post("/generate_documentation/stream")
+async def stream_documentation(
+    http_request: Request, request: DocumentationRequest = Body(...)
+):
+    # Emits NDJSON (or Server-Sent Events when the client accepts
+    # text/event-stream): progress counts, a "skeleton" event once the static
+    # spec is saved, every endpoint as soon as it is enriched, then a final
+    # "done" event pointing at the saved spec
+    url = request.url.replace(".git", "")
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+
+    def on_event(event):
+        if event["event"] == "skeleton":
+            event = dict(event, spec_url="/static/" + spec_file_name(url))
+        loop.call_soon_threadsafe(queue.put_nowait, event)
+
+    job = submit_documentation_job(url, on_event=on_event)
+    sse = "text/event-stream" in http_request.headers.get("accept", "")
+
+    async def events():
+        finished = asyncio.wrap_future(job.future)
+        try:
+            yield encode_event({"event": "job", "job_id": job.id}, sse)
+            while True:
+                getter = asyncio.ensure_future(queue.get())
+                await asyncio.wait(
+                    {getter, finished}, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not getter.done():
+                    getter.cancel()
+                    break
+                yield encode_event(getter.result(), sse)
+            while not queue.empty():
+                yield encode_event(queue.get_nowait(), sse)
+
+            if finished.cancelled() or finished.exception() is not None:
+                yield encode_event({"event": "error", **job.to_dict()}, sse)
+            else:
+                yield encode_event(
+                    {
+                        "event": "done",
+                        "job_id": job.id,
+                        "spec_url": "/static/" + spec_file_name(url),
+                    },
+                    sse,
+                )
+        finally:
+            # Stop the analysis if the client went away mid-stream
+            if not job.finished:
+                get_job_manager().cancel(job.id)
+
+    media_type = "text/event-stream" if sse else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type)
+
+
+@router.post("/jobs", status_code=202)
+async def submit_job(request: DocumentationRequest = Body(...)):
+    job = submit_documentation_job(request.url.replace(".git", ""))
+    return job.to_dict()
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    return get_job_or_404(job_id).to_dict()
+
+
+@router.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    get_job_or_404(job_id)
+    return get_job_manager().cancel(job_id).to_dict()
+
+
+@router.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    job = get_job_or_404(job_id)
+    if job.status != SUCCEEDED:
+        raise HTTPException(status_code=409, detail=job.to_dict())
+    return {"api_spec": job.result}
+
+
+@router.get("/search")
+async def search_functions(
+    q: str = Query(..., min_length=1),
+    repo: str = None,
+    k: int = Query(10, ge=1, le=100),
+):
+    # Handlers of analyzed repositories closest in meaning to q; repo is the
+    # URL the repository was analyzed under
+    search = get_default_search()
+    if search is None:
+        raise HTTPException(status_code=503, detail="Search is not configured")
+    if repo is not None:
+        repo = repo.replace(".git", "")
+    results = await asyncio.to_thread(search.search, q, k, repo)
+    return {"query": q, "results": results}
+
+
+def get_spec_store_or_503():
+    store = get_default_spec_store()
+    if store is None:
+        raise HTTPException(status_code=503, detail="Spec history is not enabled")
+    return store
+
+
+@router.get("/specs/{name}")
+async def get_spec(name: str, version: int = None):
+    # The latest spec, or the given version of it
+    store = get_spec_store_or_503()
+    api_spec = await asyncio.to_thread(store.get, name, version)
+    if api_spec is None:
+        raise HTTPException(status_code=404, detail="Spec version not found")
+    return {"name": name, "api_spec": api_spec}
+
+
+@router.get("/specs/{name}/versions")
+async def get_spec_versions(name: str):
+    store = get_spec_store_or_503()
+    versions = await asyncio.to_thread(store.versions, name)
+    if not versions:
+        raise HTTPException(status_code=404, detail="Spec not found")
+    return {"name": name, "versions": versions}
+
+
+@router.get("/specs/{name}/diff")
+async def get_spec_diff(name: str, from_version: int, to_version: int = None):
+    # Operations, components and top-level keys that differ between the two
+    # versions (to_version defaults to the latest)
+    store = get_spec_store_or_503()
+    changes = await asyncio.to_thread(store.diff, name, from_version, to_version)
+    if changes is None:
+        raise HTTPException(status_code=404, detail="Spec version not found")
+    return {
+        "name": name,
+        "from_version": from_version,
+        "to_version": to_version or store.head(name),
+        "changes": changes,
+    }
+
+
 @router.post("/github-webhook")
-async def handle_webhook(request: Request, background_tasks: BackgroundTasks):
+async def handle_webhook(request: Request):
+    # Events are only recorded here; the scheduler debounces them per
+    # repository and runs at most one rebuild of each at a time
     payload = await request.json()
-    body = await request.body()
     event = request.headers.get("X-GitHub-Event", "missing_event")
-    if event == "pull_request":
+    rebuild = IGNORED
+    if affects_api(event, payload):
         repo_name = payload["repository"]["full_name"]
-        background_tasks.add_task(process_updates, f'https://github.com/{repo_name}')
+        rebuild = get_rebuild_scheduler().request(f'https://github.com/{repo_name}')
+
+    return JSONResponse(content={"message": "Webhook received", "rebuild": rebuild})
+
 
-    return JSONResponse(content={"message": "Webhook received"})
+@router.get("/rebuilds")
+async def get_rebuilds():
+    return get_rebuild_scheduler().status()
 
 
 # @router.post("/generate_test_cases")
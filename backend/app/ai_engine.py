@@ -1,26 +1,89 @@
 from kaizen.llms.provider import LLMProvider
 import json
 
+# Bump whenever a prompt template below changes so cached responses are not reused
+PROMPT_VERSION = "2"
+
+CACHED_USAGE = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+
+
+def estimate_tokens(text: str) -> int:
+    # Rough count (~4 characters per token), good enough for budgeting prompts
+    return len(text) // 4 + 1
+
+
+def format_route(route) -> str:
+    # The route as plain text rather than indented JSON: source code is sent
+    # as is instead of as an escaped string, and the definitions it uses
+    # (see ContextSlicer) follow the handler
+    text = f"{route['method'].upper()} {route['path']}\n\nHandler:\n{route['content']}"
+    if route.get("context"):
+        text += f"\n\nDefinitions used by the handler:\n{route['context']}"
+    return text
+
 
 class AIEngine:
-    def __init__(self):
+    def __init__(self, rate_limiter=None, cache=None, metrics=None):
         self.llm_provider = LLMProvider()
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.metrics = metrics
+        if self.cache is not None:
+            self.cache.invalidate(keep_prompt_version=PROMPT_VERSION)
+
+    @property
+    def model_name(self):
+        for model in getattr(self.llm_provider, "models", []):
+            if model.get("model_name") == "default":
+                return model["litellm_params"]["model"]
+        return "default"
+
+    def _chat_completion_with_json(self, prompt):
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        return self.llm_provider.chat_completion_with_json(prompt=prompt)
+
+    def _cache_get(self, kind, payload):
+        if self.cache is None:
+            return None
+        key = self.cache.make_key(kind, payload, PROMPT_VERSION, self.model_name)
+        response = self.cache.get(key)
+        if self.metrics is not None:
+            self.metrics.record_cache_lookup(kind, response is not None)
+        return response
+
+    def _cache_set(self, kind, payload, response):
+        if self.cache is None or response is None:
+            return
+        key = self.cache.make_key(kind, payload, PROMPT_VERSION, self.model_name)
+        self.cache.set(key, response, PROMPT_VERSION, self.model_name)
+
+    def _cached_completion(self, kind, payload, prompt):
+        response = self._cache_get(kind, payload)
+        if response is not None:
+            return response, dict(CACHED_USAGE, cached=True)
+
+        response, usage = self._chat_completion_with_json(prompt)
+        self._cache_set(kind, payload, response)
+        return response, usage
 
     def generate_api_spec(self, api_spec):
-        prompt = f"""Generate a detailed OpenAPI 3.1 specification document based on the following API structure:
+        prompt = f"""Generate a detailed OpenAPI 3.1 specification document based on the following API route:
 
-{json.dumps(api_spec, indent=2)}
+{format_route(api_spec)}
 
 Please enhance the specification with the following:
 1. Detailed descriptions for each endpoint
-2. Appropriate request and response schemas
+2. Appropriate request and response schemas, following the definitions used by the handler
 3. Example requests and responses
 4. Any additional metadata that would be useful for developers
 5. only create the path and method provided in api_spec above
 
 Return the result as a valid JSON string representing the complete OpenAPI 3.1 specification. Just return the JSON inside the method of the path."""
 
-        response, usage = self.llm_provider.chat_completion_with_json(prompt=prompt)
+        response, usage = self._cached_completion(
+            "generate_api_spec", api_spec, prompt
+        )
         return response, usage
 
     def generate_insights(self, api_spec):
@@ -48,5 +111,76 @@ Keep all the feedback related to API spec and dont provide unnecessary feedback.
 
 Ensure that all insights are specific to the given path and method, and provide actionable recommendations where applicable."""
 
-        response, usage = self.llm_provider.chat_completion_with_json(prompt=prompt)
+        response, usage = self._cached_completion(
+            "generate_insights", api_spec, prompt
+        )
         return response, usage
+
+    def generate_batch(self, routes, include_insights=True):
+        # routes are {"id", "method", "path", "content"} dicts, plus the
+        # handler's "context" when it has one. Returns a dict
+        # mapping route ids to {"operation", "insights"} for every route that
+        # came back well-formed; callers fall back to per-route calls for the
+        # rest. Results are cached per route, not per batch.
+        results = {}
+        pending = []
+        for route in routes:
+            payload = self._batch_cache_payload(route, include_insights)
+            cached = self._cache_get("generate_batch_route", payload)
+            if cached is not None:
+                results[route["id"]] = cached
+            else:
+                pending.append(route)
+        if not pending:
+            return results, dict(CACHED_USAGE, cached=True)
+
+        insights_instructions = ""
+        entry_format = '{"operation": {...}}'
+        if include_insights:
+            insights_instructions = """
+5. Insights on performance, security, optimization and general API design that are specific to the route, with actionable recommendations"""
+            entry_format = '{"operation": {...}, "insights": {"performance_insights": [...], "security_insights": [...], "optimization_insights": [...], "additional_metadata": {...}}}'
+
+        prompt = f"""Generate detailed OpenAPI 3.1 operation objects for each of the following API routes:
+
+{json.dumps(pending, separators=(",", ":"))}
+
+For every route provide:
+1. A detailed description
+2. Appropriate parameters, request body and response schemas
+3. Example requests and responses
+4. Only the given path and method{insights_instructions}
+
+Return a single JSON object keyed by route "id", where each value has the form {entry_format}. Include every id exactly once."""
+
+        try:
+            response, usage = self._chat_completion_with_json(prompt)
+        except ValueError:
+            # The reply was not valid JSON (json.JSONDecodeError): every
+            # pending route falls back to its own call
+            return results, dict(CACHED_USAGE)
+        if not isinstance(response, dict):
+            return results, usage
+
+        for route in pending:
+            entry = response.get(route["id"])
+            if not self._valid_batch_entry(entry, include_insights):
+                continue
+            results[route["id"]] = entry
+            self._cache_set(
+                "generate_batch_route",
+                self._batch_cache_payload(route, include_insights),
+                entry,
+            )
+        return results, usage
+
+    @staticmethod
+    def _batch_cache_payload(route, include_insights):
+        payload = {key: value for key, value in route.items() if key != "id"}
+        return [payload, include_insights]
+
+    @staticmethod
+    def _valid_batch_entry(entry, include_insights):
+        if not isinstance(entry, dict) or not isinstance(entry.get("operation"), dict):
+            return False
+        return not include_insights or isinstance(entry.get("insights"), dict)
@@ -1,19 +1,67 @@
 import os
 import ast
-import inspect
+import asyncio
+import copy
 from typing import List, Dict, Any
-import importlib
-import sys
-import tempfile
 import re
+import threading
+import time
 from github import Github
 from github import GithubException
 import json
-from .ai_engine import AIEngine
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from .ai_engine import AIEngine, estimate_tokens, format_route
+from .llm_cache import get_default_cache
+from .metrics import RunMetrics
+from .repo_cache import get_default_repo_cache
+from .scan_index import get_default_scan_index
+from backend.search.function_search import get_default_search
+from backend.storage.ingest import persist_analysis
+from backend.storage.store import get_default_store
+from backend.helpers.file_walker import IgnoreFilter
+from backend.helpers.git_utils import changed_files, head_commit
+from backend.helpers.rate_limiter import RateLimiter
+from backend.helpers.route_visitor import scan_file, scan_files
+from backend.helpers.schema_extractor import SchemaExtractor, referenced_schemas
+from backend.helpers.symbol_index import ContextSlicer, SymbolIndex
+from backend import config
+
+logger = logging.getLogger(__name__)
+
+# Only these files are checked out from the mirror cache for analysis, with
+# the .gitignore files (nested ones included) that decide what is skipped
+SOURCE_PATTERNS = ["*.py", ".gitignore", "**/.gitignore"]
+# Flask path converters with a non-string schema
+PATH_CONVERTER_TYPES = {"int": "integer", "float": "number"}
+
+
+class AnalysisCancelled(Exception):
+    pass
 
 
 class CodebaseAnalyzer:
-    def __init__(self, repo_path: str, github_token: str = None):
+    def __init__(
+        self,
+        repo_path: str,
+        github_token: str = None,
+        max_concurrency: int = 8,
+        requests_per_minute: float = None,
+        cache=None,
+        scan_workers: int = config.SCAN_WORKERS,
+        repo_cache=None,
+        scan_index=None,
+        store=None,
+        search=None,
+        cancel_event: threading.Event = None,
+        on_event=None,
+        batch_token_budget: int = None,
+        batch_insights: bool = True,
+        batch_max_routes: int = 8,
+        context_token_budget: int = config.CONTEXT_TOKEN_BUDGET,
+        static_schemas: bool = config.STATIC_SCHEMAS,
+    ):
         self.repo_path = repo_path
         self.root_dir = repo_path
         self.github_token = github_token
@@ -25,128 +73,424 @@ class CodebaseAnalyzer:
             "servers": [{"url": "https://api.example.com"}],
         }
         self.is_github_url = repo_path.startswith("https://github.com/")
-        self.ai_engine = AIEngine()
+        self.max_concurrency = max_concurrency
+        self.scan_workers = scan_workers
+        self.repo_cache = repo_cache
+        self.scan_index = (
+            scan_index if scan_index is not None else get_default_scan_index()
+        )
+        # Files, syntax trees and handlers are written here after each run
+        self.store = store if store is not None else get_default_store()
+        # Handlers are embedded here for /api/search after each run
+        self.search = search if search is not None else get_default_search()
+        self._clone_url = None
+        self.cancel_event = cancel_event
+        self.progress = {"files_scanned": 0, "routes_found": 0, "routes_enriched": 0}
+        self._progress_lock = threading.Lock()
+        # Called with event dicts ("progress", "endpoint") as the analysis
+        # advances, possibly from worker threads
+        self.on_event = on_event
+        # Stage timings, LLM latency/tokens/cost and cache hit rates of this
+        # run, kept out of the spec so an unchanged rebuild publishes the
+        # same bytes; run_metrics holds them once the analysis is done
+        self.metrics = RunMetrics()
+        self.run_metrics = None
+        rate_limiter = RateLimiter(requests_per_minute) if requests_per_minute else None
+        self.ai_engine = AIEngine(
+            rate_limiter=rate_limiter,
+            cache=cache if cache is not None else get_default_cache(),
+            metrics=self.metrics,
+        )
+        # With a budget, routes are packed into shared prompts of up to that
+        # many (estimated) tokens and batch_max_routes routes, which keeps the
+        # answer within the model's output limit; batch_insights asks for the
+        # insights in the same call instead of a second round trip per route
+        self.batch_token_budget = batch_token_budget
+        self.batch_insights = batch_insights
+        self.batch_max_routes = batch_max_routes
+        # When set, routes are queued here during the scan instead of being
+        # sent to the LLM one by one (see analyze_async)
+        self._pending_routes = None
+        # Each handler is sent with the models, dependencies and constants it
+        # uses, resolved across the repository, up to this many tokens
+        self.context_token_budget = context_token_budget
+        self._symbols = None
+        self._slicer = None
+        # FastAPI handlers' models and annotations are read statically into
+        # shared components.schemas; fully typed handlers skip the LLM's
+        # schema call
+        self.static_schemas = static_schemas
+        self._schemas = None
 
     def analyze(self) -> Dict[str, Any]:
+        with self._workspace() as directory:
+            self._process_directory(directory)
+            self._persist(directory)
+        self._finish_metrics()
+        return self.api_spec
+
+    def analyze_changes(self, previous_spec: Dict[str, Any]) -> Dict[str, Any]:
+        # Re-analyze only the files touched since the commit recorded in
+        # previous_spec and patch their endpoints into a copy of it
+        base = previous_spec.get("info", {}).get("x-commit")
+        with self._workspace() as directory:
+            head = head_commit(directory)
+            changed = None
+            if base and head:
+                with self.metrics.stage("diff"):
+                    changed = self._changed_files(directory, base, head)
+            if changed is None:
+                self._process_directory(directory)
+                self._persist(directory)
+                self._finish_metrics()
+                return self.api_spec
+
+            self.root_dir = directory
+            self.api_spec = copy.deepcopy(previous_spec)
+            # Specs saved before run metrics moved out of the spec
+            self.api_spec.pop("x-analysis-metrics", None)
+            self._index_symbols(directory)
+            # Files whose routes were still pending or failed enrichment when
+            # the previous spec was saved are analyzed again, changed or not,
+            # and so are those whose operations use a model of a changed module
+            reprocess = (
+                set(changed) | self._incomplete_files() | self._dependent_files(changed)
+            )
+            self._remove_operations(reprocess)
+            ignore_filter = IgnoreFilter(directory)
+            for relative_path in sorted(reprocess):
+                file_path = os.path.join(directory, relative_path)
+                if (
+                    file_path.endswith(".py")
+                    and os.path.isfile(file_path)
+                    and not ignore_filter.ignored(relative_path)
+                ):
+                    self._process_file(file_path)
+            self._merge_components(prune=True)
+            self._prune_empty_paths()
+            self.api_spec["info"]["x-commit"] = head
+            self._persist(directory, changed)
+        self._finish_metrics()
+        return self.api_spec
+
+    @contextmanager
+    def _workspace(self):
         if self.is_github_url:
-            with tempfile.TemporaryDirectory() as tmp_dir:
-                self._clone_repo(tmp_dir)
-                self._process_directory(tmp_dir)
+            repo_cache = self.repo_cache or get_default_repo_cache()
+            with ExitStack() as stack:
+                with self.metrics.stage("checkout"):
+                    directory = stack.enter_context(
+                        repo_cache.checkout(
+                            self._get_clone_url(), sparse_patterns=SOURCE_PATTERNS
+                        )
+                    )
+                yield directory
         else:
-            self._process_directory(self.repo_path)
+            yield self.repo_path
+
+    def _changed_files(self, directory: str, base: str, head: str):
+        if self.is_github_url:
+            repo_cache = self.repo_cache or get_default_repo_cache()
+            return repo_cache.changed_files(self._get_clone_url(), base, head)
+        return changed_files(directory, base, head)
+
+    async def analyze_async(self) -> Dict[str, Any]:
+        self._pending_routes = []
+        try:
+            with ExitStack() as stack:
+                directory = await asyncio.to_thread(
+                    stack.enter_context, self._workspace()
+                )
+                await asyncio.to_thread(self._process_directory, directory)
+                start = time.perf_counter()
+                await self._enrich_routes_async(self._pending_routes)
+                self.metrics.add_stage_time("enrich", time.perf_counter() - start)
+                await asyncio.to_thread(self._persist, directory)
+        finally:
+            self._pending_routes = None
+        self._finish_metrics()
         return self.api_spec
 
-    def _clone_repo(self, tmp_dir: str):
-        if not self.is_github_url:
-            return
+    async def analyze_in_phases(self, on_spec=None, rate_limiter=None):
+        # The static phase merges a skeleton operation per route (paths,
+        # methods and parameters from the code, statically known schemas)
+        # and hands the spec to on_spec within seconds; the enrichment phase
+        # then replaces skeletons as LLM results arrive, handing the patched
+        # spec to on_spec at most every ENRICH_FLUSH_SECONDS and once more
+        # when done. rate_limiter, when given, paces the enrichment's calls.
+        self._pending_routes = []
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                directory = await asyncio.to_thread(
+                    stack.enter_context, self._workspace()
+                )
+                await asyncio.to_thread(self._process_directory, directory)
+                routes = self._pending_routes
+                for route_info in routes:
+                    self._merge_operation(*self._skeleton_operation(route_info))
+                if on_spec is not None:
+                    await asyncio.to_thread(on_spec, self.api_spec)
+                self.metrics.add_stage_time("static", time.perf_counter() - start)
+                self._emit("skeleton", routes=len(routes))
+
+                start = time.perf_counter()
+                await self._enrich_in_place(routes, on_spec, rate_limiter)
+                self.metrics.add_stage_time("enrich", time.perf_counter() - start)
+                await asyncio.to_thread(self._persist, directory)
+        finally:
+            self._pending_routes = None
+        self._finish_metrics()
+        if on_spec is not None:
+            await asyncio.to_thread(on_spec, self.api_spec)
+        return self.api_spec
+
+    def _persist(self, directory: str, file_paths=None):
+        if self.store is not None:
+            with self.metrics.stage("persist"):
+                throughput = persist_analysis(
+                    self.store, self.repo_url, directory, self.api_spec, file_paths
+                )
+            self.metrics.record_storage(throughput)
+        if self.search is not None:
+            with self.metrics.stage("embed"):
+                counts = self.search.index_spec(self.repo_url, self.api_spec)
+            logger.info(
+                f"Search index: embedded {counts['embedded']} handlers, "
+                f"reused {counts['reused']}, removed {counts['removed']}"
+            )
+
+    @property
+    def repo_url(self) -> str:
+        # How storage and search identify the repository
+        if self.is_github_url:
+            return self.repo_path
+        return os.path.abspath(self.repo_path)
+
+    def _get_clone_url(self) -> str:
+        if self._clone_url is not None:
+            return self._clone_url
 
         g = Github(self.github_token)
         try:
             repo_name = self.repo_path.split("/")[-2:]
             repo_name = "/".join(repo_name)
             repo = g.get_repo(repo_name)
-            os.system(f"git clone {repo.clone_url} {tmp_dir}")
         except GithubException as e:
             print(f"Error cloning repository: {e}")
             raise
+        self._clone_url = repo.clone_url
+        return self._clone_url
 
     def _process_directory(self, directory: str):
-        for root, _, files in os.walk(directory):
-            for file in files:
-                if file.endswith(".py"):
-                    file_path = os.path.join(root, file)
-                    self._process_file(file_path)
+        self.root_dir = directory
+        walk_stats = {}
+        with self.metrics.stage("walk"):
+            file_paths = IgnoreFilter(directory).walk([".py"], walk_stats)
+        self.metrics.record_walk(walk_stats)
+        self._index_symbols(directory, file_paths)
 
-    def _process_file(self, file_path: str):
-        with open(file_path, "r") as file:
-            content = file.read()
-            tree = ast.parse(content)
+        indexed, to_scan, writer = {}, file_paths, None
+        if self.scan_index is not None:
+            with self.metrics.stage("index"):
+                indexed, to_scan = self.scan_index.partition(
+                    self._index_repo, directory, file_paths
+                )
+            writer = self.scan_index.writer(self._index_repo, directory)
 
-        framework = self._identify_framework(content)
-        routes = self._extract_routes(content, framework)
-        if framework != "Unknown" or routes:
-            self._add_to_api_spec(file_path, framework, routes)
+        # Results come back in file_paths order, so the merge into api_spec is
+        # deterministic regardless of the number of workers
+        scans = scan_files(to_scan, workers=self.scan_workers)
+        for file_path in file_paths:
+            scan = indexed.get(file_path)
+            if scan is None:
+                with self.metrics.stage("parse"):
+                    scan = next(scans)
+                if writer is not None:
+                    writer.add(file_path, scan)
+            self._check_cancelled()
+            self._apply_scan(file_path, scan)
+        self._merge_components()
 
-        for node in ast.walk(tree):
-            if isinstance(node, ast.ClassDef):
-                try:
-                    self._process_class(node, file_path)
-                except Exception as e:
-                    print(f"Error processing class: {e}")
-
-    def _identify_framework(self, file_content: str) -> str:
-        frameworks = {
-            "flask": r"from\s+flask\s+import",
-            "django": r"from\s+django\s+import",
-            "fastapi": r"from\s+fastapi\s+import",
-            "express": r"express\(\s*\)",
-            "react": r"import\s+React",
-            "angular": r"@angular/core",
-            "vue": r"new\s+Vue\(",
+        if writer is not None:
+            with self.metrics.stage("index"):
+                writer.commit()
+                self.scan_index.prune(self._index_repo, directory, file_paths)
+
+        commit = head_commit(directory)
+        if commit:
+            self.api_spec["info"]["x-commit"] = commit
+
+    def _index_symbols(self, directory: str, file_paths=None):
+        self._symbols = symbols = SymbolIndex(directory, file_paths)
+        if self.context_token_budget:
+            self._slicer = ContextSlicer(symbols, self.context_token_budget)
+        if self.static_schemas:
+            self._schemas = SchemaExtractor(symbols)
+
+    def _merge_components(self, prune: bool = False):
+        # prune keeps only the schemas the operations in paths still use
+        components = self.api_spec.setdefault("components", {})
+        schemas = components.setdefault("schemas", {})
+        if self._schemas is not None:
+            schemas.update(self._schemas.schemas)
+        if prune:
+            used = referenced_schemas(self.api_spec["paths"], schemas)
+            components["schemas"] = {
+                name: schema for name, schema in schemas.items() if name in used
+            }
+
+    def _dependent_files(self, changed):
+        # Source files of the operations that use, directly or through other
+        # components, a class defined in one of the changed modules
+        classes = set()
+        for relative_path in changed:
+            if not relative_path.endswith(".py"):
+                continue
+            module = self._symbols.module_name(
+                os.path.join(self.root_dir, relative_path)
+            )
+            symbols = self._symbols.symbols(module) or {"definitions": {}}
+            for name, definition in symbols["definitions"].items():
+                if definition["kind"] == "class":
+                    # Components are named after the class, or module.class
+                    # when the name is taken
+                    classes.update((name, f"{module}.{name}"))
+        if not classes:
+            return set()
+        schemas = self.api_spec.get("components", {}).get("schemas", {})
+        return {
+            operation.get("x-source-file")
+            for methods in self.api_spec["paths"].values()
+            for operation in methods.values()
+            if isinstance(operation, dict)
+            and operation.get("x-source-file")
+            and referenced_schemas(operation, schemas) & classes
         }
 
-        for framework, pattern in frameworks.items():
-            if re.search(pattern, file_content):
-                return framework
-        return "Unknown"
-
-    def _extract_routes(
-        self, file_content: str, framework: str
-    ) -> List[Dict[str, Any]]:
-        routes = []
-        tree = ast.parse(file_content)
-
-        if framework == "flask":
-            for node in ast.walk(tree):
-                if isinstance(node, ast.FunctionDef):
-                    for decorator in node.decorator_list:
-                        if isinstance(decorator, ast.Call) and isinstance(
-                            decorator.func, ast.Attribute
-                        ):
-                            if decorator.func.attr == "route":
-                                route = decorator.args[0].s
-                                methods = [
-                                    "GET",
-                                    "POST",
-                                    "PUT",
-                                    "DELETE",
-                                ]  # Default method
-                                if len(decorator.keywords) > 0:
-                                    for keyword in decorator.keywords:
-                                        if keyword.arg == "methods":
-                                            methods = [m.s for m in keyword.value.elts]
-                                    for method in methods:
-                                        routes.append(
-                                            {
-                                                "route": route,
-                                                "method": method,
-                                                "function_name": node.name,
-                                                "node": node,
-                                            }
-                                        )
-        elif framework == "fastapi":
-            for node in ast.walk(tree):
-                if isinstance(node, ast.FunctionDef) or isinstance(
-                    node, ast.AsyncFunctionDef
+    def _extract_static(self, file_path: str, route_info: Dict[str, Any]):
+        with self.metrics.stage("schemas"):
+            static = self._schemas.operation(file_path, route_info)
+        if static is None:
+            return
+        route_info["static_operation"] = static["operation"]
+        route_info["typed"] = static["typed"]
+        self.metrics.record_static_route(static["typed"])
+
+    def _slice_context(self, file_path: str, route_info: Dict[str, Any]):
+        # Adds the handler's context to route_info and records its prompt
+        # size next to what the handler alone, as indented JSON, used to cost
+        payload = {
+            "method": route_info["method"],
+            "content": route_info["content"],
+            "path": route_info["route"],
+        }
+        before = estimate_tokens(json.dumps(payload, indent=2))
+        symbols = []
+        if self._slicer is not None:
+            with self.metrics.stage("slice"):
+                sliced = self._slicer.slice(file_path, route_info["content"])
+            symbols = sliced["symbols"]
+            if sliced["context"]:
+                route_info["context"] = payload["context"] = sliced["context"]
+        self.metrics.record_prompt(
+            f"{route_info['method'].upper()} {route_info['route']}",
+            before,
+            estimate_tokens(format_route(payload)),
+            len(symbols),
+        )
+
+    def _relative_path(self, file_path: str) -> str:
+        return os.path.relpath(file_path, self.root_dir).replace(os.sep, "/")
+
+    def _remove_operations(self, source_files):
+        for methods in self.api_spec["paths"].values():
+            for method in list(methods):
+                operation = methods[method]
+                if (
+                    isinstance(operation, dict)
+                    and operation.get("x-source-file") in source_files
                 ):
-                    for decorator in node.decorator_list:
-                        if isinstance(decorator, ast.Call) and isinstance(
-                            decorator.func, ast.Attribute
-                        ):
-                            if decorator.func.attr in ["get", "post", "put", "delete"]:
-                                route = decorator.args[0].s
-                                method = decorator.func.attr
-                                routes.append(
-                                    {
-                                        "route": route,
-                                        "method": method,
-                                        "function_name": node.name,
-                                        "node": node,
-                                    }
-                                )
-        # Add similar logic for other frameworks
-
-        return routes
+                    del methods[method]
+
+    def _incomplete_files(self):
+        return {
+            operation.get("x-source-file")
+            for methods in self.api_spec["paths"].values()
+            for operation in methods.values()
+            if isinstance(operation, dict)
+            and operation.get("x-enrichment") in ("pending", "failed")
+            and operation.get("x-source-file")
+        }
+
+    def _prune_empty_paths(self):
+        for path in [
+            path for path, methods in self.api_spec["paths"].items() if not methods
+        ]:
+            del self.api_spec["paths"][path]
+
+    def _process_file(self, file_path: str):
+        scan = None
+        if self.scan_index is not None:
+            with self.metrics.stage("index"):
+                indexed, _ = self.scan_index.partition(
+                    self._index_repo, self.root_dir, [file_path]
+                )
+            scan = indexed.get(file_path)
+        if scan is None:
+            with self.metrics.stage("parse"):
+                scan = scan_file(file_path)
+            if self.scan_index is not None:
+                writer = self.scan_index.writer(self._index_repo, self.root_dir)
+                writer.add(file_path, scan)
+                writer.commit()
+        self._apply_scan(file_path, scan)
+
+    @property
+    def _index_repo(self) -> str:
+        # Checkouts of a GitHub repository land in varying directories, so
+        # index entries are keyed by the repository rather than the path
+        if self.is_github_url:
+            return self._get_clone_url()
+        return os.path.abspath(self.repo_path)
+
+    def _check_cancelled(self):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise AnalysisCancelled(self.repo_path)
+
+    def _count(self, key: str, amount: int = 1):
+        if not amount:
+            return
+        with self._progress_lock:
+            self.progress[key] += amount
+            progress = dict(self.progress)
+        self._emit("progress", **progress)
+
+    def _emit(self, event: str, **data):
+        if self.on_event is not None:
+            self.on_event({"event": event, **data})
+
+    def _emit_endpoint(self, path: str, method: str, operation: Dict[str, Any]):
+        if operation is not None:
+            self._emit("endpoint", path=path, method=method, operation=operation)
+
+    def _apply_scan(self, file_path: str, scan: Dict[str, Any]):
+        if scan.get("cached"):
+            self.metrics.record_index_hit()
+        else:
+            self.metrics.record_scan(scan["skipped"], scan["bytes"], scan["seconds"])
+        framework, routes = scan["framework"], scan["routes"]
+        self._count("files_scanned")
+        self._count("routes_found", len(routes) + len(scan["operations"]))
+        if framework != "Unknown" or routes:
+            self._add_to_api_spec(file_path, framework, routes)
+
+        if scan["operations"]:
+            source_file = self._relative_path(file_path)
+            for path, method, operation in scan["operations"]:
+                operation["x-source-file"] = source_file
+                self._emit_endpoint(path, method, operation)
+                self._merge_operation(path, method, operation)
 
     def _extract_function_content(self, node: ast.FunctionDef) -> str:
         return ast.unparse(node)
@@ -154,87 +498,339 @@ class CodebaseAnalyzer:
     def _add_to_api_spec(
         self, file_path: str, framework: str, routes: List[Dict[str, Any]]
     ):
+        source_file = self._relative_path(file_path)
+        for route_info in routes:
+            route_info["source_file"] = source_file
+            if self._schemas is not None and framework == "fastapi":
+                self._extract_static(file_path, route_info)
+            if not route_info.get("typed"):
+                self._slice_context(file_path, route_info)
+        if self._pending_routes is not None:
+            self._pending_routes.extend(routes)
+            return
+        with self.metrics.stage("enrich"):
+            for unit in self._enrichment_units(routes):
+                for result in self._enrich_unit(unit):
+                    self._merge_operation(*result)
+
+    async def _enrich_routes_async(self, routes: List[Dict[str, Any]]):
+        loop = asyncio.get_running_loop()
+        # The pool size bounds the number of LLM calls in flight
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        try:
+            results = await asyncio.gather(
+                *(
+                    loop.run_in_executor(executor, self._enrich_unit, unit)
+                    for unit in self._enrichment_units(routes)
+                )
+            )
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        self._check_cancelled()
+
+        # Merge in discovery order so the spec does not depend on completion order
+        for unit_results in results:
+            for path, method, operation in unit_results:
+                self._merge_operation(path, method, operation)
+
+    async def _enrich_in_place(self, routes, on_spec=None, rate_limiter=None):
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        engine_limiter = self.ai_engine.rate_limiter
+        if rate_limiter is not None:
+            self.ai_engine.rate_limiter = rate_limiter
+        flushed = time.monotonic()
+        try:
+            pending = {
+                loop.run_in_executor(executor, self._enrich_unit, unit): unit
+                for unit in self._enrichment_units(routes)
+            }
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                # Replacing the skeleton keeps its place, so the spec's order
+                # does not depend on completion order
+                for future in done:
+                    unit = pending.pop(future)
+                    try:
+                        results = future.result()
+                    except AnalysisCancelled:
+                        raise
+                    except Exception as e:
+                        # The unit's skeletons stay in the spec, marked so
+                        # that the next update asks for them again
+                        logger.warning(f"Enrichment failed: {e}")
+                        results = [(None, None, None)] * len(unit)
+                    for route_info, (_, _, operation) in zip(unit, results):
+                        path = self._normalize_path(route_info["route"])
+                        method = route_info["method"].lower()
+                        if operation is not None:
+                            self._merge_operation(path, method, operation)
+                            continue
+                        skeleton = self.api_spec["paths"].get(path, {}).get(method)
+                        if skeleton is not None:
+                            skeleton["x-enrichment"] = "failed"
+                if (
+                    on_spec is not None
+                    and pending
+                    and time.monotonic() - flushed >= config.ENRICH_FLUSH_SECONDS
+                ):
+                    await asyncio.to_thread(on_spec, self.api_spec)
+                    flushed = time.monotonic()
+        finally:
+            self.ai_engine.rate_limiter = engine_limiter
+            executor.shutdown(wait=False, cancel_futures=True)
+        self._check_cancelled()
+
+    def _skeleton_operation(self, route_info: Dict[str, Any]):
+        # What the code alone says about a route: the statically built
+        # operation when there is one, else the path parameters and a
+        # default response. "x-enrichment" is dropped once the LLM's
+        # operation replaces it.
+        path = self._normalize_path(route_info["route"])
+        method = route_info["method"].lower()
+        operation = copy.deepcopy(route_info.get("static_operation"))
+        if operation is None:
+            name = route_info["function_name"]
+            operation = {
+                "summary": " ".join(
+                    part.capitalize() for part in name.split("_") if part
+                ),
+                "operationId": name,
+            }
+            # Flask's <int:id> is typed by its converter, FastAPI's {id} (or
+            # {rest:path}) is a string
+            converters = {
+                param: converter
+                for converter, param in re.findall(
+                    r"<([^<>:]+):([^<>]+)>", route_info["route"]
+                )
+            }
+            parameters = [
+                {
+                    "name": param,
+                    "in": "path",
+                    "required": True,
+                    "schema": {
+                        "type": PATH_CONVERTER_TYPES.get(
+                            converters.get(param), "string"
+                        )
+                    },
+                }
+                for param in re.findall(r"{([^{}:]+)(?::[^{}]*)?}", path)
+            ]
+            if parameters:
+                operation["parameters"] = parameters
+            operation["responses"] = {"200": {"description": "Successful response"}}
+        operation["x-source-file"] = route_info.get("source_file")
+        operation["x-handler"] = self._handler_info(route_info)
+        operation["x-enrichment"] = "pending"
+        return path, method, operation
+
+    def _enrichment_units(self, routes: List[Dict[str, Any]]):
+        if not self.batch_token_budget:
+            return [[route_info] for route_info in routes]
+
+        # Fully typed routes only need their insights, which are asked for
+        # route by route
+        units = [[route_info] for route_info in routes if route_info.get("typed")]
+        routes = [route_info for route_info in routes if not route_info.get("typed")]
+
+        # Routes arrive grouped by file, so consecutive packing keeps routes
+        # of the same module together
+        unit, unit_tokens = [], 0
         for route_info in routes:
-            method, path = route_info["method"], route_info["route"]
-            data = {
-                "method": method,
-                "content": ast.unparse(route_info["node"]),
-                "path": path,
+            tokens = estimate_tokens(
+                route_info["content"] + route_info.get("context", "")
+            )
+            if unit and (
+                unit_tokens + tokens > self.batch_token_budget
+                or len(unit) >= self.batch_max_routes
+            ):
+                units.append(unit)
+                unit, unit_tokens = [], 0
+            unit.append(route_info)
+            unit_tokens += tokens
+        if unit:
+            units.append(unit)
+        return units
+
+    def _enrich_unit(self, unit: List[Dict[str, Any]]):
+        if len(unit) == 1:
+            return [self._enrich_route(unit[0])]
+        return self._enrich_batch(unit)
+
+    def _enrich_batch(self, unit: List[Dict[str, Any]]):
+        self._check_cancelled()
+        payloads = []
+        for index, route_info in enumerate(unit):
+            payload = {
+                "id": f"r{index}",
+                "method": route_info["method"],
+                "path": route_info["route"],
+                "content": route_info["content"],
             }
+            if route_info.get("context"):
+                payload["context"] = route_info["context"]
+            payloads.append(payload)
+        start = time.perf_counter()
+        entries, usage = self.ai_engine.generate_batch(
+            payloads, include_insights=self.batch_insights
+        )
+        self._record_usage("generate_batch", unit, start, usage)
+
+        results = []
+        for payload, route_info in zip(payloads, unit):
+            entry = entries.get(payload["id"])
+            if entry is None:
+                # Missing or malformed in the batched answer: ask for it alone
+                results.append(self._enrich_route(route_info))
+                continue
+            self._check_cancelled()
+            path = self._normalize_path(route_info["route"])
+            method = route_info["method"].lower()
+            operation = entry["operation"]
+            if self.batch_insights:
+                insights = entry["insights"]
+            else:
+                start = time.perf_counter()
+                insights, usage = self.ai_engine.generate_insights(
+                    {"paths": {path: {method: operation}}}
+                )
+                self._record_usage("generate_insights", [route_info], start, usage)
+            results.append(
+                self._finish_operation(route_info, path, method, operation, insights)
+            )
+        return results
+
+    def _enrich_route(self, route_info: Dict[str, Any]):
+        self._check_cancelled()
+        method, path = route_info["method"], route_info["route"]
+        data = {
+            "method": method,
+            "content": route_info["content"],
+            "path": path,
+        }
+        if route_info.get("context"):
+            data["context"] = route_info["context"]
+        if route_info.get("typed"):
+            path = self._normalize_path(path)
+            method = method.lower()
+            static = copy.deepcopy(route_info["static_operation"])
+            schema = {"paths": {path: {method: static}}}
+        else:
+            start = time.perf_counter()
             schema, usage = self.ai_engine.generate_api_spec(data)
-            path = path.replace("int", "")
-            path = path.replace("str", "")
-            path = path.replace(":", "")
-            path = path.replace("<", "{").replace(">", "}")
-            path = path.replace("<path:", "{").replace(">", "}")
-            insights, usage = self.ai_engine.generate_insights(schema)
-            if "paths" in schema:
-                schema["paths"][path][method.lower()]["insights"] = insights
-                self.api_spec["paths"].setdefault(path, {})[method.lower()] = schema[
-                    "paths"
-                ][path][method.lower()]
-            elif path in schema:
-                schema[path][method.lower()]["insights"] = insights
-                self.api_spec["paths"].setdefault(path, {})[method.lower()] = schema[
-                    path
-                ][method.lower()]
-
-    def _process_class(self, node: ast.ClassDef, file_path: str):
-        class_name = node.name
-        module_path = (
-            os.path.relpath(file_path, self.root_dir)
-            .replace("/", ".")
-            .replace(".py", "")
+            self._record_usage("generate_api_spec", [route_info], start, usage)
+            self._check_cancelled()
+            path = self._normalize_path(path)
+            method = method.lower()
+        start = time.perf_counter()
+        insights, usage = self.ai_engine.generate_insights(schema)
+        self._record_usage("generate_insights", [route_info], start, usage)
+        if "paths" in schema:
+            operation = schema["paths"][path][method]
+        elif path in schema:
+            operation = schema[path][method]
+        else:
+            self._count("routes_enriched")
+            return path, method, None
+        return self._finish_operation(route_info, path, method, operation, insights)
+
+    def _finish_operation(self, route_info, path, method, operation, insights):
+        static = route_info.get("static_operation")
+        if static is not None and not route_info.get("typed"):
+            # What is known statically replaces the model's guess, so request
+            # and response models are shared $refs in every operation
+            if "requestBody" in static:
+                operation["requestBody"] = static["requestBody"]
+            responses = operation.setdefault("responses", {})
+            for code, response in static["responses"].items():
+                if "content" in response:
+                    entry = responses.setdefault(
+                        code, {"description": response["description"]}
+                    )
+                    entry["content"] = response["content"]
+        operation["insights"] = insights
+        operation["x-source-file"] = route_info.get("source_file")
+        operation["x-handler"] = self._handler_info(route_info)
+        self._count("routes_enriched")
+        self._emit_endpoint(path, method, operation)
+        return path, method, operation
+
+    @staticmethod
+    def _handler_info(route_info: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "name": route_info["function_name"],
+            "start_line": route_info["lineno"],
+            "end_line": route_info["end_lineno"],
+        }
+
+    def _record_usage(
+        self,
+        operation: str,
+        routes: List[Dict[str, Any]],
+        start: float,
+        usage: Dict[str, Any],
+    ):
+        self.metrics.record_llm(
+            operation,
+            [
+                f"{route_info['method'].upper()} {route_info['route']}"
+                for route_info in routes
+            ],
+            time.perf_counter() - start,
+            usage,
         )
 
-        # Dynamically import the module
-        spec = importlib.util.spec_from_file_location(module_path, file_path)
-        module = importlib.util.module_from_spec(spec)
-        sys.modules[module_path] = module
-        spec.loader.exec_module(module)
-
-        class_obj = getattr(module, class_name)
-
-        if hasattr(class_obj, "router"):  # FastAPI router
-            self._process_fastapi_router(class_obj)
-        elif hasattr(class_obj, "as_view"):  # Django class-based view
-            self._process_django_view(class_obj)
-
-    def _process_fastapi_router(self, router):
-        for route in router.routes:
-            path = route.path
-            for method in route.methods:
-                method = method.lower()
-                self.api_spec["paths"].setdefault(path, {})[method] = {
-                    "summary": route.name,
-                    "description": inspect.getdoc(route.endpoint) or "",
-                    "parameters": self._get_parameters(route.endpoint),
-                    "responses": {"200": {"description": "Successful Response"}},
-                }
+    def _finish_metrics(self):
+        self.run_metrics = metrics = self.metrics.finish()
+        files = metrics["files"]
+        if files["skipped"] or files["ignored"]:
+            logger.info(
+                f"Ignored {files['ignored']} files and {files['dirs_ignored']} "
+                f"directories; skipped {files['skipped']} files without framework "
+                f"markers, saving an estimated {files['estimated_seconds_saved']:.2f}s"
+            )
+        storage = metrics["storage"]
+        if storage:
+            rows = sum(stats["rows"] for stats in storage.values())
+            seconds = sum(stats["seconds"] for stats in storage.values())
+            rate = rows / seconds if seconds else 0.0
+            logger.info(f"Stored {rows} rows in {seconds:.2f}s ({rate:.0f} rows/s)")
+        schemas = metrics["schemas"]
+        if schemas["typed_routes"] or schemas["partially_typed_routes"]:
+            logger.info(
+                f"Static schemas: {schemas['typed_routes']} fully typed routes "
+                f"skipped the LLM schema call, {schemas['partially_typed_routes']} "
+                f"partially typed; "
+                f"{len(self.api_spec['components']['schemas'])} shared components"
+            )
+        prompts = metrics["prompts"]
+        if prompts["routes"]:
+            logger.info(
+                f"Route prompts: {prompts['tokens_before']} tokens as handler-only "
+                f"JSON, {prompts['tokens_after']} with "
+                f"{prompts['context_symbols']} referenced definitions"
+            )
+        routes = self.progress["routes_enriched"]
+        if not routes:
+            return
+        llm = metrics["llm"]
+        logger.info(
+            f"Enriched {routes} routes with {llm['calls']} LLM calls "
+            f"({llm['prompt_tokens']} prompt / {llm['completion_tokens']} "
+            f"completion tokens, ${llm['cost_usd']:.4f}, "
+            f"{llm['cache_hit_rate']:.0%} cache hits); "
+            f"one call per route and step would take {2 * routes} calls"
+        )
 
-    def _process_django_view(self, view_class):
-        view_instance = view_class()
-        for method in ["get", "post", "put", "delete", "patch"]:
-            if hasattr(view_instance, method):
-                handler = getattr(view_instance, method)
-                path = f"/{view_class.__name__.lower()}"
-                self.api_spec["paths"].setdefault(path, {})[method] = {
-                    "summary": view_class.__name__,
-                    "description": inspect.getdoc(handler) or "",
-                    "parameters": self._get_parameters(handler),
-                    "responses": {"200": {"description": "Successful Response"}},
-                }
+    def _normalize_path(self, path: str) -> str:
+        # Flask converters (<int:id>, <path:rest>) become OpenAPI templates ({id})
+        return re.sub(r"<(?:[^<>:]+:)?([^<>]+)>", r"{\1}", path)
 
-    def _get_parameters(self, func) -> List[Dict[str, Any]]:
-        params = []
-        sig = inspect.signature(func)
-        for name, param in sig.parameters.items():
-            if name not in ["self", "request"]:
-                param_info = {
-                    "name": name,
-                    "in": "query",
-                    "required": param.default == inspect.Parameter.empty,
-                    "schema": {"type": "string"},  # Default to string, can be improved
-                }
-                params.append(param_info)
-        return params
+    def _merge_operation(self, path: str, method: str, operation: Dict[str, Any]):
+        if operation is None:
+            return
+        self.api_spec["paths"].setdefault(path, {})[method] = operation
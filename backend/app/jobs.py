@@ -0,0 +1,151 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional
+
+from backend import config
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, kind: str, params: Dict[str, Any] = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params or {}
+        self.status = QUEUED
+        # Workers update this dict in place while they run
+        self.progress: Dict[str, int] = {}
+        self.result = None
+        # Run metrics of the analysis (RunMetrics.to_dict) once it is done
+        self.metrics: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.cancel_event = threading.Event()
+        self.future: Optional[Future] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status,
+            "progress": dict(self.progress),
+            "metrics": self.metrics,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    def __init__(
+        self,
+        max_workers: int = config.JOB_WORKERS,
+        max_queued: int = config.JOB_QUEUE_SIZE,
+        max_retained: int = 1000,
+    ):
+        self.max_queued = max_queued
+        self.max_retained = max_retained
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="analysis-job"
+        )
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        kind: str,
+        target: Callable[..., Any],
+        *args,
+        params: Dict[str, Any] = None,
+        **kwargs,
+    ) -> Job:
+        # target is called as target(job, *args, **kwargs) on a worker thread
+        with self._lock:
+            queued = sum(1 for job in self._jobs.values() if job.status == QUEUED)
+            if queued >= self.max_queued:
+                raise QueueFullError(f"{queued} jobs are already waiting")
+            job = Job(kind, params)
+            # Set before the job is visible, so cancel() always finds a future
+            job.future = self._executor.submit(self._run, job, target, args, kwargs)
+            self._jobs[job.id] = job
+            self._prune()
+        return job
+
+    def _run(self, job: Job, target, args, kwargs):
+        if job.cancel_event.is_set():
+            # Cancelled after a worker picked it up but before it started:
+            # the future fails like it does for a job cancelled mid-run
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            raise JobCancelled(job.id)
+
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            job.result = target(job, *args, **kwargs)
+            job.status = SUCCEEDED
+            return job.result
+        except Exception as e:
+            if job.cancel_event.is_set():
+                job.status = CANCELLED
+            else:
+                job.status = FAILED
+                job.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return job
+        job.cancel_event.set()
+        if job.future is not None and job.future.cancel():
+            job.status = CANCELLED
+            job.finished_at = time.time()
+        return job
+
+    def _prune(self):
+        # Forget the oldest finished jobs once more than max_retained are kept
+        excess = len(self._jobs) - self.max_retained
+        for job_id in list(self._jobs):
+            if excess <= 0:
+                break
+            if self._jobs[job_id].finished:
+                del self._jobs[job_id]
+                excess -= 1
+
+
+@lru_cache(maxsize=None)
+def get_job_manager() -> JobManager:
+    return JobManager()
@@ -0,0 +1,381 @@
+import bisect
+import json
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Dict, List, Sequence, Tuple
+
+from backend import config
+
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 40, 60, 120)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Sequence[Tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(list(zip(self.labelnames, key)))} {value}"
+            for key, value in values
+        ]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = STAGE_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> (per-bucket counts, sum, count)
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            state = self._values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(
+                (key, (list(counts), total, count))
+                for key, (counts, total, count) in self._values.items()
+            )
+        lines = []
+        for key, (counts, total, count) in values:
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                bucket_labels = _format_labels(labels + [("le", repr(float(bound)))])
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            inf_labels = _format_labels(labels + [("le", "+Inf")])
+            lines.append(f"{self.name}_bucket{inf_labels} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+ANALYSES = REGISTRY.register(
+    Counter("akiradocs_analyses_total", "Completed repository analyses")
+)
+STAGE_SECONDS = REGISTRY.register(
+    Histogram(
+        "akiradocs_stage_duration_seconds",
+        "Time spent per analysis stage",
+        ["stage"],
+    )
+)
+LLM_REQUEST_SECONDS = REGISTRY.register(
+    Histogram(
+        "akiradocs_llm_request_duration_seconds",
+        "Latency of LLM requests (cache hits excluded)",
+        ["operation"],
+        buckets=LLM_BUCKETS,
+    )
+)
+LLM_TOKENS = REGISTRY.register(
+    Counter("akiradocs_llm_tokens_total", "LLM tokens used", ["operation", "kind"])
+)
+LLM_COST = REGISTRY.register(
+    Counter("akiradocs_llm_cost_usd_total", "Estimated LLM spend", ["operation"])
+)
+LLM_CACHE_LOOKUPS = REGISTRY.register(
+    Counter(
+        "akiradocs_llm_cache_lookups_total",
+        "LLM response cache lookups",
+        ["operation", "result"],
+    )
+)
+
+SOURCE_FILES = REGISTRY.register(
+    Counter(
+        "akiradocs_source_files_total",
+        "Source files seen by the walker, by outcome",
+        ["result"],
+    )
+)
+STORAGE_ROWS = REGISTRY.register(
+    Counter("akiradocs_storage_rows_total", "Rows written to storage", ["table"])
+)
+
+
+@lru_cache(maxsize=None)
+def load_model_prices(model_name: str = "default") -> Tuple[float, float]:
+    # (input, output) USD per token from the litellm_params in config.json
+    try:
+        with open(config.LLM_CONFIG_PATH) as f:
+            models = json.load(f)["language_model"]["models"]
+    except (OSError, KeyError, ValueError):
+        return 0.0, 0.0
+    for model in models:
+        if model.get("model_name") == model_name:
+            params = model.get("litellm_params", {})
+            return (
+                float(params.get("input_cost_per_token", 0)),
+                float(params.get("output_cost_per_token", 0)),
+            )
+    return 0.0, 0.0
+
+
+class RunMetrics:
+    # Metrics for a single analysis run; everything recorded here is also
+    # fed into the process-wide REGISTRY served on /metrics
+
+    def __init__(self, model_name: str = "default"):
+        self.input_price, self.output_price = load_model_prices(model_name)
+        self.stages: Dict[str, float] = {}
+        self.llm_calls: List[Dict[str, Any]] = []
+        self.cache_lookups = {"hits": 0, "misses": 0}
+        self.files = {
+            "scanned": 0,
+            "skipped": 0,
+            "indexed": 0,
+            "ignored": 0,
+            "dirs_ignored": 0,
+            "bytes_scanned": 0,
+            "bytes_skipped": 0,
+            "scan_seconds": 0.0,
+            "prefilter_seconds": 0.0,
+        }
+        # rows and seconds per table written by the storage layer
+        self.storage: Dict[str, Dict[str, float]] = {}
+        # Estimated prompt tokens per route: handler-only indented JSON
+        # before, sliced context after
+        self.prompts: List[Dict[str, Any]] = []
+        # FastAPI routes whose operation was built statically, in full or
+        # in part
+        self.schemas = {"typed_routes": 0, "partially_typed_routes": 0}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage_time(name, time.perf_counter() - start)
+
+    def add_stage_time(self, name: str, seconds: float):
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def record_walk(self, stats: Dict[str, int]):
+        ignored = stats.get("files_ignored", 0)
+        with self._lock:
+            self.files["ignored"] += ignored
+            self.files["dirs_ignored"] += stats.get("dirs_ignored", 0)
+        if ignored:
+            SOURCE_FILES.inc(ignored, result="ignored")
+
+    def record_index_hit(self):
+        with self._lock:
+            self.files["indexed"] += 1
+        SOURCE_FILES.inc(result="indexed")
+
+    def record_scan(self, skipped: bool, size: int, seconds: float):
+        with self._lock:
+            if skipped:
+                self.files["skipped"] += 1
+                self.files["bytes_skipped"] += size
+                self.files["prefilter_seconds"] += seconds
+            else:
+                self.files["scanned"] += 1
+                self.files["bytes_scanned"] += size
+                self.files["scan_seconds"] += seconds
+        SOURCE_FILES.inc(result="skipped" if skipped else "scanned")
+
+    def file_totals(self) -> Dict[str, Any]:
+        with self._lock:
+            files = dict(self.files)
+        # What the skipped bytes would have cost at the per-byte rate of the
+        # files that were parsed, minus the prefilter's own time
+        saved = 0.0
+        if files["bytes_scanned"]:
+            rate = files["scan_seconds"] / files["bytes_scanned"]
+            saved = max(0.0, files["bytes_skipped"] * rate - files["prefilter_seconds"])
+        files["estimated_seconds_saved"] = round(saved, 4)
+        files["scan_seconds"] = round(files["scan_seconds"], 4)
+        files["prefilter_seconds"] = round(files["prefilter_seconds"], 4)
+        return files
+
+    def record_storage(self, throughput: Dict[str, Dict[str, float]]):
+        with self._lock:
+            for table, stats in throughput.items():
+                totals = self.storage.setdefault(table, {"rows": 0, "seconds": 0.0})
+                totals["rows"] += stats["rows"]
+                totals["seconds"] += stats["seconds"]
+        for table, stats in throughput.items():
+            if stats["rows"]:
+                STORAGE_ROWS.inc(stats["rows"], table=table)
+
+    def storage_totals(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            storage = {table: dict(stats) for table, stats in self.storage.items()}
+        for stats in storage.values():
+            seconds = stats["seconds"]
+            stats["rows_per_sec"] = (
+                round(stats["rows"] / seconds, 1) if seconds else 0.0
+            )
+            stats["seconds"] = round(seconds, 4)
+        return storage
+
+    def record_static_route(self, typed: bool):
+        with self._lock:
+            self.schemas["typed_routes" if typed else "partially_typed_routes"] += 1
+
+    def record_prompt(self, route: str, before: int, after: int, symbols: int):
+        with self._lock:
+            self.prompts.append(
+                {
+                    "route": route,
+                    "tokens_before": before,
+                    "tokens_after": after,
+                    "context_symbols": symbols,
+                }
+            )
+
+    def prompt_totals(self) -> Dict[str, Any]:
+        with self._lock:
+            prompts = list(self.prompts)
+        return {
+            "routes": len(prompts),
+            "tokens_before": sum(prompt["tokens_before"] for prompt in prompts),
+            "tokens_after": sum(prompt["tokens_after"] for prompt in prompts),
+            "context_symbols": sum(prompt["context_symbols"] for prompt in prompts),
+            "per_route": prompts,
+        }
+
+    def record_cache_lookup(self, operation: str, hit: bool):
+        with self._lock:
+            self.cache_lookups["hits" if hit else "misses"] += 1
+        LLM_CACHE_LOOKUPS.inc(operation=operation, result="hit" if hit else "miss")
+
+    def record_llm(
+        self,
+        operation: str,
+        routes: List[str],
+        seconds: float,
+        usage: Dict[str, Any],
+    ):
+        usage = usage or {}
+        cached = bool(usage.get("cached"))
+        prompt_tokens = usage.get("prompt_tokens", 0) or 0
+        completion_tokens = usage.get("completion_tokens", 0) or 0
+        cost = prompt_tokens * self.input_price + completion_tokens * self.output_price
+        with self._lock:
+            self.llm_calls.append(
+                {
+                    "operation": operation,
+                    "routes": routes,
+                    "seconds": round(seconds, 4),
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "cost_usd": cost,
+                    "cached": cached,
+                }
+            )
+
+        if cached:
+            return
+        LLM_REQUEST_SECONDS.observe(seconds, operation=operation)
+        LLM_TOKENS.inc(prompt_tokens, operation=operation, kind="prompt")
+        LLM_TOKENS.inc(completion_tokens, operation=operation, kind="completion")
+        LLM_COST.inc(cost, operation=operation)
+
+    def totals(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = list(self.llm_calls)
+            hits, misses = self.cache_lookups["hits"], self.cache_lookups["misses"]
+        requests = [call for call in calls if not call["cached"]]
+        return {
+            "calls": len(requests),
+            "cache_hits": hits,
+            "cache_misses": misses,
+            "cache_hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "prompt_tokens": sum(call["prompt_tokens"] for call in requests),
+            "completion_tokens": sum(call["completion_tokens"] for call in requests),
+            "cost_usd": sum(call["cost_usd"] for call in requests),
+            "llm_seconds": sum(call["seconds"] for call in requests),
+        }
+
+    def finish(self) -> Dict[str, Any]:
+        ANALYSES.inc()
+        with self._lock:
+            stages = dict(self.stages)
+        for name, seconds in stages.items():
+            STAGE_SECONDS.observe(seconds, stage=name)
+        return self.to_dict()
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = {name: round(seconds, 4) for name, seconds in self.stages.items()}
+            calls = list(self.llm_calls)
+            schemas = dict(self.schemas)
+        return {
+            "stages": stages,
+            "files": self.file_totals(),
+            "storage": self.storage_totals(),
+            "prompts": self.prompt_totals(),
+            "schemas": schemas,
+            "llm": self.totals(),
+            "llm_calls": calls,
+        }
@@ -0,0 +1,148 @@
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional
+
+from backend import config
+from backend.app.jobs import JobManager, QueueFullError, get_job_manager
+
+# Pull request actions that can change the analyzed code; labels, assignees,
+# reviews and the like never do. "closed" counts only when merged, "edited"
+# only when the base branch changed.
+REBUILD_ACTIONS = {"opened", "reopened", "synchronize", "closed", "edited"}
+
+SCHEDULED = "scheduled"
+COALESCED = "coalesced"
+IGNORED = "ignored"
+
+
+def affects_api(event: str, payload: Dict[str, Any]) -> bool:
+    if event != "pull_request":
+        return False
+    action = payload.get("action")
+    if action not in REBUILD_ACTIONS:
+        return False
+    if action == "closed":
+        return bool(payload.get("pull_request", {}).get("merged"))
+    if action == "edited":
+        return "base" in payload.get("changes", {})
+    return True
+
+
+class _RepoState:
+    def __init__(self):
+        self.timer: Optional[threading.Timer] = None
+        # When the oldest event not yet handed to a run arrived
+        self.first_event: Optional[float] = None
+        self.job = None
+        # Another run is due once the in-flight one is done
+        self.pending = False
+
+
+class RebuildScheduler:
+    # At most one rebuild per repository at any time. Events are debounced
+    # per repository (a burst becomes one run, started at the latest
+    # max_delay after the first event), a run due while another is in flight
+    # supersedes it (the stale run is cancelled if it started less than
+    # supersede_within seconds ago, otherwise the new run waits for it), and
+    # runs go through the shared job pool, which caps global concurrency.
+
+    def __init__(
+        self,
+        target: Callable[..., Any],
+        manager: JobManager = None,
+        debounce: float = config.REBUILD_DEBOUNCE_SECONDS,
+        max_delay: float = config.REBUILD_MAX_DELAY_SECONDS,
+        supersede_within: float = config.REBUILD_SUPERSEDE_SECONDS,
+    ):
+        # target is called as target(job, url) on a job worker
+        self.target = target
+        self.manager = manager or get_job_manager()
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.supersede_within = supersede_within
+        self._repos: Dict[str, _RepoState] = {}
+        # Reentrant: cancelling a queued job runs its done callback right away
+        self._lock = threading.RLock()
+
+    def request(self, url: str) -> str:
+        # SCHEDULED when this event opens a new burst, COALESCED when it
+        # folds into one already waiting
+        now = time.time()
+        with self._lock:
+            state = self._repos.setdefault(url, _RepoState())
+            status = COALESCED if state.first_event is not None else SCHEDULED
+            if state.first_event is None:
+                state.first_event = now
+            if state.timer is not None:
+                state.timer.cancel()
+            delay = min(self.debounce, state.first_event + self.max_delay - now)
+            self._arm(url, state, max(delay, 0))
+        return status
+
+    def _arm(self, url: str, state: _RepoState, delay: float):
+        state.timer = threading.Timer(delay, self._due, args=(url,))
+        state.timer.daemon = True
+        state.timer.start()
+
+    def _due(self, url: str):
+        with self._lock:
+            state = self._repos.get(url)
+            # A timer cancelled while waiting for the lock still fires
+            if state is None or state.timer is not threading.current_thread():
+                return
+            state.timer = None
+            job = state.job
+            if job is not None and not job.finished:
+                state.pending = True
+                started = job.started_at
+                if started is None or time.time() - started < self.supersede_within:
+                    self.manager.cancel(job.id)
+                return
+            self._start(url, state)
+
+    def _start(self, url: str, state: _RepoState):
+        try:
+            job = self.manager.submit(
+                "process_updates", self.target, url, params={"url": url}
+            )
+        except QueueFullError:
+            # Try again later; new events keep folding into this burst
+            self._arm(url, state, self.debounce)
+            return
+        # The run picks up every event so far
+        if state.timer is not None:
+            state.timer.cancel()
+            state.timer = None
+        state.job = job
+        state.first_event = None
+        state.pending = False
+        job.future.add_done_callback(lambda _: self._finished(url, job))
+
+    def _finished(self, url: str, job):
+        with self._lock:
+            state = self._repos.get(url)
+            if state is None or state.job is not job:
+                return
+            state.job = None
+            if state.pending:
+                self._start(url, state)
+            elif state.timer is None and state.first_event is None:
+                del self._repos[url]
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                url: {
+                    "waiting": state.first_event is not None or state.pending,
+                    "job_id": state.job.id if state.job is not None else None,
+                }
+                for url, state in self._repos.items()
+            }
+
+
+@lru_cache(maxsize=None)
+def get_rebuild_scheduler() -> RebuildScheduler:
+    from backend.api.help import run_update_job
+
+    return RebuildScheduler(run_update_job)
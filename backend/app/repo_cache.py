@@ -0,0 +1,143 @@
+import fcntl
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Iterator, List, Optional, Set
+
+from backend import config
+from backend.helpers.git_utils import changed_files, run_git
+
+
+class RepoMirrorCache:
+    def __init__(
+        self,
+        root: str = config.REPO_CACHE_DIR,
+        max_bytes: int = config.REPO_CACHE_MAX_BYTES,
+    ):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def mirror_path(self, url: str) -> str:
+        name = re.sub(r"[^A-Za-z0-9_.-]+", "_", url.rstrip("/").split("/")[-1])
+        digest = hashlib.sha1(url.encode("utf8")).hexdigest()[:12]
+        return os.path.join(self.root, f"{name}-{digest}.git")
+
+    @contextmanager
+    def _locked(self, mirror: str, blocking: bool = True) -> Iterator[bool]:
+        # Serializes access to one mirror across threads (in-process lock)
+        # and across processes (flock on a sidecar file)
+        with self._locks_guard:
+            lock = self._locks.setdefault(mirror, threading.Lock())
+        if not lock.acquire(blocking):
+            yield False
+            return
+        try:
+            with open(mirror + ".lock", "a") as lock_file:
+                flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+                try:
+                    fcntl.flock(lock_file, flags)
+                except BlockingIOError:
+                    yield False
+                    return
+                try:
+                    yield True
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+        finally:
+            lock.release()
+
+    def update(self, url: str) -> str:
+        mirror = self.mirror_path(url)
+        with self._locked(mirror):
+            if os.path.isdir(mirror):
+                run_git("--git-dir", mirror, "fetch", "--prune", "--quiet", "origin")
+            else:
+                staging = tempfile.mkdtemp(dir=self.root, prefix=".clone-")
+                try:
+                    run_git("clone", "--mirror", "--quiet", url, staging)
+                    os.rename(staging, mirror)
+                finally:
+                    shutil.rmtree(staging, ignore_errors=True)
+            os.utime(mirror)
+        return mirror
+
+    @contextmanager
+    def checkout(
+        self, url: str, sparse_patterns: Optional[List[str]] = None
+    ) -> Iterator[str]:
+        # Yields a temporary shallow worktree of the default branch, limited
+        # to sparse_patterns (gitignore syntax) when given
+        mirror = self.update(url)
+        with tempfile.TemporaryDirectory() as worktree:
+            with self._locked(mirror):
+                run_git(
+                    "clone",
+                    "--quiet",
+                    "--no-checkout",
+                    "--depth",
+                    "1",
+                    f"file://{mirror}",
+                    worktree,
+                )
+            if sparse_patterns:
+                run_git("config", "core.sparseCheckout", "true", cwd=worktree)
+                info_dir = os.path.join(worktree, ".git", "info")
+                os.makedirs(info_dir, exist_ok=True)
+                with open(os.path.join(info_dir, "sparse-checkout"), "w") as f:
+                    f.write("\n".join(sparse_patterns) + "\n")
+            run_git("checkout", "--quiet", cwd=worktree)
+            yield worktree
+        self.evict(keep=mirror)
+
+    def changed_files(self, url: str, base: str, head: str) -> Optional[Set[str]]:
+        # Full history lives in the mirror, so diffs work even though the
+        # worktrees handed out by checkout() are shallow
+        mirror = self.mirror_path(url)
+        if not os.path.isdir(mirror):
+            return None
+        return changed_files(mirror, base, head, relative=False)
+
+    def evict(self, keep: str = None):
+        mirrors = []
+        for entry in os.listdir(self.root):
+            path = os.path.join(self.root, entry)
+            if entry.endswith(".git") and os.path.isdir(path):
+                mirrors.append((os.path.getmtime(path), _disk_usage(path), path))
+
+        total = sum(size for _, size, _ in mirrors)
+        for _, size, path in sorted(mirrors):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            # Mirrors in use by another request are skipped, not waited on
+            with self._locked(path, blocking=False) as acquired:
+                if not acquired:
+                    continue
+                shutil.rmtree(path, ignore_errors=True)
+                os.remove(path + ".lock")
+            total -= size
+
+
+def _disk_usage(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for file in files:
+            try:
+                total += os.lstat(os.path.join(root, file)).st_size
+            except OSError:
+                pass
+    return total
+
+
+@lru_cache(maxsize=None)
+def get_default_repo_cache() -> RepoMirrorCache:
+    return RepoMirrorCache()
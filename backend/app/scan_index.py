@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from backend import config
+from backend.helpers.route_visitor import EXTRACTOR_VERSION
+
+
+def file_digest(file_path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+class ScanIndex:
+    # scan_file results per (repo, relative path), stored with the file's
+    # size, mtime and content hash. A file whose size and mtime are unchanged
+    # is served without being read; one whose mtime moved (fresh checkouts)
+    # is hashed and served if the content is the same.
+
+    def __init__(self, path: str, extractor_version: str = EXTRACTOR_VERSION):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.extractor_version = extractor_version
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS files (
+                    repo TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    extractor_version TEXT NOT NULL,
+                    scan TEXT NOT NULL,
+                    PRIMARY KEY (repo, path)
+                )"""
+            )
+        self.invalidate(keep_extractor_version=extractor_version)
+
+    def partition(
+        self, repo: str, root: str, file_paths: Iterable[str]
+    ) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+        # Splits file_paths into indexed scans (by file path) and the paths
+        # that still have to be scanned
+        with self._lock:
+            known = {
+                path: (size, mtime_ns, content_hash)
+                for path, size, mtime_ns, content_hash in self._conn.execute(
+                    "SELECT path, size, mtime_ns, content_hash FROM files "
+                    "WHERE repo = ?",
+                    (repo,),
+                )
+            }
+        hits, misses, moved = {}, [], []
+        for file_path in file_paths:
+            relative_path = _relative(root, file_path)
+            entry = known.get(relative_path)
+            stat = os.stat(file_path)
+            if entry is None or entry[0] != stat.st_size:
+                misses.append(file_path)
+            elif entry[1] == stat.st_mtime_ns:
+                hits[file_path] = relative_path
+            elif entry[2] == file_digest(file_path):
+                hits[file_path] = relative_path
+                moved.append((stat.st_mtime_ns, repo, relative_path))
+            else:
+                misses.append(file_path)
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE files SET mtime_ns = ? WHERE repo = ? AND path = ?", moved
+            )
+            scans = {}
+            for file_path, relative_path in hits.items():
+                row = self._conn.execute(
+                    "SELECT scan FROM files WHERE repo = ? AND path = ?",
+                    (repo, relative_path),
+                ).fetchone()
+                scans[file_path] = dict(json.loads(row[0]), cached=True)
+            self.hits += len(scans)
+            self.misses += len(misses)
+        return scans, misses
+
+    def writer(self, repo: str, root: str) -> "ScanIndexWriter":
+        return ScanIndexWriter(self, repo, root)
+
+    def _write(self, rows: List[Tuple]):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+
+    def prune(self, repo: str, root: str, file_paths: Iterable[str]) -> int:
+        # Drops the repo's entries for files that no longer exist
+        keep = {_relative(root, file_path) for file_path in file_paths}
+        with self._lock, self._conn:
+            orphans = [
+                (repo, path)
+                for (path,) in self._conn.execute(
+                    "SELECT path FROM files WHERE repo = ?", (repo,)
+                )
+                if path not in keep
+            ]
+            self._conn.executemany(
+                "DELETE FROM files WHERE repo = ? AND path = ?", orphans
+            )
+        return len(orphans)
+
+    def invalidate(self, keep_extractor_version: str = None) -> int:
+        # Without a version everything is dropped; otherwise only entries
+        # written by other extractor versions are removed
+        with self._lock, self._conn:
+            if keep_extractor_version is None:
+                cursor = self._conn.execute("DELETE FROM files")
+            else:
+                cursor = self._conn.execute(
+                    "DELETE FROM files WHERE extractor_version != ?",
+                    (keep_extractor_version,),
+                )
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM files").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+        }
+
+
+class ScanIndexWriter:
+    # Collects the fresh scans of one run and writes them in one transaction.
+    # Scans are serialized as they are added, before the analyzer annotates
+    # the route and operation dicts they contain.
+
+    def __init__(self, index: ScanIndex, repo: str, root: str):
+        self.index = index
+        self.repo = repo
+        self.root = root
+        self._rows = []
+
+    def add(self, file_path: str, scan: Dict[str, Any]):
+        stat = os.stat(file_path)
+        self._rows.append(
+            (
+                self.repo,
+                _relative(self.root, file_path),
+                stat.st_size,
+                stat.st_mtime_ns,
+                file_digest(file_path),
+                self.index.extractor_version,
+                json.dumps(scan, separators=(",", ":")),
+            )
+        )
+
+    def commit(self):
+        if self._rows:
+            self.index._write(self._rows)
+            self._rows = []
+
+
+def _relative(root: str, file_path: str) -> str:
+    return os.path.relpath(file_path, root).replace(os.sep, "/")
+
+
+@lru_cache(maxsize=None)
+def get_default_scan_index() -> Optional[ScanIndex]:
+    if not config.SCAN_INDEX_PATH:
+        return None
+    return ScanIndex(config.SCAN_INDEX_PATH)
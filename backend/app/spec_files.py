@@ -0,0 +1,315 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from backend import config
+
+try:
+    import brotli
+except ImportError:  # brotli variants are skipped without it
+    brotli = None
+
+try:
+    import orjson
+except ImportError:  # the standard json encoder is used instead
+    orjson = None
+
+# Content-addressed copies of every served spec and its compressed variants,
+# plus one manifest per spec naming the current ones. Readers go through the
+# manifest, so the ETag always matches the bytes they are sent, even while a
+# new version is being written.
+VARIANTS_DIR = ".variants"
+# Encodings in order of preference, with their file suffix
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def content_etag(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+def _encode_json(value: Any, indent: Optional[int]) -> bytes:
+    separators = (",", ": ") if indent else (",", ":")
+    return json.dumps(value, indent=indent, separators=separators).encode("utf8")
+
+
+def _encode_orjson(value: Any, indent: Optional[int]) -> bytes:
+    # orjson only indents by two spaces
+    if indent and indent != 2:
+        return _encode_json(value, indent)
+    return orjson.dumps(value, option=orjson.OPT_INDENT_2 if indent else 0)
+
+
+# name -> encode(value, indent) -> bytes
+ENCODERS = {"json": _encode_json}
+if orjson is not None:
+    ENCODERS["orjson"] = _encode_orjson
+
+
+def get_encoder(name: str = None):
+    # "auto" picks the fastest installed encoder
+    name = name or config.SPEC_JSON_ENCODER
+    if name == "auto":
+        name = "orjson" if "orjson" in ENCODERS else "json"
+    return ENCODERS[name]
+
+
+def iter_spec_json(
+    api_spec: Dict[str, Any], indent: Optional[int] = None, encode=None
+) -> Iterator[bytes]:
+    # The spec serialized one top-level key, and one path, at a time, so
+    # only a single operation's JSON is ever held in memory
+    encode = encode or get_encoder()
+    newline = b"\n" if indent else b""
+    colon = b": " if indent else b":"
+
+    def nested(value, depth):
+        encoded = encode(value, indent)
+        if indent:
+            encoded = encoded.replace(b"\n", b"\n" + b" " * (indent * depth))
+        return encoded
+
+    def members(items, depth, value_of):
+        pad = b" " * (indent * depth) if indent else b""
+        yield b"{"
+        first = True
+        for key, value in items:
+            yield (b"" if first else b",") + newline + pad
+            yield encode(key, None) + colon
+            yield from value_of(value, depth)
+            first = False
+        if not first:
+            yield newline + (b" " * (indent * (depth - 1)) if indent else b"")
+        yield b"}"
+
+    def top_level(value, depth):
+        if isinstance(value, dict) and value and value is api_spec.get("paths"):
+            yield from members(
+                value.items(), depth + 1, lambda item, d: [nested(item, d)]
+            )
+        else:
+            yield nested(value, depth)
+
+    yield from members(api_spec.items(), 1, top_level)
+    yield newline
+
+
+class _VariantWriter:
+    # Streams chunks into temporary files for the identity and compressed
+    # variants at once, hashing as it goes
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.hasher = hashlib.sha256()
+        self.size = 0
+        self.files = {}
+        self.compressors = {"gzip": zlib.compressobj(9, zlib.DEFLATED, 31)}
+        if brotli is not None:
+            self.compressors["br"] = brotli.Compressor(mode=brotli.MODE_TEXT)
+        for encoding in ["identity", *self.compressors]:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+            self.files[encoding] = (tmp_path, os.fdopen(fd, "wb"))
+
+    def write(self, chunk: bytes):
+        self.hasher.update(chunk)
+        self.size += len(chunk)
+        self.files["identity"][1].write(chunk)
+        for encoding, compressor in self.compressors.items():
+            compressed = (
+                compressor.process(chunk)
+                if encoding == "br"
+                else compressor.compress(chunk)
+            )
+            if compressed:
+                self.files[encoding][1].write(compressed)
+
+    def finish(self) -> str:
+        for encoding, compressor in self.compressors.items():
+            tail = compressor.finish() if encoding == "br" else compressor.flush()
+            self.files[encoding][1].write(tail)
+        for _, f in self.files.values():
+            f.close()
+        return self.hasher.hexdigest()[:32]
+
+    def discard(self):
+        for tmp_path, f in self.files.values():
+            f.close()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def publish_chunks(static_dir: str, file_name: str, chunks: Iterable[bytes]) -> str:
+    # Writes static_dir/file_name and its precompressed variants from chunks
+    # in a single pass, each via a temporary file and a rename, and returns
+    # the ETag
+    variants_dir = os.path.join(static_dir, VARIANTS_DIR)
+    os.makedirs(variants_dir, exist_ok=True)
+    stem = file_name[: -len(".json")] if file_name.endswith(".json") else file_name
+    writer = _VariantWriter(variants_dir)
+    try:
+        for chunk in chunks:
+            writer.write(chunk)
+        etag = writer.finish()
+    except BaseException:
+        writer.discard()
+        raise
+
+    suffixes = {"identity": "", **dict(ENCODINGS)}
+    files = {}
+    for encoding, (tmp_path, _) in writer.files.items():
+        files[encoding] = f"{stem}.{etag}.json{suffixes[encoding]}"
+        os.replace(tmp_path, os.path.join(variants_dir, files[encoding]))
+    _publish_link(
+        os.path.join(variants_dir, files["identity"]),
+        os.path.join(static_dir, file_name),
+    )
+
+    manifest_path = os.path.join(variants_dir, f"{file_name}.manifest")
+    previous = _read_manifest(manifest_path)
+    _atomic_write(
+        manifest_path,
+        json.dumps({"etag": etag, "size": writer.size, "files": files}).encode(),
+    )
+    # Keep the previous generation for readers that loaded the old manifest
+    keep = set(files.values())
+    if previous is not None:
+        keep.update(previous["files"].values())
+    generation = re.compile(re.escape(stem) + r"\.[0-9a-f]{32}\.json(\.gz|\.br)?")
+    for name in os.listdir(variants_dir):
+        if name not in keep and generation.fullmatch(name):
+            os.remove(os.path.join(variants_dir, name))
+    _MANIFESTS.pop(manifest_path, None)
+    return etag
+
+
+def _atomic_write(path: str, data: bytes):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _publish_link(source: str, path: str):
+    # path becomes a hard link to source (same bytes, written once), swapped
+    # in with a rename; filesystems without links get a copy
+    tmp_path = os.path.join(
+        os.path.dirname(path),
+        f".tmp-{os.getpid()}-{threading.get_ident()}-{os.path.basename(path)}",
+    )
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        os.link(source, tmp_path)
+    except OSError:
+        shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def publish_spec_bytes(static_dir: str, file_name: str, data: bytes) -> str:
+    return publish_chunks(static_dir, file_name, [data])
+
+
+def publish_spec(
+    static_dir: str,
+    file_name: str,
+    api_spec: Dict[str, Any],
+    compact: bool = None,
+    encoder: str = None,
+) -> str:
+    # compact drops the indentation (about 30% of an indented spec)
+    compact = config.SPEC_JSON_COMPACT if compact is None else compact
+    chunks = iter_spec_json(api_spec, None if compact else 4, get_encoder(encoder))
+    return publish_chunks(static_dir, file_name, chunks)
+
+
+def _read_manifest(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, "rb") as f:
+            return json.loads(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+# manifest path -> (mtime_ns, manifest), so polls do not re-read it
+_MANIFESTS: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+_MANIFESTS_LOCK = threading.Lock()
+
+
+def spec_manifest(static_dir: str, file_name: str) -> Optional[Dict[str, Any]]:
+    # The current manifest of file_name. Specs written before manifests
+    # existed are published (hashed and compressed) on first request.
+    path = os.path.join(static_dir, VARIANTS_DIR, f"{file_name}.manifest")
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        spec_path = os.path.join(static_dir, file_name)
+        if not os.path.isfile(spec_path):
+            return None
+        with open(spec_path, "rb") as f:
+            data = f.read()
+        publish_spec_bytes(static_dir, file_name, data)
+        mtime_ns = os.stat(path).st_mtime_ns
+    with _MANIFESTS_LOCK:
+        cached = _MANIFESTS.get(path)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
+    manifest = _read_manifest(path)
+    if manifest is not None:
+        with _MANIFESTS_LOCK:
+            _MANIFESTS[path] = (mtime_ns, manifest)
+    return manifest
+
+
+def accepted_encodings(header: str) -> List[str]:
+    # Content codings of an Accept-Encoding header with q > 0
+    encodings = []
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name and quality > 0:
+            encodings.append(name.strip().lower())
+    return encodings
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    # Variants share the spec's ETag plus an encoding suffix, so a client
+    # holding any of them is up to date
+    if if_none_match.strip() == "*":
+        return True
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        tag = tag.strip('"')
+        if tag == etag or tag.startswith(etag + "-"):
+            return True
+    return False
+
+
+def choose_variant(
+    manifest: Dict[str, Any], accept_encoding: str
+) -> Tuple[Optional[str], str]:
+    # (content encoding or None, file name in the variants directory)
+    accepted = accepted_encodings(accept_encoding)
+    for encoding, _ in ENCODINGS:
+        if encoding in manifest["files"] and (
+            encoding in accepted or "*" in accepted
+        ):
+            return encoding, manifest["files"][encoding]
+    return None, manifest["files"]["identity"]
@@ -0,0 +1,497 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from backend import config
+
+# A full copy of every SNAPSHOT_INTERVAL-th version bounds how many deltas
+# rebuilding an old version has to apply
+SNAPSHOT_INTERVAL = 50
+
+
+class VersionConflict(ValueError):
+    # The head is not the version the caller expected, e.g. another analysis
+    # of the repository was saved in between
+    pass
+
+
+def unit_key(*parts: str) -> str:
+    return json.dumps(list(parts))
+
+
+def flatten(spec: Dict[str, Any]) -> Dict[str, str]:
+    # The spec as independently versioned units: one per operation
+    # (["paths", path, method]), one per component (["components", kind,
+    # name]) and one per remaining top-level key, each as compact JSON. An
+    # empty "paths" or "components" is a unit of its own so it survives.
+    units = {}
+    for key, value in spec.items():
+        if key == "paths" and isinstance(value, dict) and value:
+            for path, methods in value.items():
+                if isinstance(methods, dict) and methods:
+                    for method, operation in methods.items():
+                        units[unit_key("paths", path, method)] = _dump(operation)
+                else:
+                    units[unit_key("paths", path)] = _dump(methods)
+        elif key == "components" and isinstance(value, dict) and value:
+            for kind, members in value.items():
+                if isinstance(members, dict) and members:
+                    for name, member in members.items():
+                        units[unit_key("components", kind, name)] = _dump(member)
+                else:
+                    units[unit_key("components", kind)] = _dump(members)
+        else:
+            units[unit_key(key)] = _dump(value)
+    return units
+
+
+def unflatten(units: Iterable[Tuple[str, str]]) -> Dict[str, Any]:
+    spec: Dict[str, Any] = {}
+    for key, body in units:
+        parts = json.loads(key)
+        target = spec
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = json.loads(body)
+    return spec
+
+
+def _dump(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+
+class SpecStore:
+    # Versioned API specs per repository. The latest version is kept as
+    # flattened units, so writing a version only touches the units that
+    # changed; each version also records the previous body of those units
+    # (a reverse delta), from which any older version is rebuilt.
+
+    def __init__(
+        self,
+        path: str,
+        snapshot_interval: int = SNAPSHOT_INTERVAL,
+        keep_versions: int = config.SPEC_HISTORY_VERSIONS,
+    ):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.snapshot_interval = snapshot_interval
+        # Older versions are compacted away at every snapshot; 0 keeps all
+        self.keep_versions = keep_versions
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS heads (
+                    repo TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL,
+                    next_position INTEGER NOT NULL
+                )"""
+            )
+            # position keeps the spec's key order across partial updates
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS units (
+                    repo TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    body TEXT NOT NULL,
+                    PRIMARY KEY (repo, key)
+                )"""
+            )
+            # changes maps unit key -> [position, body] before this version,
+            # or null when the unit did not exist yet
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS versions (
+                    repo TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    added INTEGER NOT NULL,
+                    modified INTEGER NOT NULL,
+                    removed INTEGER NOT NULL,
+                    changes TEXT NOT NULL,
+                    PRIMARY KEY (repo, version)
+                )"""
+            )
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS snapshots (
+                    repo TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    units TEXT NOT NULL,
+                    PRIMARY KEY (repo, version)
+                )"""
+            )
+
+    def head(self, repo: str) -> Optional[int]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version FROM heads WHERE repo = ?", (repo,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(
+        self,
+        repo: str,
+        spec: Dict[str, Any],
+        version: int = None,
+        stamp: Callable[[Dict[str, Any], int], None] = None,
+    ) -> int:
+        # Stores spec as the repository's next version (or as version, which
+        # must be newer than the head) and returns its number. stamp, when
+        # given, is called with spec and the version before it is stored, so
+        # the spec can carry the number the store allocated.
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT version, next_position FROM heads WHERE repo = ?", (repo,)
+            ).fetchone()
+            head, next_position = row if row else (0, 0)
+            if version is None:
+                version = head + 1
+            elif version <= head:
+                raise VersionConflict(f"{repo} is already at version {head}")
+            if stamp is not None:
+                stamp(spec, version)
+            units = flatten(spec)
+
+            changes, upserts, removed, next_position = self._write_units(
+                repo, units, next_position
+            )
+            added = sum(1 for value in changes.values() if value is None)
+            self._conn.execute(
+                "INSERT INTO versions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    repo,
+                    version,
+                    time.time(),
+                    added,
+                    len(upserts) - added,
+                    len(removed),
+                    # Nothing precedes a repository's first version
+                    json.dumps(changes if row else {}, separators=(",", ":")),
+                ),
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO heads VALUES (?, ?, ?)",
+                (repo, version, next_position),
+            )
+            if self.snapshot_interval and version % self.snapshot_interval == 0:
+                self._snapshot(repo, version)
+                if self.keep_versions:
+                    self._compact(repo, self.keep_versions)
+        return version
+
+    def amend(
+        self,
+        repo: str,
+        spec: Dict[str, Any],
+        version: int = None,
+        stamp: Callable[[Dict[str, Any], int], None] = None,
+    ) -> int:
+        # Replaces the head version's content (version, when given, must be
+        # the head) with spec instead of adding a version, e.g. enrichment
+        # filling in a skeleton spec as results come in, and returns its
+        # number. The head's delta still leads back to the version before it.
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT version, next_position FROM heads WHERE repo = ?", (repo,)
+            ).fetchone()
+            if row is None:
+                raise VersionConflict(f"{repo} has no version to amend")
+            head, next_position = row
+            if version is not None and version != head:
+                raise VersionConflict(f"{repo} is at version {head}, not {version}")
+            if stamp is not None:
+                stamp(spec, head)
+            units = flatten(spec)
+            changes, _, _, next_position = self._write_units(
+                repo, units, next_position
+            )
+            # Only units the head had not touched yet get a delta entry; the
+            # others keep their body from before the head. Nothing precedes
+            # the oldest version, whose delta (and counts) stay as they are.
+            if self._conn.execute(
+                "SELECT 1 FROM versions WHERE repo = ? AND version < ?", (repo, head)
+            ).fetchone():
+                (recorded,) = self._conn.execute(
+                    "SELECT changes FROM versions WHERE repo = ? AND version = ?",
+                    (repo, head),
+                ).fetchone()
+                recorded = json.loads(recorded)
+                for key, previous in changes.items():
+                    recorded.setdefault(key, previous)
+                added = modified = removed = 0
+                for key, previous in recorded.items():
+                    if key not in units:
+                        removed += previous is not None
+                    elif previous is None:
+                        added += 1
+                    else:
+                        modified += 1
+                self._conn.execute(
+                    "UPDATE versions SET added = ?, modified = ?, removed = ?, "
+                    "changes = ? WHERE repo = ? AND version = ?",
+                    (
+                        added,
+                        modified,
+                        removed,
+                        json.dumps(recorded, separators=(",", ":")),
+                        repo,
+                        head,
+                    ),
+                )
+            self._conn.execute(
+                "UPDATE heads SET next_position = ? WHERE repo = ?",
+                (next_position, repo),
+            )
+            if self._conn.execute(
+                "SELECT 1 FROM snapshots WHERE repo = ? AND version = ?", (repo, head)
+            ).fetchone():
+                self._snapshot(repo, head)
+        return head
+
+    def _write_units(self, repo: str, units: Dict[str, str], next_position: int):
+        # Makes units the repository's current units and returns the reverse
+        # delta ({key: [position, body] or None}), the upserted rows, the
+        # removed keys and the next free position
+        current = {
+            key: (position, body)
+            for key, position, body in self._conn.execute(
+                "SELECT key, position, body FROM units WHERE repo = ?", (repo,)
+            )
+        }
+        changes, upserts = {}, []
+        for key, body in units.items():
+            previous = current.get(key)
+            if previous is None:
+                changes[key] = None
+                upserts.append((repo, key, next_position, body))
+                next_position += 1
+            elif previous[1] != body:
+                changes[key] = list(previous)
+                upserts.append((repo, key, previous[0], body))
+        removed = [key for key in current if key not in units]
+        for key in removed:
+            changes[key] = list(current[key])
+
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO units VALUES (?, ?, ?, ?)", upserts
+        )
+        self._conn.executemany(
+            "DELETE FROM units WHERE repo = ? AND key = ?",
+            [(repo, key) for key in removed],
+        )
+        return changes, upserts, removed, next_position
+
+    def _snapshot(self, repo: str, version: int):
+        units = self._conn.execute(
+            "SELECT key, position, body FROM units WHERE repo = ?", (repo,)
+        ).fetchall()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?)",
+            (
+                repo,
+                version,
+                json.dumps(
+                    {key: [position, body] for key, position, body in units},
+                    separators=(",", ":"),
+                ),
+            ),
+        )
+
+    def get(self, repo: str, version: int = None) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            units = self._units_at(repo, version)
+        if units is None:
+            return None
+        return unflatten(
+            (key, body)
+            for key, (_, body) in sorted(units.items(), key=lambda item: item[1][0])
+        )
+
+    def _units_at(
+        self, repo: str, version: Optional[int], keys: Iterable[str] = None
+    ) -> Optional[Dict[str, Tuple[int, str]]]:
+        # {key: (position, body)} of version (default: the head), limited to
+        # keys when given. Starts from the head, or from the closest newer
+        # snapshot, and undoes the deltas of the versions in between.
+        row = self._conn.execute(
+            "SELECT version FROM heads WHERE repo = ?", (repo,)
+        ).fetchone()
+        if row is None:
+            return None
+        head = row[0]
+        if version is None or version == head:
+            version = head
+        elif not self._conn.execute(
+            "SELECT 1 FROM versions WHERE repo = ? AND version = ?", (repo, version)
+        ).fetchone():
+            return None
+        wanted = None if keys is None else set(keys)
+
+        snapshot = self._conn.execute(
+            "SELECT version, units FROM snapshots WHERE repo = ? AND version >= ? "
+            "ORDER BY version LIMIT 1",
+            (repo, version),
+        ).fetchone()
+        if version != head and snapshot is not None:
+            start = snapshot[0]
+            units = {
+                key: tuple(value) for key, value in json.loads(snapshot[1]).items()
+            }
+        else:
+            start = head
+            units = {
+                key: (position, body)
+                for key, position, body in self._conn.execute(
+                    "SELECT key, position, body FROM units WHERE repo = ?", (repo,)
+                )
+            }
+        if wanted is not None:
+            units = {key: value for key, value in units.items() if key in wanted}
+
+        for (changes,) in self._conn.execute(
+            "SELECT changes FROM versions WHERE repo = ? AND version > ? "
+            "AND version <= ? ORDER BY version DESC",
+            (repo, version, start),
+        ):
+            for key, previous in json.loads(changes).items():
+                if wanted is not None and key not in wanted:
+                    continue
+                if previous is None:
+                    units.pop(key, None)
+                else:
+                    units[key] = tuple(previous)
+        return units
+
+    def versions(self, repo: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT version, created_at, added, modified, removed FROM versions "
+                "WHERE repo = ? ORDER BY version",
+                (repo,),
+            ).fetchall()
+        return [
+            {
+                "version": version,
+                "created_at": created_at,
+                "added": added,
+                "modified": modified,
+                "removed": removed,
+            }
+            for version, created_at, added, modified, removed in rows
+        ]
+
+    def diff(
+        self, repo: str, from_version: int, to_version: int = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        # Units that differ between the two versions, as {"key", "change",
+        # "before", "after"} with key the unit's path in the spec (e.g.
+        # ["paths", "/users", "get"]). Only the deltas in between are read.
+        with self._lock:
+            head = self._conn.execute(
+                "SELECT version FROM heads WHERE repo = ?", (repo,)
+            ).fetchone()
+            if head is None:
+                return None
+            to_version = head[0] if to_version is None else to_version
+            low, high = sorted((from_version, to_version))
+            keys = set()
+            for (changes,) in self._conn.execute(
+                "SELECT changes FROM versions WHERE repo = ? AND version > ? "
+                "AND version <= ?",
+                (repo, low, high),
+            ):
+                keys.update(json.loads(changes))
+            before = self._units_at(repo, from_version, keys)
+            after = self._units_at(repo, to_version, keys)
+        if before is None or after is None:
+            return None
+
+        result = []
+        for key in sorted(keys):
+            old, new = before.get(key), after.get(key)
+            if old is None and new is None:
+                continue
+            if old is None:
+                change = "added"
+            elif new is None:
+                change = "removed"
+            elif old[1] != new[1]:
+                change = "modified"
+            else:
+                continue
+            result.append(
+                {
+                    "key": json.loads(key),
+                    "change": change,
+                    "before": None if old is None else json.loads(old[1]),
+                    "after": None if new is None else json.loads(new[1]),
+                }
+            )
+        return result
+
+    def compact(self, repo: str, keep: int) -> int:
+        # Drops the history older than the newest keep versions and returns
+        # how many versions were dropped
+        with self._lock, self._conn:
+            return self._compact(repo, keep)
+
+    def _compact(self, repo: str, keep: int) -> int:
+        # Reading a version only undoes the deltas of newer versions, so the
+        # older ones (and the oldest kept version's own) can go
+        keep = max(1, keep)
+        row = self._conn.execute(
+            "SELECT version FROM versions WHERE repo = ? "
+            "ORDER BY version DESC LIMIT 1 OFFSET ?",
+            (repo, keep - 1),
+        ).fetchone()
+        if row is None:
+            return 0
+        oldest = row[0]
+        cursor = self._conn.execute(
+            "DELETE FROM versions WHERE repo = ? AND version < ?", (repo, oldest)
+        )
+        self._conn.execute(
+            "UPDATE versions SET changes = '{}' WHERE repo = ? AND version = ?",
+            (repo, oldest),
+        )
+        self._conn.execute(
+            "DELETE FROM snapshots WHERE repo = ? AND version < ?", (repo, oldest)
+        )
+        return cursor.rowcount
+
+    def stats(self, repo: str) -> Dict[str, Any]:
+        with self._lock:
+            (units, unit_bytes) = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM units "
+                "WHERE repo = ?",
+                (repo,),
+            ).fetchone()
+            (versions, delta_bytes) = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(changes)), 0) FROM versions "
+                "WHERE repo = ?",
+                (repo,),
+            ).fetchone()
+            (snapshots, snapshot_bytes) = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(units)), 0) FROM snapshots "
+                "WHERE repo = ?",
+                (repo,),
+            ).fetchone()
+        return {
+            "units": units,
+            "unit_bytes": unit_bytes,
+            "versions": versions,
+            "delta_bytes": delta_bytes,
+            "snapshots": snapshots,
+            "snapshot_bytes": snapshot_bytes,
+        }
+
+
+@lru_cache(maxsize=None)
+def get_default_spec_store() -> Optional[SpecStore]:
+    if not config.SPEC_STORE_PATH:
+        return None
+    return SpecStore(config.SPEC_STORE_PATH)
@@ -1,13 +1,59 @@
-from typing import Dict, Any
-from backend.helpers.tree_sitter_utils import parse_code, ParserFactory
+from typing import Any, Dict, List
+from backend.helpers.tree_sitter_utils import traverse_tree, ParserFactory
 
 ParsedBody = Dict[str, Dict[str, Any]]
 
 
-def chunk_code(code: str, language: str) -> ParsedBody:
+def chunk_spans(code: str, language: str) -> List[Dict[str, Any]]:
+    # The blocks chunk_code is built from, in source order, each with its
+    # section, name, code and byte and line span
     parser = ParserFactory.get_parser(language)
-    tree = parser.parse(code.encode("utf8"))
+    code_bytes = code.encode("utf8")
+    tree = parser.parse(code_bytes)
+
+    spans = []
+
+    def add(section, result, node):
+        spans.append(
+            {
+                "section": section,
+                "name": result["name"],
+                "code": result["code"],
+                "start_byte": node.start_byte,
+                "end_byte": node.end_byte,
+                "start_line": node.start_point[0] + 1,
+                "end_line": node.end_point[0] + 1,
+            }
+        )
+
+    # One preorder walk over the tree: a matching node becomes a block and
+    # its subtree is not visited; anything else is descended into
+    stack = [tree.root_node]
+    while stack:
+        node = stack.pop()
+        result = traverse_tree(node, code_bytes)
+        if result is None:
+            stack.extend(reversed(node.children))
+        elif result["type"] == "function":
+            if is_react_hook(result["name"]):
+                add("hooks", result, node)
+            elif is_react_component(result["code"]):
+                add("components", result, node)
+            else:
+                add("functions", result, node)
+        elif result["type"] == "class":
+            if is_react_component(result["code"]):
+                add("components", result, node)
+            else:
+                add("classes", result, node)
+        elif result["type"] == "component":
+            add("components", result, node)
+        elif result["type"] == "impl":
+            add("classes", result, node)
+    return spans
+
 
+def chunk_code(code: str, language: str) -> ParsedBody:
     body: ParsedBody = {
         "functions": {},
         "classes": {},
@@ -15,49 +61,22 @@ def chunk_code(code: str, language: str) -> ParsedBody:
         "components": {},
         "other_blocks": [],
     }
-    # code_bytes = code.encode("utf8")
-
-    def process_node(node):
-        result = parse_code(code, language)
-        if result:
-            if result["type"] == "function":
-                if is_react_hook(result["name"]):
-                    body["hooks"][result["name"]] = result["code"]
-                elif is_react_component(result["code"]):
-                    body["components"][result["name"]] = result["code"]
-                else:
-                    body["functions"][result["name"]] = result["code"]
-            elif result["type"] == "class":
-                if is_react_component(result["code"]):
-                    body["components"][result["name"]] = result["code"]
-                else:
-                    body["classes"][result["name"]] = result["code"]
-            elif result["type"] == "component":
-                body["components"][result["name"]] = result["code"]
-            elif result["type"] == "impl":
-                body["classes"][result["name"]] = result["code"]
-        else:
-            for child in node.children:
-                process_node(child)
-
-    process_node(tree.root_node)
+    # (section, name) -> byte range of the block currently stored there
+    ranges = {}
+    for span in chunk_spans(code, language):
+        body[span["section"]][span["name"]] = span["code"]
+        ranges[(span["section"], span["name"])] = (span["start_byte"], span["end_byte"])
 
     # Collect remaining code as other_blocks
-    collected_ranges = []
-    for section in body.values():
-        if isinstance(section, dict):
-            for code_block in section.values():
-                start = code.index(code_block)
-                collected_ranges.append((start, start + len(code_block)))
-
-    collected_ranges.sort()
+    code_bytes = code.encode("utf8")
     last_end = 0
-    for start, end in collected_ranges:
+    for start, end in sorted(ranges.values()):
         if start > last_end:
-            body["other_blocks"].append(code[last_end:start].strip())
-        last_end = end
-    if last_end < len(code):
-        body["other_blocks"].append(code[last_end:].strip())
+            gap = code_bytes[last_end:start]
+            body["other_blocks"].append(gap.decode("utf8").strip())
+        last_end = max(last_end, end)
+    if last_end < len(code_bytes):
+        body["other_blocks"].append(code_bytes[last_end:].decode("utf8").strip())
 
     return body
 
@@ -0,0 +1,221 @@
+import mmap
+import os
+import re
+from typing import Dict, List, Optional, Sequence
+
+# Directories never worth scanning for API code: dependencies, virtualenvs,
+# caches and build output
+DEFAULT_EXCLUDES = frozenset(
+    {
+        ".git",
+        ".hg",
+        ".svn",
+        "node_modules",
+        "bower_components",
+        "jspm_packages",
+        ".venv",
+        "venv",
+        ".env",
+        "env",
+        "site-packages",
+        "dist-packages",
+        "__pycache__",
+        ".mypy_cache",
+        ".pytest_cache",
+        ".tox",
+        ".nox",
+        ".eggs",
+        "build",
+        "dist",
+        ".next",
+        ".nuxt",
+        "target",
+        "vendor",
+        "coverage",
+    }
+)
+
+# Files from this size on are searched through mmap instead of read()
+MMAP_THRESHOLD = 1024 * 1024
+
+
+class IgnoreRule:
+    # One .gitignore line, matched against paths relative to the directory
+    # holding the .gitignore
+
+    def __init__(self, base: str, pattern: str):
+        self.base = base
+        self.negated = pattern.startswith("!")
+        if self.negated:
+            pattern = pattern[1:]
+        self.dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        anchored = "/" in pattern
+        pattern = pattern.lstrip("/")
+        prefix = "" if anchored else "(?:.*/)?"
+        self.regex = re.compile(f"^{prefix}{_translate(pattern)}$")
+
+    def match(self, relative_path: str, is_dir: bool) -> Optional[bool]:
+        # True when the rule ignores the path, False when it re-includes it,
+        # None when it does not apply
+        if self.dir_only and not is_dir:
+            return None
+        if self.base:
+            if not relative_path.startswith(self.base + "/"):
+                return None
+            relative_path = relative_path[len(self.base) + 1 :]
+        if not self.regex.match(relative_path):
+            return None
+        return not self.negated
+
+
+def _translate(pattern: str) -> str:
+    # gitignore glob -> regex: ** spans directories, * and ? stay within one
+    parts, i = [], 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            parts.append("/.*")
+            i += 3
+        elif pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            parts.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            parts.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 1 :]:
+            end = pattern.index("]", i + 1)
+            body = pattern[i + 1 : end].replace("\\", "\\\\")
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            parts.append(f"[{body}]")
+            i = end + 1
+        elif pattern[i] == "\\" and i + 1 < len(pattern):
+            parts.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+    return "".join(parts)
+
+
+def parse_gitignore(path: str, base: str = "") -> List[IgnoreRule]:
+    try:
+        with open(path, "r", errors="replace") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return []
+    rules = []
+    for line in lines:
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        rules.append(IgnoreRule(base, line))
+    return rules
+
+
+class IgnoreFilter:
+    # .gitignore rules (nested files included) plus the built-in excludes for
+    # a directory tree; paths are relative to root with "/" separators
+
+    def __init__(
+        self,
+        root: str,
+        excludes: Sequence[str] = DEFAULT_EXCLUDES,
+        use_gitignore: bool = True,
+    ):
+        self.root = root
+        self.excludes = frozenset(excludes)
+        self.use_gitignore = use_gitignore
+        self._rules: Dict[str, List[IgnoreRule]] = {}
+
+    def _rules_for(self, directory: str) -> List[IgnoreRule]:
+        # Rules that apply inside directory: its ancestors' then its own
+        if directory not in self._rules:
+            parent = directory.rpartition("/")[0] if directory else None
+            rules = list(self._rules_for(parent)) if parent is not None else []
+            if self.use_gitignore:
+                gitignore = os.path.join(self.root, directory, ".gitignore")
+                rules.extend(parse_gitignore(gitignore, directory))
+            self._rules[directory] = rules
+        return self._rules[directory]
+
+    def ignored_entry(self, directory: str, name: str, is_dir: bool) -> bool:
+        # Only the entry itself is checked; walk() never enters ignored
+        # directories, so their contents need no check of their own
+        if is_dir and (name in self.excludes or name.endswith(".egg-info")):
+            return True
+        relative_path = f"{directory}/{name}" if directory else name
+        ignored = False
+        for rule in self._rules_for(directory):
+            result = rule.match(relative_path, is_dir)
+            if result is not None:
+                ignored = result
+        return ignored
+
+    def ignored(self, relative_path: str) -> bool:
+        parts = relative_path.replace(os.sep, "/").split("/")
+        for depth in range(len(parts)):
+            directory = "/".join(parts[:depth])
+            is_dir = depth < len(parts) - 1
+            if self.ignored_entry(directory, parts[depth], is_dir):
+                return True
+        return False
+
+    def walk(
+        self, extensions: Sequence[str], stats: Dict[str, int] = None
+    ) -> List[str]:
+        # Sorted paths of the files under root ending in one of extensions.
+        # stats, when given, counts the excluded directories and files.
+        extensions = tuple(extensions)
+        file_paths = []
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            directory = os.path.relpath(dirpath, self.root).replace(os.sep, "/")
+            directory = "" if directory == "." else directory
+            kept = []
+            for name in dirnames:
+                if self.ignored_entry(directory, name, True):
+                    _bump(stats, "dirs_ignored")
+                else:
+                    kept.append(name)
+            dirnames[:] = kept
+            for name in filenames:
+                if not name.endswith(extensions):
+                    continue
+                if self.ignored_entry(directory, name, False):
+                    _bump(stats, "files_ignored")
+                else:
+                    file_paths.append(os.path.join(dirpath, name))
+        file_paths.sort()
+        return file_paths
+
+
+def _bump(stats: Optional[Dict[str, int]], key: str):
+    if stats is not None:
+        stats[key] = stats.get(key, 0) + 1
+
+
+def walk_files(
+    root: str, extensions: Sequence[str], stats: Dict[str, int] = None
+) -> List[str]:
+    return IgnoreFilter(root).walk(extensions, stats)
+
+
+def read_if_matches(file_path: str, pattern: "re.Pattern[bytes]") -> Optional[bytes]:
+    # Contents of the file when pattern occurs in its raw bytes, else None.
+    # Nothing is decoded before the match, and large files are searched
+    # through mmap so rejecting them does not copy them into memory.
+    with open(file_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if pattern.search(mapped) is None:
+                    return None
+                return mapped[:]
+        data = f.read()
+    return data if pattern.search(data) is not None else None
@@ -0,0 +1,44 @@
+import subprocess
+from typing import Optional, Set
+
+
+def run_git(*args: str, cwd: str = None) -> str:
+    result = subprocess.run(
+        ["git", *args],
+        cwd=cwd,
+        check=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    return result.stdout
+
+
+def head_commit(repo_dir: str) -> Optional[str]:
+    try:
+        return run_git("rev-parse", "HEAD", cwd=repo_dir).strip()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+
+def has_commit(repo_dir: str, commit: str) -> bool:
+    try:
+        run_git("cat-file", "-e", f"{commit}^{{commit}}", cwd=repo_dir)
+        return True
+    except subprocess.CalledProcessError:
+        return False
+
+
+def changed_files(
+    repo_dir: str, base: str, head: str, relative: bool = True
+) -> Optional[Set[str]]:
+    # Returns the paths added, modified or deleted between the two commits
+    # (relative to repo_dir unless relative is False, e.g. for bare
+    # repositories), or None when the base commit is not available
+    if not has_commit(repo_dir, base):
+        return None
+    args = ["diff", "--name-only", "--no-renames"]
+    if relative:
+        args.append("--relative")
+    output = run_git(*args, base, head, cwd=repo_dir)
+    return {line for line in output.splitlines() if line}
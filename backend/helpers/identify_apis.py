@@ -1,19 +1,33 @@
-import os
 import re
+from backend.helpers.file_walker import IgnoreFilter, read_if_matches
+from backend.helpers.route_queries import CANDIDATES
+from backend.helpers.route_queries import extract_routes as query_routes
+from backend.helpers.route_queries import language_for_file
+
+SOURCE_EXTENSIONS = (".py", ".js", ".ts", ".jsx", ".tsx", ".rs")
+
+FRAMEWORK_PATTERNS = {
+    "flask": r"from\s+flask\s+import",
+    "django": r"from\s+django\s+import",
+    "fastapi": r"from\s+fastapi\s+import",
+    "express": r"express\(\s*\)",
+    "react": r"import\s+React",
+    "angular": r"@angular/core",
+    "vue": r"new\s+Vue\(",
+}
+
+# One scan over the raw bytes for any framework marker or route candidate;
+# a file without a hit can produce neither a framework nor a route
+MARKERS = re.compile(
+    b"|".join(
+        [pattern.encode() for pattern in FRAMEWORK_PATTERNS.values()]
+        + sorted({pattern.pattern for pattern in CANDIDATES.values()})
+    )
+)
 
 
 def identify_framework(file_content):
-    frameworks = {
-        "flask": r"from\s+flask\s+import",
-        "django": r"from\s+django\s+import",
-        "fastapi": r"from\s+fastapi\s+import",
-        "express": r"express\(\s*\)",
-        "react": r"import\s+React",
-        "angular": r"@angular/core",
-        "vue": r"new\s+Vue\(",
-    }
-
-    for framework, pattern in frameworks.items():
+    for framework, pattern in FRAMEWORK_PATTERNS.items():
         if re.search(pattern, file_content):
             return framework
     return "Unknown"
@@ -39,29 +53,67 @@ def extract_routes(file_content, framework):
     return routes
 
 
+def _regex_routes(file_content, framework):
+    # Same shape as the query engine's routes, without positions
+    routes = []
+    for route in extract_routes(file_content, framework):
+        if isinstance(route, tuple):
+            method, path = route
+        else:
+            method, path = "any", route
+        if framework in ["react", "angular", "vue"]:
+            method = "get"
+        routes.append(
+            {
+                "framework": framework,
+                "method": method,
+                "path": path,
+                "handler": None,
+                "start_byte": None,
+                "end_byte": None,
+                "start_line": None,
+                "end_line": None,
+            }
+        )
+    return routes
+
+
 def analyze_file(file_path):
-    with open(file_path, "r") as file:
-        content = file.read()
-        framework = identify_framework(content)
-        routes = extract_routes(content, framework)
-        return framework, routes
+    data = read_if_matches(file_path, MARKERS)
+    if data is None:
+        return "Unknown", []
+    content = data.decode("utf8")
+    framework = identify_framework(content)
+    language = language_for_file(file_path)
+    # One tree-sitter parse per file; the line regexes are only used when no
+    # grammar is available for the language
+    routes = query_routes(content, language) if language else None
+    if routes is None:
+        routes = _regex_routes(content, framework)
+    elif framework == "Unknown" and routes:
+        framework = routes[0]["framework"]
+    return framework, routes
 
 
-def analyze_directory(directory):
+def analyze_directory(directory, stats=None):
+    # stats, when given, receives the walker's ignore counts and the number
+    # of files with neither a framework nor a route ("files_skipped"), most
+    # of which the marker prefilter rejects without decoding them
+    stats = {} if stats is None else stats
     results = {}
-    for root, dirs, files in os.walk(directory):
-        for file in files:
-            if file.endswith((".py", ".js", ".ts", ".jsx", ".tsx")):
-                file_path = os.path.join(root, file)
-                framework, routes = analyze_file(file_path)
-                if framework != "Unknown" or routes:
-                    results[file_path] = {"framework": framework, "routes": routes}
+    for file_path in IgnoreFilter(directory).walk(SOURCE_EXTENSIONS, stats):
+        framework, routes = analyze_file(file_path)
+        if framework != "Unknown" or routes:
+            results[file_path] = {"framework": framework, "routes": routes}
+        else:
+            stats["files_skipped"] = stats.get("files_skipped", 0) + 1
     return results
 
 
 def main():
     directory = input("Enter the directory path to analyze: ")
-    results = analyze_directory(directory)
+    stats = {}
+    results = analyze_directory(directory, stats)
 
     for file_path, data in results.items():
         print(f"\nFile: {file_path}")
@@ -69,10 +121,18 @@ def main():
         if data["routes"]:
             print("Routes/API endpoints:")
             for route in data["routes"]:
-                print(f"  - {route}")
+                line = route["start_line"]
+                location = f" (line {line})" if line else ""
+                print(f"  - {route['method'].upper()} {route['path']}{location}")
         else:
             print("No routes/API endpoints found.")
 
+    print(
+        f"\nIgnored {stats.get('files_ignored', 0)} files and "
+        f"{stats.get('dirs_ignored', 0)} directories, "
+        f"{stats.get('files_skipped', 0)} files had no framework or routes"
+    )
+
 
 if __name__ == "__main__":
     main()
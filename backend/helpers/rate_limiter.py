@@ -0,0 +1,33 @@
+import threading
+import time
+from functools import lru_cache
+from typing import Optional
+
+from backend import config
+
+
+class RateLimiter:
+    def __init__(self, requests_per_minute: float):
+        if requests_per_minute <= 0:
+            raise ValueError("requests_per_minute must be positive")
+        self.interval = 60.0 / requests_per_minute
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def acquire(self):
+        # Reserve the next free slot, then sleep outside the lock until it arrives
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+@lru_cache(maxsize=None)
+def get_enrichment_rate_limiter() -> Optional[RateLimiter]:
+    # Shared by the enrichment phase of every analysis in the process
+    if not config.ENRICH_REQUESTS_PER_MINUTE:
+        return None
+    return RateLimiter(config.ENRICH_REQUESTS_PER_MINUTE)
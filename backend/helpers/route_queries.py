@@ -0,0 +1,249 @@
+import os
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from backend.helpers.tree_sitter_utils import LanguageLoader, ParserFactory, logger
+
+LANGUAGE_EXTENSIONS = {
+    ".py": "python",
+    ".js": "javascript",
+    ".jsx": "javascript",
+    ".ts": "typescript",
+    ".tsx": "tsx",
+    ".rs": "rust",
+}
+
+HTTP_METHODS = {"get", "post", "put", "patch", "delete", "head", "options"}
+# JS receivers whose .get()/.post() calls are outgoing requests, not routes
+HTTP_CLIENTS = {"axios", "http", "$http", "superagent", "ky"}
+
+# Patterns are (kind, query) pairs; the kind tells extract_routes how to turn
+# a match into a route. Captures: @route spans the whole route, @method,
+# @path, @handler and @router are read when present.
+_JS_PATTERNS = [
+    (
+        "member_call",
+        """
+        (call_expression
+          function: (member_expression
+            object: (_) @router
+            property: (property_identifier) @method)
+          arguments: (arguments . [(string) (template_string)] @path)) @route
+        """,
+    ),
+    (
+        "client_call",
+        """
+        (call_expression
+          function: (identifier) @router
+          arguments: (arguments . [(string) (template_string)] @path)
+          (#match? @router "^(fetch|axios)$")) @route
+        """,
+    ),
+]
+
+QUERIES = {
+    "python": [
+        (
+            "decorator",
+            """
+            (decorated_definition
+              (decorator
+                (call
+                  function: (attribute
+                    object: (_) @router
+                    attribute: (identifier) @method)
+                  arguments: (argument_list . (string) @path) @arguments))
+              definition: (function_definition name: (identifier) @handler)) @route
+            """,
+        ),
+        (
+            "django",
+            """
+            (call
+              function: (identifier) @method
+              arguments: (argument_list . (string) @path)
+              (#match? @method "^(path|re_path|url)$")) @route
+            """,
+        ),
+    ],
+    "javascript": _JS_PATTERNS,
+    "typescript": _JS_PATTERNS,
+    "tsx": _JS_PATTERNS,
+    "rust": [
+        (
+            "rust_route",
+            """
+            (call_expression
+              function: (field_expression field: (field_identifier) @router)
+              arguments: (arguments . (string_literal) @path . (_) @handler)
+              (#eq? @router "route")) @route
+            """,
+        ),
+        (
+            "actix_macro",
+            """
+            ((attribute_item
+               (attribute
+                 (identifier) @method
+                 arguments: (token_tree . (string_literal) @path))) @route
+             .
+             (function_item name: (identifier) @handler))
+            """,
+        ),
+    ],
+}
+
+# Cheap scan for anything a query could match; files without a hit are not
+# parsed at all, which is most of the files in a large codebase
+CANDIDATES = {
+    "python": re.compile(
+        rb"@[\w.]+\.(?:route|get|post|put|patch|delete|head|options)\s*\("
+        rb"|\b(?:re_path|path|url)\s*\("
+    ),
+    "javascript": re.compile(
+        rb"\.(?:get|post|put|patch|delete|head|options|all)\s*\("
+        rb"|\b(?:fetch|axios)\s*\("
+    ),
+    "rust": re.compile(
+        rb"\.route\s*\(|#\[\s*(?:get|post|put|patch|delete|head|options)\s*\("
+    ),
+}
+CANDIDATES["typescript"] = CANDIDATES["tsx"] = CANDIDATES["javascript"]
+
+_METHOD_CALL = re.compile(r"\b(get|post|put|patch|delete|head|options)\s*\(")
+_STRING_PREFIX = re.compile(r"^[rRbBuUfF]*")
+
+
+def language_for_file(file_path: str) -> Optional[str]:
+    return LANGUAGE_EXTENSIONS.get(os.path.splitext(file_path)[1])
+
+
+@lru_cache(maxsize=None)
+def get_query(language: str):
+    # Compiled once per language; None when the grammar cannot be loaded, so
+    # callers fall back to the regex extractor without retrying every file
+    try:
+        lang = LanguageLoader.load_language(language)
+        source = "\n".join(query for _, query in QUERIES[language])
+        return lang.query(source)
+    except Exception as e:
+        logger.warning(f"Route queries unavailable for {language}: {str(e)}")
+        return None
+
+
+def _node(capture):
+    # py-tree-sitter returns a node per capture before 0.23, a list after
+    if isinstance(capture, list):
+        return capture[0] if capture else None
+    return capture
+
+
+def _text(node) -> str:
+    return node.text.decode("utf8")
+
+
+def _literal(node) -> str:
+    text = _STRING_PREFIX.sub("", _text(node))
+    for quote in ('"""', "'''", '"', "'", "`"):
+        if (
+            len(text) >= 2 * len(quote)
+            and text.startswith(quote)
+            and text.endswith(quote)
+        ):
+            return text[len(quote) : -len(quote)]
+    return text
+
+
+def _flask_methods(arguments) -> List[str]:
+    for argument in arguments.named_children:
+        if argument.type != "keyword_argument":
+            continue
+        name = argument.child_by_field_name("name")
+        value = argument.child_by_field_name("value")
+        if name is not None and _text(name) == "methods" and value is not None:
+            return [
+                _literal(item).lower()
+                for item in value.named_children
+                if item.type == "string"
+            ]
+    return ["get"]
+
+
+def _routes_from_match(kind: str, captures: Dict[str, Any]) -> List[Dict[str, Any]]:
+    nodes = {name: _node(capture) for name, capture in captures.items()}
+    if nodes.get("route") is None or nodes.get("path") is None:
+        # py-tree-sitter 0.22 still reports a match whose #match?/#eq?
+        # predicate failed, only with its captures left out
+        return []
+    route, path = nodes["route"], _literal(nodes["path"])
+    method = _text(nodes["method"]).lower() if nodes.get("method") else None
+    handler = _text(nodes["handler"]) if nodes.get("handler") else None
+
+    if kind == "decorator":
+        if method == "route":
+            pairs = [("flask", m) for m in _flask_methods(nodes["arguments"])]
+        elif method in HTTP_METHODS:
+            pairs = [("fastapi", method)]
+        else:
+            return []
+    elif kind == "django":
+        pairs, handler = [("django", "any")], None
+    elif kind == "member_call":
+        if method not in HTTP_METHODS | {"all"}:
+            return []
+        if _text(nodes["router"]) in HTTP_CLIENTS:
+            pairs = [("frontend", method)]
+        elif path.startswith(("/", "*")):
+            pairs = [("express", method)]
+        else:
+            # Map.get("key") and the like
+            return []
+    elif kind == "client_call":
+        pairs = [("frontend", "get")]
+    elif kind == "rust_route":
+        handler_text = _text(nodes["handler"])
+        framework = "actix" if "web::" in handler_text else "axum"
+        pairs = [(framework, m) for m in _METHOD_CALL.findall(handler_text)]
+        pairs = pairs or [(framework, "any")]
+        handler = None
+    elif kind == "actix_macro":
+        if method not in HTTP_METHODS:
+            return []
+        pairs = [("actix", method)]
+    else:
+        return []
+
+    return [
+        {
+            "framework": framework,
+            "method": route_method,
+            "path": path,
+            "handler": handler,
+            "start_byte": route.start_byte,
+            "end_byte": route.end_byte,
+            "start_line": route.start_point[0] + 1,
+            "end_line": route.end_point[0] + 1,
+        }
+        for framework, route_method in pairs
+    ]
+
+
+def extract_routes(code: str, language: str) -> Optional[List[Dict[str, Any]]]:
+    # Routes and client API calls in one parse of code, ordered by position.
+    # Returns None when no query engine is available for the language.
+    query = get_query(language) if language in QUERIES else None
+    if query is None:
+        return None
+    code_bytes = code.encode("utf8")
+    if not CANDIDATES[language].search(code_bytes):
+        return []
+    tree = ParserFactory.get_parser(language).parse(code_bytes)
+    kinds = [kind for kind, _ in QUERIES[language]]
+
+    routes = []
+    for pattern_index, captures in query.matches(tree.root_node):
+        routes.extend(_routes_from_match(kinds[pattern_index], captures))
+    routes.sort(key=lambda route: (route["start_byte"], route["method"]))
+    return routes
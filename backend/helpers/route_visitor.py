@@ -0,0 +1,168 @@
+import ast
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List
+
+from backend.helpers.file_walker import read_if_matches
+from backend.helpers.static_views import extract_class_operations
+
+# Bump whenever scan_file's output changes so indexed results are not reused
+EXTRACTOR_VERSION = "2"
+
+# Checked in this order, matching the precedence of the old regex table
+FRAMEWORK_MODULES = ("flask", "django", "fastapi")
+FASTAPI_METHODS = ("get", "post", "put", "delete")
+FLASK_DEFAULT_METHODS = ["GET"]
+
+# Anything scan_file can turn into a route or operation: a framework import,
+# an APIRouter class attribute or a *View / *ViewSet base class. Files with
+# none of these are rejected on their raw bytes, before decoding and parsing.
+SOURCE_MARKERS = re.compile(
+    rb"from\s+(?:flask|django|fastapi)\s+import|APIRouter|View(?:Set)?\s*[,)]"
+)
+
+
+class RouteVisitor(ast.NodeVisitor):
+    # Collects framework imports, decorated route handlers and class
+    # definitions of a module in a single pass over its AST
+
+    def __init__(self):
+        self.imports = set()
+        self.flask_routes: List[Dict[str, Any]] = []
+        self.fastapi_routes: List[Dict[str, Any]] = []
+        self.classes: List[ast.ClassDef] = []
+
+    @property
+    def framework(self) -> str:
+        for framework in FRAMEWORK_MODULES:
+            if framework in self.imports:
+                return framework
+        return "Unknown"
+
+    @property
+    def routes(self) -> List[Dict[str, Any]]:
+        if self.framework == "flask":
+            return self.flask_routes
+        if self.framework == "fastapi":
+            return self.fastapi_routes
+        return []
+
+    def visit_ImportFrom(self, node: ast.ImportFrom):
+        if node.level == 0 and node.module in FRAMEWORK_MODULES:
+            self.imports.add(node.module)
+
+    def visit_ClassDef(self, node: ast.ClassDef):
+        self.classes.append(node)
+        self.generic_visit(node)
+
+    def visit_FunctionDef(self, node: ast.FunctionDef):
+        self._collect_routes(node)
+        self.generic_visit(node)
+
+    def visit_AsyncFunctionDef(self, node: ast.AsyncFunctionDef):
+        self._collect_routes(node)
+        self.generic_visit(node)
+
+    def _collect_routes(self, node):
+        for decorator in node.decorator_list:
+            if not (
+                isinstance(decorator, ast.Call)
+                and isinstance(decorator.func, ast.Attribute)
+            ):
+                continue
+            route = _string_arg(decorator)
+            if route is None:
+                continue
+
+            attr = decorator.func.attr
+            if attr == "route" and isinstance(node, ast.FunctionDef):
+                methods = FLASK_DEFAULT_METHODS
+                for keyword in decorator.keywords:
+                    if keyword.arg == "methods" and isinstance(
+                        keyword.value, (ast.List, ast.Tuple)
+                    ):
+                        methods = [
+                            elt.value
+                            for elt in keyword.value.elts
+                            if isinstance(elt, ast.Constant)
+                        ]
+                for method in methods:
+                    self.flask_routes.append(_route(route, method, node))
+            elif attr in FASTAPI_METHODS:
+                self.fastapi_routes.append(_route(route, attr, node))
+
+
+def _string_arg(decorator: ast.Call):
+    if decorator.args and isinstance(decorator.args[0], ast.Constant):
+        if isinstance(decorator.args[0].value, str):
+            return decorator.args[0].value
+    return None
+
+
+def _route(route: str, method: str, node) -> Dict[str, Any]:
+    return {
+        "route": route,
+        "method": method,
+        "function_name": node.name,
+        "node": node,
+    }
+
+
+def scan_source(content: str) -> RouteVisitor:
+    visitor = RouteVisitor()
+    visitor.visit(ast.parse(content))
+    return visitor
+
+
+def scan_file(file_path: str) -> Dict[str, Any]:
+    # Picklable summary of a file: route records carry the handler source
+    # instead of the AST node so they can cross process boundaries, and
+    # class-based routes are resolved statically into finished operations.
+    # "skipped" is set when the prefilter rejected the file unparsed.
+    start = time.perf_counter()
+    data = read_if_matches(file_path, SOURCE_MARKERS)
+    if data is None:
+        return {
+            "framework": "Unknown",
+            "routes": [],
+            "operations": [],
+            "skipped": True,
+            "bytes": os.path.getsize(file_path),
+            "seconds": time.perf_counter() - start,
+        }
+
+    scan = scan_source(data.decode("utf8"))
+    routes = []
+    for route in scan.routes:
+        record = {key: value for key, value in route.items() if key != "node"}
+        record["content"] = ast.unparse(route["node"])
+        record["lineno"] = route["node"].lineno
+        record["end_lineno"] = route["node"].end_lineno
+        routes.append(record)
+    return {
+        "framework": scan.framework,
+        "routes": routes,
+        "operations": [
+            operation
+            for node in scan.classes
+            for operation in extract_class_operations(node)
+        ],
+        "skipped": False,
+        "bytes": len(data),
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def scan_files(file_paths: List[str], workers: int = None) -> Iterator[Dict[str, Any]]:
+    # Yields scan_file results in the order of file_paths, fanning the work
+    # out to a process pool when more than one worker is requested
+    if not workers or workers <= 1 or len(file_paths) < 2:
+        for file_path in file_paths:
+            yield scan_file(file_path)
+        return
+
+    chunksize = max(1, min(64, len(file_paths) // (workers * 8)))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(scan_file, file_paths, chunksize=chunksize)
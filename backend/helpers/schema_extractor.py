@@ -0,0 +1,581 @@
+import ast
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from backend.helpers.symbol_index import SymbolIndex
+
+REF_PREFIX = "#/components/schemas/"
+
+# Annotation names (last dotted part) with a fixed schema
+SCALARS = {
+    "int": {"type": "integer"},
+    "float": {"type": "number"},
+    "Decimal": {"type": "number"},
+    "str": {"type": "string"},
+    "bool": {"type": "boolean"},
+    "bytes": {"type": "string", "format": "binary"},
+    "datetime": {"type": "string", "format": "date-time"},
+    "date": {"type": "string", "format": "date"},
+    "time": {"type": "string", "format": "time"},
+    "UUID": {"type": "string", "format": "uuid"},
+    "EmailStr": {"type": "string", "format": "email"},
+    "HttpUrl": {"type": "string", "format": "uri"},
+    "AnyUrl": {"type": "string", "format": "uri"},
+    "AnyHttpUrl": {"type": "string", "format": "uri"},
+    "UploadFile": {"type": "string", "format": "binary"},
+    "Any": {},
+    "dict": {"type": "object"},
+    "Dict": {"type": "object"},
+    "list": {"type": "array", "items": {}},
+    "List": {"type": "array", "items": {}},
+}
+ARRAYS = {
+    "List",
+    "list",
+    "Sequence",
+    "Set",
+    "set",
+    "FrozenSet",
+    "frozenset",
+    "Iterable",
+    "Tuple",
+    "tuple",
+}
+MAPPINGS = {"Dict", "dict", "Mapping", "MutableMapping"}
+MODEL_BASES = {"BaseModel", "BaseSettings", "SQLModel", "TypedDict", "GenericModel"}
+ENUM_BASES = {"Enum", "IntEnum", "StrEnum", "IntFlag", "Flag"}
+# Handler parameters FastAPI fills in itself
+INJECTED_TYPES = {
+    "Request",
+    "Response",
+    "WebSocket",
+    "BackgroundTasks",
+    "HTTPConnection",
+    "SecurityScopes",
+}
+# Parameter defaults naming where a value comes from
+PARAM_SOURCES = {
+    "Query": "query",
+    "Path": "path",
+    "Header": "header",
+    "Cookie": "cookie",
+    "Body": "body",
+    "Form": "form",
+    "File": "file",
+}
+# Request body media type per body source; form fields are always sent as
+# an object, and any file among them makes it multipart
+BODY_MEDIA_TYPES = {
+    "body": "application/json",
+    "form": "application/x-www-form-urlencoded",
+    "file": "multipart/form-data",
+}
+DEPENDENCIES = {"Depends", "Security"}
+# Field(...) / Query(...) keywords copied into the schema
+FIELD_KEYWORDS = {
+    "title": "title",
+    "description": "description",
+    "example": "example",
+    "max_length": "maxLength",
+    "min_length": "minLength",
+    "ge": "minimum",
+    "le": "maximum",
+    "gt": "exclusiveMinimum",
+    "lt": "exclusiveMaximum",
+    "regex": "pattern",
+    "pattern": "pattern",
+    "max_items": "maxItems",
+    "min_items": "minItems",
+}
+
+
+def _name(node: ast.AST) -> str:
+    # Dotted name of a Name/Attribute chain, "" for anything else
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        base = _name(node.value)
+        return f"{base}.{node.attr}" if base else ""
+    return ""
+
+
+def _last(node: ast.AST) -> str:
+    return _name(node).rpartition(".")[2]
+
+
+def _constant(node: ast.AST):
+    # (True, value) for literals, (False, None) otherwise
+    try:
+        return True, ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        return False, None
+
+
+def _nullable(schema: Dict[str, Any]) -> Dict[str, Any]:
+    if "$ref" in schema:
+        return {"allOf": [schema], "nullable": True}
+    return dict(schema, nullable=True)
+
+
+def _field_keywords(call: ast.Call) -> Dict[str, Any]:
+    schema = {}
+    for keyword in call.keywords:
+        if keyword.arg in FIELD_KEYWORDS:
+            known, value = _constant(keyword.value)
+            if known:
+                schema[FIELD_KEYWORDS[keyword.arg]] = value
+    if "exclusiveMinimum" in schema:
+        schema["minimum"] = schema["exclusiveMinimum"]
+        schema["exclusiveMinimum"] = True
+    if "exclusiveMaximum" in schema:
+        schema["maximum"] = schema["exclusiveMaximum"]
+        schema["exclusiveMaximum"] = True
+    return schema
+
+
+def _field_default(call: ast.Call):
+    # (required, has_literal_default, default) of a Field(...)-style call
+    default = call.args[0] if call.args else None
+    for keyword in call.keywords:
+        if keyword.arg == "default":
+            default = keyword.value
+        elif keyword.arg == "default_factory":
+            return False, False, None
+    if default is None or (
+        isinstance(default, ast.Constant) and default.value is Ellipsis
+    ):
+        return True, False, None
+    known, value = _constant(default)
+    return False, known, value
+
+
+def _title(name: str) -> str:
+    return " ".join(part.capitalize() for part in name.split("_") if part)
+
+
+def referenced_schemas(value: Any, schemas: Dict[str, Dict[str, Any]]) -> Set[str]:
+    # Names of the components value uses, directly or through other
+    # components in schemas
+    used: Set[str] = set()
+    pending = [value]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, dict):
+            ref = node.get("$ref")
+            if isinstance(ref, str) and ref.startswith(REF_PREFIX):
+                name = ref[len(REF_PREFIX) :]
+                if name not in used:
+                    used.add(name)
+                    pending.append(schemas.get(name))
+            pending.extend(node.values())
+        elif isinstance(node, list):
+            pending.extend(node)
+    return used
+
+
+class SchemaExtractor:
+    # Builds OpenAPI schemas from source alone: Pydantic models, dataclasses,
+    # TypedDicts and enums become components (one per class, shared through
+    # $ref by every operation that uses it), and typed FastAPI handlers
+    # become whole operations
+
+    def __init__(self, index: SymbolIndex):
+        self.index = index
+        # component name -> schema, ready for components.schemas
+        self.schemas: Dict[str, Dict[str, Any]] = {}
+        # (module, class) -> component name
+        self._components: Dict[Tuple[str, str], str] = {}
+
+    def annotation_schema(
+        self, module: str, node: Optional[ast.AST]
+    ) -> Optional[Dict[str, Any]]:
+        # The schema of a type annotation used in module, or None when part
+        # of it cannot be resolved statically
+        if node is None:
+            return None
+        if isinstance(node, ast.Constant):
+            if node.value is None:
+                return {"nullable": True}
+            if isinstance(node.value, str):
+                # Forward reference
+                try:
+                    node = ast.parse(node.value, mode="eval").body
+                except SyntaxError:
+                    return None
+                return self.annotation_schema(module, node)
+            return None
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.BitOr):
+            return self._union(module, [node.left, node.right])
+        if isinstance(node, ast.Subscript):
+            return self._generic(module, node)
+        name = _name(node)
+        if not name:
+            return None
+        resolved = self.index.resolve(module, name)
+        if resolved is not None and resolved[2]["kind"] == "class":
+            return self._class_schema(*resolved)
+        if name.rpartition(".")[2] in SCALARS:
+            return dict(SCALARS[name.rpartition(".")[2]])
+        return None
+
+    def _generic(self, module: str, node: ast.Subscript) -> Optional[Dict[str, Any]]:
+        origin = _last(node.value)
+        arguments = node.slice
+        arguments = arguments.elts if isinstance(arguments, ast.Tuple) else [arguments]
+        if origin == "Optional":
+            schema = self.annotation_schema(module, arguments[0])
+            return _nullable(schema) if schema is not None else None
+        if origin == "Union":
+            return self._union(module, arguments)
+        if origin == "Annotated":
+            return self.annotation_schema(module, arguments[0])
+        if origin == "Literal":
+            values = [_constant(argument) for argument in arguments]
+            if not all(known for known, _ in values):
+                return None
+            values = [value for _, value in values]
+            kinds = {type(value) for value in values}
+            schema = {"enum": values}
+            if kinds == {str}:
+                schema["type"] = "string"
+            elif kinds <= {int, bool}:
+                schema["type"] = "integer" if kinds == {int} else "boolean"
+            return schema
+        if origin in ARRAYS:
+            items = arguments[0]
+            if origin in ("Tuple", "tuple") and len(arguments) == 2:
+                if not (
+                    isinstance(arguments[1], ast.Constant)
+                    and arguments[1].value is Ellipsis
+                ):
+                    items = None
+            elif origin in ("Tuple", "tuple") and len(arguments) > 1:
+                items = None
+            schema = self.annotation_schema(module, items) if items else {}
+            if schema is None:
+                return None
+            array = {"type": "array", "items": schema}
+            if origin in ("Set", "set", "FrozenSet", "frozenset"):
+                array["uniqueItems"] = True
+            return array
+        if origin in MAPPINGS:
+            values = (
+                self.annotation_schema(module, arguments[1])
+                if len(arguments) == 2
+                else {}
+            )
+            if values is None:
+                return None
+            return {"type": "object", "additionalProperties": values}
+        return None
+
+    def _union(self, module: str, members: List[ast.AST]) -> Optional[Dict[str, Any]]:
+        nullable = False
+        schemas = []
+        for member in members:
+            if isinstance(member, ast.Constant) and member.value is None:
+                nullable = True
+                continue
+            if _name(member) in ("None", "NoneType"):
+                nullable = True
+                continue
+            schema = self.annotation_schema(module, member)
+            if schema is None:
+                return None
+            schemas.append(schema)
+        if not schemas:
+            return {"nullable": True}
+        schema = schemas[0] if len(schemas) == 1 else {"anyOf": schemas}
+        return _nullable(schema) if nullable else schema
+
+    def _class_schema(
+        self, module: str, name: str, definition: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        key = (module, name)
+        if key in self._components:
+            return {"$ref": REF_PREFIX + self._components[key]}
+        node = ast.parse(definition["source"]).body[0]
+        kind = self._class_kind(module, node)
+        if kind is None:
+            return None
+        component = name
+        if component in self.schemas:
+            # Same class name in another module
+            component = f"{module}.{name}"
+        # Registered before the fields are read, so self-references resolve
+        self._components[key] = component
+        self.schemas[component] = {}
+        if kind == "enum":
+            schema = self._enum_schema(node)
+        else:
+            schema = self._model_schema(module, node)
+        self.schemas[component] = schema
+        return {"$ref": REF_PREFIX + component}
+
+    def _class_kind(self, module: str, node: ast.ClassDef) -> Optional[str]:
+        for decorator in node.decorator_list:
+            target = decorator.func if isinstance(decorator, ast.Call) else decorator
+            if _last(target) == "dataclass":
+                return "model"
+        for base in node.bases:
+            base_name = _last(base)
+            if base_name in ENUM_BASES:
+                return "enum"
+            if base_name in MODEL_BASES:
+                return "model"
+            resolved = self.index.resolve(module, _name(base))
+            if resolved is not None and resolved[2]["kind"] == "class":
+                base_node = ast.parse(resolved[2]["source"]).body[0]
+                base_kind = self._class_kind(resolved[0], base_node)
+                if base_kind is not None:
+                    return base_kind
+        return None
+
+    def _enum_schema(self, node: ast.ClassDef) -> Dict[str, Any]:
+        values = []
+        for statement in node.body:
+            if isinstance(statement, ast.Assign):
+                known, value = _constant(statement.value)
+                if known:
+                    values.append(value)
+        schema = {"title": node.name, "enum": values}
+        kinds = {type(value) for value in values}
+        if kinds == {str}:
+            schema["type"] = "string"
+        elif kinds == {int}:
+            schema["type"] = "integer"
+        return schema
+
+    def _model_schema(self, module: str, node: ast.ClassDef) -> Dict[str, Any]:
+        properties, required = {}, []
+        # Fields of models in the repository that this one extends come first
+        for base in node.bases:
+            resolved = self.index.resolve(module, _name(base))
+            if resolved is None or resolved[2]["kind"] != "class":
+                continue
+            base_schema = self._class_schema(*resolved)
+            if base_schema is None:
+                continue
+            inherited = self.schemas.get(base_schema["$ref"][len(REF_PREFIX) :], {})
+            properties.update(inherited.get("properties", {}))
+            required.extend(inherited.get("required", []))
+
+        for statement in node.body:
+            if not (
+                isinstance(statement, ast.AnnAssign)
+                and isinstance(statement.target, ast.Name)
+            ):
+                continue
+            field = statement.target.id
+            if field.startswith("_") or _last(statement.annotation) == "ClassVar":
+                continue
+            schema = self.annotation_schema(module, statement.annotation)
+            schema = dict(schema) if schema is not None else {}
+            is_required = statement.value is None
+            value = statement.value
+            if isinstance(value, ast.Call) and _last(value.func) in ("Field", "field"):
+                is_required, has_default, default = _field_default(value)
+                schema.update(_field_keywords(value))
+                if has_default and default is not None:
+                    schema["default"] = default
+            elif value is not None:
+                known, default = _constant(value)
+                if known and default is not None:
+                    schema["default"] = default
+            if "$ref" in schema and len(schema) > 1:
+                schema = {"allOf": [{"$ref": schema.pop("$ref")}], **schema}
+            properties[field] = schema
+            if is_required and field not in required:
+                required.append(field)
+            elif not is_required and field in required:
+                required.remove(field)
+
+        schema = {"title": node.name, "type": "object", "properties": properties}
+        if required:
+            schema["required"] = required
+        return schema
+
+    def operation(
+        self, file_path: str, route_info: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        # {"operation": ..., "typed": bool} for a FastAPI handler. typed means
+        # every parameter and the response have a static schema, so the
+        # operation is complete without asking the LLM.
+        try:
+            handler = ast.parse(route_info["content"]).body[0]
+        except (SyntaxError, IndexError):
+            return None
+        if not isinstance(handler, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            return None
+        module = self.index.module_name(file_path)
+        decorator = self._route_decorator(handler, route_info)
+        typed = True
+        path_params = set(re.findall(r"{([^}:]+)(?::[^}]*)?}", route_info["route"]))
+
+        parameters, body_fields = [], []
+        args = handler.args
+        positional = args.posonlyargs + args.args
+        defaults = [None] * (len(positional) - len(args.defaults)) + args.defaults
+        candidates = list(zip(positional, defaults)) + list(
+            zip(args.kwonlyargs, args.kw_defaults)
+        )
+        for arg, default in candidates:
+            if arg.arg in ("self", "cls") or (
+                arg.annotation is not None
+                and _last(arg.annotation) in INJECTED_TYPES
+            ):
+                continue
+            source = None
+            keywords: Dict[str, Any] = {}
+            required = default is None
+            default_value = None
+            if isinstance(default, ast.Call):
+                function = _last(default.func)
+                if function in DEPENDENCIES:
+                    continue
+                if function in PARAM_SOURCES:
+                    source = PARAM_SOURCES[function]
+                    required, has_default, default_value = _field_default(default)
+                    if not has_default:
+                        default_value = None
+                    keywords = _field_keywords(default)
+                    for keyword in default.keywords:
+                        if keyword.arg == "alias":
+                            known, alias = _constant(keyword.value)
+                            if known and alias:
+                                keywords["alias"] = alias
+            elif default is not None:
+                _, default_value = _constant(default)
+
+            schema = self.annotation_schema(module, arg.annotation)
+            if schema is None:
+                typed = False
+                schema = {"type": "string"}
+            schema = dict(schema)
+            alias = keywords.pop("alias", None)
+            schema.update(keywords)
+            if default_value is not None:
+                schema["default"] = default_value
+            if source is None:
+                if arg.arg in path_params:
+                    source = "path"
+                elif arg.annotation is not None and any(
+                    _last(node) == "UploadFile" for node in ast.walk(arg.annotation)
+                ):
+                    source = "file"
+                elif self._is_body(schema):
+                    source = "body"
+                else:
+                    source = "query"
+            if source in BODY_MEDIA_TYPES:
+                body_fields.append((arg.arg, schema, required, source))
+                continue
+            if source == "path":
+                required = True
+                path_params.discard(arg.arg)
+            parameters.append(
+                {
+                    "name": alias or arg.arg,
+                    "in": source,
+                    "required": required,
+                    "schema": schema,
+                }
+            )
+        for name in sorted(path_params):
+            # Declared by the route but not by the handler
+            parameters.append(
+                {"name": name, "in": "path", "required": True, "schema": {}}
+            )
+
+        operation = {
+            "summary": _title(handler.name),
+            "operationId": handler.name,
+        }
+        docstring = ast.get_docstring(handler)
+        if docstring:
+            operation["description"] = docstring
+        if parameters:
+            operation["parameters"] = parameters
+        if body_fields:
+            operation["requestBody"] = self._request_body(body_fields)
+
+        status_code, response_schema, declared = "200", None, False
+        if decorator is not None:
+            for keyword in decorator.keywords:
+                if keyword.arg == "response_model":
+                    declared = True
+                    if not (
+                        isinstance(keyword.value, ast.Constant)
+                        and keyword.value.value is None
+                    ):
+                        response_schema = self.annotation_schema(module, keyword.value)
+                        if response_schema is None:
+                            typed = False
+                elif keyword.arg == "status_code":
+                    status_code = self._status_code(keyword.value) or status_code
+        if not declared:
+            response_schema = self.annotation_schema(module, handler.returns)
+            if response_schema is None:
+                typed = False
+        response = {"description": "Successful Response"}
+        if response_schema is not None:
+            response["content"] = {"application/json": {"schema": response_schema}}
+        operation["responses"] = {status_code: response}
+        return {"operation": operation, "typed": typed}
+
+    @staticmethod
+    def _route_decorator(handler, route_info) -> Optional[ast.Call]:
+        for decorator in handler.decorator_list:
+            if (
+                isinstance(decorator, ast.Call)
+                and isinstance(decorator.func, ast.Attribute)
+                and decorator.func.attr == route_info["method"].lower()
+                and decorator.args
+                and _constant(decorator.args[0]) == (True, route_info["route"])
+            ):
+                return decorator
+        return None
+
+    def _is_body(self, schema: Dict[str, Any]) -> bool:
+        # FastAPI reads model-typed parameters (and lists of them) from the body
+        while "allOf" in schema or schema.get("type") == "array":
+            schema = schema["allOf"][0] if "allOf" in schema else schema["items"]
+        ref = schema.get("$ref", "")
+        component = self.schemas.get(ref[len(REF_PREFIX) :], {})
+        return component.get("type") == "object"
+
+    @staticmethod
+    def _request_body(fields) -> Dict[str, Any]:
+        sources = {source for _, _, _, source in fields}
+        if "file" in sources:
+            media_type = BODY_MEDIA_TYPES["file"]
+        elif "form" in sources:
+            media_type = BODY_MEDIA_TYPES["form"]
+        else:
+            media_type = BODY_MEDIA_TYPES["body"]
+        if len(fields) == 1 and sources == {"body"}:
+            _, schema, required, _ = fields[0]
+        else:
+            # Several body parameters, and form fields, are embedded under
+            # their names
+            schema = {
+                "type": "object",
+                "properties": {name: field for name, field, _, _ in fields},
+            }
+            names = [name for name, _, field_required, _ in fields if field_required]
+            if names:
+                schema["required"] = names
+            required = bool(names)
+        return {
+            "required": required,
+            "content": {media_type: {"schema": schema}},
+        }
+
+    @staticmethod
+    def _status_code(node: ast.AST) -> Optional[str]:
+        known, value = _constant(node)
+        if known and isinstance(value, int):
+            return str(value)
+        # status.HTTP_201_CREATED
+        match = re.match(r"HTTP_(\d{3})", _last(node))
+        return match.group(1) if match else None
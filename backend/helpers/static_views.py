@@ -0,0 +1,163 @@
+import ast
+from typing import Any, Dict, List, Tuple
+
+DJANGO_METHODS = ["get", "post", "put", "delete", "patch"]
+ROUTER_METHODS = ["get", "post", "put", "delete", "patch", "options", "head"]
+
+# Handlers that Django's generic class-based views inherit without defining
+# them in the class body
+DJANGO_GENERIC_METHODS = {
+    "TemplateView": ["get"],
+    "RedirectView": ["get", "post", "put", "delete", "patch"],
+    "ListView": ["get"],
+    "DetailView": ["get"],
+    "ArchiveIndexView": ["get"],
+    "FormView": ["get", "post", "put"],
+    "CreateView": ["get", "post", "put"],
+    "UpdateView": ["get", "post", "put"],
+    "DeleteView": ["get", "post", "delete"],
+}
+
+Operation = Tuple[str, str, Dict[str, Any]]
+
+
+def extract_class_operations(node: ast.ClassDef) -> List[Operation]:
+    # Reads FastAPI router classes and Django class-based views straight from
+    # the AST, without importing the module that defines them
+    prefix = _router_prefix(node)
+    if prefix is not None:
+        return _router_operations(node, prefix)
+    if _is_django_view(node):
+        return _django_view_operations(node)
+    return []
+
+
+def _name(node: ast.AST) -> str:
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    return ""
+
+
+def _string(node: ast.AST):
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    return None
+
+
+def _router_prefix(node: ast.ClassDef):
+    for statement in node.body:
+        if not (
+            isinstance(statement, ast.Assign)
+            and any(_name(target) == "router" for target in statement.targets)
+            and isinstance(statement.value, ast.Call)
+            and _name(statement.value.func) == "APIRouter"
+        ):
+            continue
+        for keyword in statement.value.keywords:
+            if keyword.arg == "prefix":
+                return _string(keyword.value) or ""
+        return ""
+    return None
+
+
+def _router_operations(node: ast.ClassDef, prefix: str) -> List[Operation]:
+    operations = []
+    for handler in node.body:
+        if not isinstance(handler, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        for decorator in handler.decorator_list:
+            if not (
+                isinstance(decorator, ast.Call)
+                and isinstance(decorator.func, ast.Attribute)
+                and _name(decorator.func.value) == "router"
+                and decorator.args
+            ):
+                continue
+            path = _string(decorator.args[0])
+            if path is None:
+                continue
+
+            if decorator.func.attr in ROUTER_METHODS:
+                methods = [decorator.func.attr]
+            elif decorator.func.attr == "api_route":
+                methods = ["get"]
+                for keyword in decorator.keywords:
+                    if keyword.arg == "methods" and isinstance(
+                        keyword.value, (ast.List, ast.Tuple, ast.Set)
+                    ):
+                        methods = [
+                            _string(elt).lower()
+                            for elt in keyword.value.elts
+                            if _string(elt)
+                        ]
+            else:
+                continue
+
+            for method in methods:
+                operations.append(
+                    (
+                        prefix + path,
+                        method,
+                        _operation(handler.name, handler),
+                    )
+                )
+    return operations
+
+
+def _is_django_view(node: ast.ClassDef) -> bool:
+    return any(_name(base).endswith(("View", "ViewSet")) for base in node.bases)
+
+
+def _django_view_operations(node: ast.ClassDef) -> List[Operation]:
+    handlers = {
+        statement.name: statement
+        for statement in node.body
+        if isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef))
+    }
+    inherited = set()
+    for base in node.bases:
+        inherited.update(DJANGO_GENERIC_METHODS.get(_name(base), []))
+
+    path = f"/{node.name.lower()}"
+    operations = []
+    for method in DJANGO_METHODS:
+        if method in handlers:
+            operations.append((path, method, _operation(node.name, handlers[method])))
+        elif method in inherited:
+            operations.append((path, method, _operation(node.name, None)))
+    return operations
+
+
+def _operation(summary: str, handler) -> Dict[str, Any]:
+    return {
+        "summary": summary,
+        "description": (ast.get_docstring(handler) if handler else None) or "",
+        "parameters": _parameters(handler) if handler else [],
+        "responses": {"200": {"description": "Successful Response"}},
+    }
+
+
+def _parameters(handler) -> List[Dict[str, Any]]:
+    args = handler.args
+    positional = args.posonlyargs + args.args
+    # Defaults line up with the last positional arguments
+    defaults = [None] * (len(positional) - len(args.defaults)) + args.defaults
+    candidates = list(zip(positional, defaults)) + list(
+        zip(args.kwonlyargs, args.kw_defaults)
+    )
+
+    params = []
+    for arg, default in candidates:
+        if arg.arg in ["self", "request"]:
+            continue
+        params.append(
+            {
+                "name": arg.arg,
+                "in": "query",
+                "required": default is None,
+                "schema": {"type": "string"},  # Default to string, can be improved
+            }
+        )
+    return params
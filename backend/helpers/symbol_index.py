@@ -0,0 +1,295 @@
+import ast
+import builtins
+import copy
+import os
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.helpers.file_walker import IgnoreFilter
+
+BUILTIN_NAMES = frozenset(dir(builtins))
+# Import chains (re-exports through __init__ files) are followed this deep
+MAX_IMPORT_DEPTH = 8
+
+
+def _estimate_tokens(text: str) -> int:
+    # Same rule as ai_engine.estimate_tokens (~4 characters per token)
+    return len(text) // 4 + 1
+
+
+def references(*nodes: ast.AST) -> List[str]:
+    # Names the nodes use, in first-use order: plain names plus dotted
+    # module.attribute chains (only the longest chain, not its prefixes), so
+    # "schemas.User" can be resolved through an "import schemas"
+    names = []
+    seen = set()
+    inner = set()
+    for node in nodes:
+        for child in ast.walk(node):
+            if id(child) in inner:
+                continue
+            if isinstance(child, ast.Attribute):
+                parts = []
+                value = child
+                while isinstance(value, ast.Attribute):
+                    parts.append(value.attr)
+                    value = value.value
+                    inner.add(id(value))
+                if not isinstance(value, ast.Name):
+                    continue
+                name = ".".join([value.id, *reversed(parts)])
+            elif isinstance(child, ast.Name):
+                name = child.id
+            else:
+                continue
+            if name not in seen and name.split(".")[0] not in BUILTIN_NAMES:
+                seen.add(name)
+                names.append(name)
+    return names
+
+
+def _strip_docstring(node: ast.AST):
+    body = getattr(node, "body", None)
+    if (
+        body
+        and isinstance(body[0], ast.Expr)
+        and isinstance(body[0].value, ast.Constant)
+        and isinstance(body[0].value.value, str)
+    ):
+        node.body = body[1:] or [ast.Expr(ast.Constant(...))]
+
+
+def _compact(node: ast.AST) -> str:
+    # Unparsed source without the blank lines unparse puts between methods
+    return "\n".join(line for line in ast.unparse(node).splitlines() if line.strip())
+
+
+def _signature(node: ast.AST) -> str:
+    # "def name(args) -> returns: ..." with decorators, for functions whose
+    # body does not fit the budget
+    stub = copy.copy(node)
+    stub.body = [ast.Expr(ast.Constant(...))]
+    return _compact(stub)
+
+
+def module_symbols(source: str) -> Dict[str, Any]:
+    # Top-level classes, functions and constants of a module with their
+    # compact source (comments and docstrings dropped) and the names they use,
+    # plus what its imports bind: alias -> (module, name or None, level)
+    tree = ast.parse(source)
+    definitions = {}
+    imports = {}
+    star_imports = []
+    for node in tree.body:
+        if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            for child in ast.walk(node):
+                if isinstance(
+                    child, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)
+                ):
+                    _strip_docstring(child)
+            definition = {
+                "kind": "class" if isinstance(node, ast.ClassDef) else "function",
+                "source": _compact(node),
+                "references": references(node),
+            }
+            if definition["kind"] == "function":
+                definition["signature"] = _signature(node)
+            definitions[node.name] = definition
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            for target in targets:
+                if isinstance(target, ast.Name):
+                    definitions[target.id] = {
+                        "kind": "constant",
+                        "source": _compact(node),
+                        "references": references(node.value)
+                        if node.value is not None
+                        else [],
+                    }
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.asname:
+                    imports[alias.asname] = (alias.name, None, 0)
+                else:
+                    top = alias.name.split(".")[0]
+                    imports[top] = (top, None, 0)
+        elif isinstance(node, ast.ImportFrom):
+            for alias in node.names:
+                if alias.name == "*":
+                    star_imports.append((node.module or "", node.level))
+                else:
+                    imports[alias.asname or alias.name] = (
+                        node.module or "",
+                        alias.name,
+                        node.level,
+                    )
+    return {
+        "definitions": definitions,
+        "imports": imports,
+        "star_imports": star_imports,
+    }
+
+
+class SymbolIndex:
+    # Repository-wide lookup of module-level definitions. Module names are
+    # known for every source file up front, but a file is only parsed the
+    # first time one of its symbols is looked up, so files the prefilter
+    # skipped (plain model or settings modules) are still reachable without
+    # parsing the whole tree.
+
+    def __init__(self, root_dir: str, file_paths: List[str] = None):
+        self.root_dir = root_dir
+        if file_paths is None:
+            file_paths = IgnoreFilter(root_dir).walk([".py"])
+        # dotted module name -> file path; also indexed by every dotted
+        # suffix so "app.models" is found under src/app/models.py
+        self._paths: Dict[str, str] = {}
+        self._suffixes: Dict[str, List[str]] = {}
+        for file_path in file_paths:
+            module = self.module_name(file_path)
+            self._paths[module] = file_path
+            parts = module.split(".")
+            for start in range(1, len(parts)):
+                self._suffixes.setdefault(".".join(parts[start:]), []).append(
+                    module
+                )
+        self._modules: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def module_name(self, file_path: str) -> str:
+        relative = os.path.relpath(file_path, self.root_dir)
+        parts = relative[: -len(".py")].replace(os.sep, "/").split("/")
+        if parts[-1] == "__init__" and len(parts) > 1:
+            parts = parts[:-1]
+        return ".".join(parts)
+
+    def _is_package(self, module: str) -> bool:
+        path = self._paths.get(module, "")
+        return os.path.basename(path) == "__init__.py"
+
+    def _find_module(self, module: str) -> Optional[str]:
+        if module in self._paths:
+            return module
+        candidates = self._suffixes.get(module, [])
+        return candidates[0] if len(candidates) == 1 else None
+
+    def _absolute(self, importer: str, module: str, level: int) -> str:
+        if not level:
+            return module
+        package = importer.split(".")
+        if not self._is_package(importer):
+            package = package[:-1]
+        package = package[: len(package) - (level - 1)]
+        return ".".join(part for part in [*package, module] if part)
+
+    def symbols(self, module: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if module in self._modules:
+                return self._modules[module]
+        symbols = None
+        try:
+            with open(self._paths[module], "rb") as f:
+                symbols = module_symbols(f.read().decode("utf8"))
+        except (KeyError, OSError, SyntaxError, UnicodeDecodeError, ValueError):
+            pass
+        with self._lock:
+            self._modules[module] = symbols
+        return symbols
+
+    def resolve(
+        self, module: str, name: str, depth: int = 0
+    ) -> Optional[Tuple[str, str, Dict[str, Any]]]:
+        # (module, name, definition) that name means inside module, following
+        # imports into other modules of the repository
+        if depth > MAX_IMPORT_DEPTH:
+            return None
+        module = self._find_module(module)
+        symbols = self.symbols(module) if module is not None else None
+        if symbols is None:
+            return None
+        head, _, rest = name.partition(".")
+        if head in symbols["definitions"]:
+            # settings.DEBUG means the settings object
+            return module, head, symbols["definitions"][head]
+        if head in symbols["imports"]:
+            target, imported, level = symbols["imports"][head]
+            target = self._absolute(module, target, level)
+            if imported is None:
+                # import pkg.mod [as alias]; alias.Name.field lives in the
+                # longest prefix that is a module of the repository
+                parts = f"{target}.{rest}".split(".") if rest else []
+                for split in range(len(parts) - 1, 0, -1):
+                    submodule = ".".join(parts[:split])
+                    if self._find_module(submodule) is not None:
+                        return self.resolve(
+                            submodule, ".".join(parts[split:]), depth + 1
+                        )
+                return None
+            resolved = self.resolve(target, imported, depth + 1)
+            if resolved is None and rest:
+                # from pkg import mod; mod.Name
+                submodule = ".".join(part for part in (target, imported) if part)
+                return self.resolve(submodule, rest, depth + 1)
+            return resolved
+        if not rest:
+            for target, level in symbols["star_imports"]:
+                resolved = self.resolve(
+                    self._absolute(module, target, level), name, depth + 1
+                )
+                if resolved is not None:
+                    return resolved
+        return None
+
+
+class ContextSlicer:
+    # Picks the definitions a handler depends on (models, dependencies,
+    # constants, and what those reference in turn, nearest first) and packs
+    # their compact source into at most token_budget tokens. Functions that
+    # do not fit whole are reduced to their signature.
+
+    def __init__(self, index: SymbolIndex, token_budget: int):
+        self.index = index
+        self.token_budget = token_budget
+
+    def slice(self, file_path: str, handler_source: str) -> Dict[str, Any]:
+        module = self.index.module_name(file_path)
+        try:
+            handler = ast.parse(handler_source).body[0]
+        except (SyntaxError, IndexError):
+            return {"context": "", "symbols": []}
+        # The route decorator's own object (app, router) is no context, but
+        # its arguments (response_model=..., dependencies=[...]) are
+        nodes = [handler]
+        if isinstance(handler, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            nodes = [handler.args, *handler.body]
+            if handler.returns is not None:
+                nodes.append(handler.returns)
+            for decorator in handler.decorator_list:
+                if isinstance(decorator, ast.Call):
+                    nodes.extend(decorator.args)
+                    nodes.extend(keyword.value for keyword in decorator.keywords)
+        queue = deque((module, name) for name in references(*nodes))
+        seen = {(module, getattr(handler, "name", None))}
+        parts, symbols, tokens = [], [], 0
+        while queue:
+            importer, name = queue.popleft()
+            resolved = self.index.resolve(importer, name)
+            if resolved is None:
+                continue
+            owner, symbol, definition = resolved
+            if (owner, symbol) in seen:
+                continue
+            seen.add((owner, symbol))
+            source = definition["source"]
+            cost = _estimate_tokens(source)
+            if tokens + cost > self.token_budget and "signature" in definition:
+                source = definition["signature"]
+                cost = _estimate_tokens(source)
+            if tokens + cost > self.token_budget:
+                continue
+            parts.append(source)
+            symbols.append(f"{owner}.{symbol}")
+            tokens += cost
+            queue.extend((owner, name) for name in definition["references"])
+        return {"context": "\n".join(parts), "symbols": symbols}
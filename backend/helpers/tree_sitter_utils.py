@@ -9,6 +9,12 @@ import traceback
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Grammars shipped in another language's module: name -> (module, function)
+GRAMMARS = {
+    "typescript": ("typescript", "language_typescript"),
+    "tsx": ("typescript", "language_tsx"),
+}
+
 
 class LanguageLoader:
     @staticmethod
@@ -17,15 +23,21 @@ class LanguageLoader:
         try:
             # Remove 'tree-sitter-' prefix if present
             lang = language.replace("tree-sitter-", "")
-
-            # Dynamically import the language module from the correct path
-            module_name = f"tree_sitter_languages.tree_sitter_{lang}"
-            try:
-                module = importlib.import_module(module_name)
-            except ImportError:
+            lang, function = GRAMMARS.get(lang, (lang, "language"))
+
+            # Prefer a bundled module, then the standalone grammar package
+            module_name = f"tree_sitter_{lang}"
+            for name in (f"tree_sitter_languages.{module_name}", module_name):
+                try:
+                    module = importlib.import_module(name)
+                    break
+                except ImportError:
+                    continue
+            else:
                 raise ValueError(f"Language module not found: {module_name}")
 
-            return Language(module.language())
+            grammar = getattr(module, function, None) or module.language
+            return Language(grammar())
         except Exception as e:
             logger.error(f"Failed to load language {language}: {str(e)}")
             raise
@@ -100,7 +112,7 @@ def parse_code(code: str, language: str) -> Dict[str, Any]:
 
 
 def check_language_files():
-    required_languages = ["python", "javascript", "typescript", "rust"]
+    required_languages = ["python", "javascript", "typescript", "tsx", "rust"]
     missing_languages = []
     for lang in required_languages:
         try:
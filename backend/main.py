@@ -1,7 +1,18 @@
-from fastapi import FastAPI
+import asyncio
+import os
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, PlainTextResponse, Response
 from fastapi.staticfiles import StaticFiles
+from backend import config
 from backend.api.routes import router as api_router
+from backend.app.metrics import REGISTRY
+from backend.app.spec_files import (
+    VARIANTS_DIR,
+    choose_variant,
+    etag_matches,
+    spec_manifest,
+)
 
 app = FastAPI(title="AI-Enhanced API Documentation")
 
@@ -15,6 +26,46 @@ app.add_middleware(
 )
 
 app.include_router(api_router, prefix="/api")
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(
+        REGISTRY.render(), media_type="text/plain; version=0.0.4"
+    )
+
+
+@app.api_route("/static/{name}.json", methods=["GET", "HEAD"], include_in_schema=False)
+async def serve_spec(name: str, request: Request):
+    # Generated specs: strong ETags from the content hash, so polls that
+    # already have the current version get 304, and gzip/brotli variants
+    # compressed when the spec was written
+    if "/" in name or name.startswith("."):
+        raise HTTPException(status_code=404)
+    manifest = await asyncio.to_thread(spec_manifest, "static", f"{name}.json")
+    if manifest is None:
+        raise HTTPException(status_code=404)
+    encoding, file_name = choose_variant(
+        manifest, request.headers.get("accept-encoding", "")
+    )
+    etag = manifest["etag"] + (f"-{encoding}" if encoding else "")
+    headers = {
+        "ETag": f'"{etag}"',
+        "Cache-Control": config.SPEC_CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(request.headers.get("if-none-match", ""), manifest["etag"]):
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return FileResponse(
+        os.path.join("static", VARIANTS_DIR, file_name),
+        media_type="application/json",
+        headers=headers,
+    )
+
+
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import re
+from abc import ABC, abstractmethod
+from typing import List, Sequence
+
+import numpy as np
+
+from backend import config
+
+DEFAULT_DIMENSIONS = 1536
+# Texts per embedding request
+BATCH_SIZE = 64
+
+
+def embedding_dimensions(model_name: str = "embedding") -> int:
+    # output_vector_size of the embedding model in config.json
+    try:
+        with open(config.LLM_CONFIG_PATH) as f:
+            models = json.load(f)["language_model"]["models"]
+    except (OSError, KeyError, ValueError):
+        return DEFAULT_DIMENSIONS
+    for model in models:
+        if model.get("model_name") == model_name:
+            info = model.get("model_info", {})
+            return int(info.get("output_vector_size", DEFAULT_DIMENSIONS))
+    return DEFAULT_DIMENSIONS
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    # Rows scaled to unit length so cosine similarity is a dot product
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+class Embedder(ABC):
+    # Turns texts into an (n, dimensions) float32 matrix of unit vectors.
+    # name identifies the vector space: vectors of different embedders are
+    # never mixed in one index.
+
+    name = "embedder"
+
+    def __init__(self, dimensions: int, batch_size: int = BATCH_SIZE):
+        self.dimensions = dimensions
+        self.batch_size = batch_size
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for start in range(0, len(texts), self.batch_size):
+            batch = list(texts[start : start + self.batch_size])
+            vectors[start : start + len(batch)] = self._embed_batch(batch)
+        return normalize(vectors)
+
+    @abstractmethod
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        ...
+
+
+class LLMEmbedder(Embedder):
+    # The "embedding" model of config.json, one request per batch
+
+    def __init__(self, dimensions: int = None, batch_size: int = BATCH_SIZE):
+        from kaizen.llms.provider import LLMProvider
+
+        super().__init__(dimensions or embedding_dimensions(), batch_size)
+        self.llm_provider = LLMProvider()
+        self.name = f"llm-embedding-{self.dimensions}"
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        response = self.llm_provider.provider.embedding(
+            model="embedding",
+            input=texts,
+            dimensions=self.dimensions,
+            encoding_format="float",
+        )
+        data = sorted(response["data"], key=lambda item: item["index"])
+        return np.array([item["embedding"] for item in data], dtype=np.float32)
+
+
+class HashingEmbedder(Embedder):
+    # Deterministic, offline bag of words: identifier parts and their bigrams
+    # are hashed into signed buckets. Texts sharing words land close together,
+    # which is enough for tests, benchmarks and installs without an
+    # embedding model.
+
+    def __init__(self, dimensions: int = 256, batch_size: int = BATCH_SIZE):
+        super().__init__(dimensions, batch_size)
+        self.name = f"hashing-{dimensions}"
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = _words(text)
+            for feature in words + [a + " " + b for a, b in zip(words, words[1:])]:
+                digest = int.from_bytes(
+                    hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little"
+                )
+                sign = 1.0 if digest >> 63 else -1.0
+                vectors[row, digest % self.dimensions] += sign
+        return vectors
+
+
+def _words(text: str) -> List[str]:
+    # getUserById / get_user_by_id -> get user by id
+    text = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", text)
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def get_embedder() -> Embedder:
+    if config.EMBEDDER == "hashing":
+        return HashingEmbedder()
+    return LLMEmbedder()
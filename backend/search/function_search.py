@@ -0,0 +1,113 @@
+import os
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from backend import config
+from backend.search.embedder import Embedder, get_embedder
+from backend.search.vector_index import VectorIndex, text_hash
+from backend.storage.ingest import spec_functions
+
+
+def function_documents(api_spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    # One document per analyzed handler: the text that is embedded and the
+    # payload returned by searches
+    documents = []
+    for source_file, functions in sorted(spec_functions(api_spec).items()):
+        for function in functions:
+            text = "\n".join(
+                part
+                for part in (
+                    f"{function['function_name']} {function['function_signature']}",
+                    function["abstract_functionality"],
+                    function["input_output_description"],
+                )
+                if part
+            )
+            documents.append(
+                {
+                    "key": f"{source_file}:{function['function_signature']}",
+                    "text": text,
+                    "payload": {
+                        "name": function["function_name"],
+                        "signature": function["function_signature"],
+                        "source_file": source_file,
+                        "start_line": function["start_line"],
+                        "end_line": function["end_line"],
+                        "summary": function["abstract_functionality"],
+                    },
+                }
+            )
+    return documents
+
+
+class FunctionSearch:
+    def __init__(self, index: VectorIndex, embedder: Embedder):
+        self.index = index
+        self.embedder = embedder
+
+    def index_spec(self, repo: str, api_spec: Dict[str, Any]) -> Dict[str, int]:
+        # Makes the repository's entries match the spec's handlers. Only
+        # documents whose text changed are embedded; the rest keep their
+        # vectors and get fresh payloads (line numbers move).
+        documents = function_documents(api_spec)
+        known = self.index.known(repo)
+        hashes = [text_hash(document["text"]) for document in documents]
+        changed = [
+            (document, hash_)
+            for document, hash_ in zip(documents, hashes)
+            if known.get(document["key"]) != hash_
+        ]
+        unchanged = [
+            document
+            for document, hash_ in zip(documents, hashes)
+            if known.get(document["key"]) == hash_
+        ]
+        if changed:
+            self.index.upsert(
+                repo,
+                [document["key"] for document, _ in changed],
+                self.embedder.embed([document["text"] for document, _ in changed]),
+                [document["payload"] for document, _ in changed],
+                [hash_ for _, hash_ in changed],
+            )
+        if unchanged:
+            self.index.upsert(
+                repo,
+                [document["key"] for document in unchanged],
+                None,
+                [document["payload"] for document in unchanged],
+                [],
+            )
+        current = {document["key"] for document in documents}
+        removed = self.index.remove(repo, [key for key in known if key not in current])
+        self._maybe_partition()
+        return {"embedded": len(changed), "reused": len(unchanged), "removed": removed}
+
+    def _maybe_partition(self):
+        # Partition once the index is big enough, and again whenever it has
+        # doubled since the last time
+        rows = len(self.index)
+        if rows >= config.SEARCH_PARTITION_MIN_ROWS and (
+            self.index.centroids is None or rows >= 2 * self.index.partitioned_count
+        ):
+            self.index.partition()
+
+    def search(
+        self, query: str, k: int = 10, repo: str = None, n_probe: int = None
+    ) -> List[Dict[str, Any]]:
+        vector = self.embedder.embed([query])[0]
+        return [
+            dict(payload, score=round(score, 4))
+            for score, payload in self.index.search(vector, k, repo, n_probe)
+        ]
+
+
+@lru_cache(maxsize=None)
+def get_default_search() -> Optional[FunctionSearch]:
+    if not config.SEARCH_INDEX_DIR:
+        return None
+    embedder = get_embedder()
+    directory = os.path.join(config.SEARCH_INDEX_DIR, embedder.name)
+    return FunctionSearch(
+        VectorIndex(directory, embedder.dimensions, embedder.name), embedder
+    )
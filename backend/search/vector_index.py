@@ -0,0 +1,356 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.search.embedder import normalize
+
+INITIAL_CAPACITY = 1024
+# Rows scored per matrix product in a full scan, bounding the working set
+SCAN_CHUNK = 65536
+# Spherical k-means over a sample of this many rows per partition
+KMEANS_SAMPLE_PER_LIST = 64
+KMEANS_ITERATIONS = 8
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf8")).hexdigest()
+
+
+class VectorIndex:
+    # Unit vectors in a memory-mapped float32 matrix (vectors.f32), with the
+    # owning repository and partition of every row in two int32 maps next to
+    # it and keys/payloads in SQLite. Cosine top-k is one matrix product per
+    # chunk of rows. Once partitioned, a query only scores the rows of the
+    # n_probe partitions whose centroids are closest to it.
+
+    def __init__(self, directory: str, dimensions: int, space: str):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.dimensions = dimensions
+        self.space = space
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            os.path.join(directory, "meta.sqlite3"), check_same_thread=False, timeout=30
+        )
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS info (name TEXT PRIMARY KEY, value TEXT)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS repos "
+                "(repo_id INTEGER PRIMARY KEY, repo TEXT NOT NULL UNIQUE)"
+            )
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS entries (
+                    row INTEGER PRIMARY KEY,
+                    repo_id INTEGER NOT NULL,
+                    key TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    UNIQUE (repo_id, key)
+                )"""
+            )
+        info = dict(self._conn.execute("SELECT name, value FROM info"))
+        if info.get("space") != space or info.get("dimensions") != str(dimensions):
+            # Vectors of another embedder cannot be compared with this one's
+            self._reset()
+            info = {}
+        self.count = int(info.get("count", 0))
+        self.partitioned_count = int(info.get("partitioned_count", 0))
+        self._open_maps(max(INITIAL_CAPACITY, self.count))
+        centroids_path = os.path.join(directory, "centroids.npy")
+        self.centroids = (
+            np.load(centroids_path) if os.path.exists(centroids_path) else None
+        )
+
+    def _reset(self):
+        with self._conn:
+            for table in ("info", "repos", "entries"):
+                self._conn.execute(f"DELETE FROM {table}")
+            self._set_info(space=self.space, dimensions=self.dimensions, count=0)
+        for name in ("vectors.f32", "owners.i32", "assign.i32", "centroids.npy"):
+            path = os.path.join(self.directory, name)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _set_info(self, **values):
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO info VALUES (?, ?)",
+            [(name, str(value)) for name, value in values.items()],
+        )
+
+    def _map(self, name: str, dtype, shape: Tuple[int, ...], fill=0):
+        # Grows the file to shape (new rows get fill) and maps it
+        path = os.path.join(self.directory, name)
+        itemsize = np.dtype(dtype).itemsize * int(np.prod(shape[1:], dtype=np.int64))
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        wanted = itemsize * shape[0]
+        if size < wanted:
+            with open(path, "ab") as f:
+                f.truncate(wanted)
+            if fill:
+                array = np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+                array[size // itemsize :] = fill
+                array.flush()
+                del array
+        return np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+
+    def _open_maps(self, capacity: int):
+        self.capacity = capacity
+        self.vectors = self._map(
+            "vectors.f32", np.float32, (capacity, self.dimensions)
+        )
+        # -1: free row (never written or deleted)
+        self.owners = self._map("owners.i32", np.int32, (capacity,), fill=-1)
+        # -1: not assigned to a partition
+        self.assign = self._map("assign.i32", np.int32, (capacity,), fill=-1)
+
+    def _ensure_capacity(self, rows: int):
+        if rows <= self.capacity:
+            return
+        capacity = self.capacity
+        while capacity < rows:
+            capacity *= 2
+        for array in (self.vectors, self.owners, self.assign):
+            array.flush()
+        self._open_maps(capacity)
+
+    def _repo_id(self, repo: str, create: bool = False) -> Optional[int]:
+        row = self._conn.execute(
+            "SELECT repo_id FROM repos WHERE repo = ?", (repo,)
+        ).fetchone()
+        if row is None and create:
+            cursor = self._conn.execute("INSERT INTO repos (repo) VALUES (?)", (repo,))
+            return cursor.lastrowid
+        return row[0] if row else None
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self.owners[: self.count] >= 0))
+
+    def known(self, repo: str) -> Dict[str, str]:
+        # key -> text hash of the repository's entries
+        with self._lock:
+            repo_id = self._repo_id(repo)
+            if repo_id is None:
+                return {}
+            return dict(
+                self._conn.execute(
+                    "SELECT key, text_hash FROM entries WHERE repo_id = ?", (repo_id,)
+                )
+            )
+
+    def upsert(
+        self,
+        repo: str,
+        keys: Sequence[str],
+        vectors: Optional[np.ndarray],
+        payloads: Sequence[Dict[str, Any]],
+        hashes: Sequence[str],
+    ):
+        # vectors may be None to update only the payloads of existing keys
+        with self._lock, self._conn:
+            repo_id = self._repo_id(repo, create=True)
+            existing = dict(
+                self._conn.execute(
+                    "SELECT key, row FROM entries WHERE repo_id = ?", (repo_id,)
+                )
+            )
+            if vectors is None:
+                self._conn.executemany(
+                    "UPDATE entries SET payload = ? WHERE row = ?",
+                    [
+                        (json.dumps(payload), existing[key])
+                        for key, payload in zip(keys, payloads)
+                    ],
+                )
+                return
+
+            free = iter(np.flatnonzero(self.owners[: self.count] < 0).tolist())
+            rows = []
+            for key in keys:
+                row = existing.get(key)
+                if row is None:
+                    row = next(free, None)
+                if row is None:
+                    row = self.count
+                    self.count += 1
+                rows.append(row)
+            self._ensure_capacity(self.count)
+
+            rows = np.array(rows, dtype=np.int64)
+            vectors = normalize(vectors)
+            self.vectors[rows] = vectors
+            self.owners[rows] = repo_id
+            if self.centroids is not None:
+                self.assign[rows] = np.argmax(vectors @ self.centroids.T, axis=1)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                [
+                    (int(row), repo_id, key, hash_, json.dumps(payload))
+                    for row, key, hash_, payload in zip(rows, keys, hashes, payloads)
+                ],
+            )
+            self._set_info(count=self.count)
+            self._flush()
+
+    def remove(self, repo: str, keys: Iterable[str]) -> int:
+        keys = list(keys)
+        with self._lock, self._conn:
+            repo_id = self._repo_id(repo)
+            if repo_id is None or not keys:
+                return 0
+            rows = []
+            for start in range(0, len(keys), 500):
+                chunk = keys[start : start + 500]
+                rows.extend(
+                    row
+                    for (row,) in self._conn.execute(
+                        "SELECT row FROM entries WHERE repo_id = ? AND key IN "
+                        f"({', '.join('?' * len(chunk))})",
+                        (repo_id, *chunk),
+                    )
+                )
+            self._conn.executemany(
+                "DELETE FROM entries WHERE row = ?", [(row,) for row in rows]
+            )
+            self.owners[rows] = -1
+            self.assign[rows] = -1
+            self._flush()
+        return len(rows)
+
+    def _flush(self):
+        for array in (self.vectors, self.owners, self.assign):
+            array.flush()
+
+    def partition(self, lists: int = None, seed: int = 0):
+        # Spherical k-means over a sample of the rows, then every row is
+        # assigned to its closest centroid. Rows added later are assigned on
+        # write, so the partitions only need rebuilding when the data drifts.
+        with self._lock:
+            live = np.flatnonzero(self.owners[: self.count] >= 0)
+            if not len(live):
+                return
+            lists = lists or max(1, int(np.sqrt(len(live))))
+            rng = np.random.default_rng(seed)
+            sample_size = min(len(live), lists * KMEANS_SAMPLE_PER_LIST)
+            sample = np.sort(rng.choice(live, sample_size, replace=False))
+            points = np.asarray(self.vectors[sample])
+            centroids = points[rng.choice(len(points), lists, replace=False)]
+            for _ in range(KMEANS_ITERATIONS):
+                labels = np.argmax(points @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, labels, points)
+                empty = ~np.any(sums, axis=1)
+                sums[empty] = centroids[empty]
+                centroids = normalize(sums)
+
+            for start in range(0, self.count, SCAN_CHUNK):
+                end = min(start + SCAN_CHUNK, self.count)
+                labels = np.argmax(self.vectors[start:end] @ centroids.T, axis=1)
+                labels[self.owners[start:end] < 0] = -1
+                self.assign[start:end] = labels
+            self.assign.flush()
+            self.centroids = centroids.astype(np.float32)
+            np.save(os.path.join(self.directory, "centroids.npy"), self.centroids)
+            self.partitioned_count = len(live)
+            with self._conn:
+                self._set_info(partitioned_count=self.partitioned_count)
+
+    def search(
+        self,
+        vector: np.ndarray,
+        k: int = 10,
+        repo: str = None,
+        n_probe: int = None,
+    ) -> List[Tuple[float, Dict[str, Any]]]:
+        # (cosine similarity, payload) of the k closest rows, best first. With
+        # partitions, n_probe of them are scanned (default: about 2% of them,
+        # at least 8); n_probe=0 forces an exact scan.
+        query = normalize(np.asarray(vector, dtype=np.float32).reshape(-1))
+        with self._lock:
+            if repo is None:
+                repo_id = None
+            else:
+                repo_id = self._repo_id(repo)
+                if repo_id is None:
+                    return []
+            if self.centroids is not None and n_probe != 0:
+                rows, scores = self._probe(query, repo_id, n_probe)
+            else:
+                rows, scores = self._scan(query, repo_id, k)
+            if not len(rows):
+                return []
+            top = _top_k(scores, k)
+            rows, scores = rows[top], scores[top]
+            payloads = {}
+            for start in range(0, len(rows), 500):
+                chunk = [int(row) for row in rows[start : start + 500]]
+                payloads.update(
+                    (row, json.loads(payload))
+                    for row, payload in self._conn.execute(
+                        "SELECT row, payload FROM entries WHERE row IN "
+                        f"({', '.join('?' * len(chunk))})",
+                        chunk,
+                    )
+                )
+        return [
+            (float(score), payloads[int(row)])
+            for row, score in zip(rows, scores)
+            if int(row) in payloads
+        ]
+
+    def _scan(self, query, repo_id, k):
+        # Exact: top k of every chunk, then the top k of those
+        best_rows, best_scores = [], []
+        for start in range(0, self.count, SCAN_CHUNK):
+            end = min(start + SCAN_CHUNK, self.count)
+            scores = self.vectors[start:end] @ query
+            owners = self.owners[start:end]
+            mask = owners >= 0 if repo_id is None else owners == repo_id
+            candidates = np.flatnonzero(mask)
+            if not len(candidates):
+                continue
+            scores = scores[candidates]
+            top = _top_k(scores, k)
+            best_rows.append(candidates[top] + start)
+            best_scores.append(scores[top])
+        if not best_rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        return np.concatenate(best_rows), np.concatenate(best_scores)
+
+    def _probe(self, query, repo_id, n_probe):
+        lists = len(self.centroids)
+        n_probe = min(lists, n_probe or max(8, lists // 50))
+        probes = _top_k(self.centroids @ query, n_probe)
+        assign = self.assign[: self.count]
+        mask = np.isin(assign, probes)
+        if repo_id is not None:
+            mask &= self.owners[: self.count] == repo_id
+        rows = np.flatnonzero(mask)
+        return rows, self.vectors[rows] @ query
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "rows": len(self),
+                "capacity": self.capacity,
+                "dimensions": self.dimensions,
+                "space": self.space,
+                "partitions": 0 if self.centroids is None else len(self.centroids),
+                "partitioned_rows": self.partitioned_count,
+            }
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    # Indices of the k largest scores, largest first
+    if len(scores) > k:
+        top = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.arange(len(scores))
+    return top[np.argsort(-scores[top], kind="stable")]
@@ -0,0 +1,181 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Tuple
+
+from backend.helpers.code_chunker import chunk_spans
+from backend.helpers.file_walker import IgnoreFilter
+from backend.helpers.route_queries import LANGUAGE_EXTENSIONS, language_for_file
+from backend.storage.store import CodeStore
+
+logger = logging.getLogger(__name__)
+
+# chunk_code sections as syntax_nodes.node_type
+NODE_TYPES = {
+    "functions": "function",
+    "classes": "class",
+    "hooks": "hook",
+    "components": "component",
+}
+
+
+def repository_identity(repo_url: str) -> Tuple[str, str]:
+    # (owner, name) of a GitHub URL; local checkouts are owned by "local"
+    parts = repo_url.rstrip("/").split("/")
+    if repo_url.startswith("https://github.com/") and len(parts) >= 5:
+        return parts[-2], parts[-1]
+    return "local", os.path.basename(os.path.abspath(repo_url))
+
+
+def file_nodes(file_path: str, language: str, code: str = None) -> List[Dict[str, Any]]:
+    # A module node for the file with one child per chunk_code block
+    if code is None:
+        with open(file_path, encoding="utf8", errors="replace") as f:
+            code = f.read()
+    try:
+        spans = chunk_spans(code, language)
+    except Exception as e:
+        logger.warning(f"Could not chunk {file_path}: {e}")
+        spans = []
+    nodes = [
+        {
+            "node_type": "module",
+            "start_line": 1,
+            "end_line": max(1, code.count("\n") + 1),
+            "node_content": None,
+            "language": language,
+            "parent": None,
+            "properties": {"name": os.path.basename(file_path)},
+        }
+    ]
+    for span in spans:
+        nodes.append(
+            {
+                "node_type": NODE_TYPES[span["section"]],
+                "start_line": span["start_line"],
+                "end_line": span["end_line"],
+                "node_content": span["code"],
+                "language": language,
+                "parent": 0,
+                "properties": {"name": span["name"]},
+            }
+        )
+    return nodes
+
+
+def spec_functions(api_spec: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    # function_abstractions rows (without file_id) per source file, from the
+    # operations that know their handler
+    functions = {}
+    for path, methods in api_spec.get("paths", {}).items():
+        for method, operation in methods.items():
+            if not isinstance(operation, dict):
+                continue
+            handler = operation.get("x-handler")
+            source_file = operation.get("x-source-file")
+            if not handler or not source_file:
+                continue
+            io = {
+                key: operation[key]
+                for key in ("parameters", "requestBody", "responses")
+                if key in operation
+            }
+            functions.setdefault(source_file, []).append(
+                {
+                    "function_name": handler["name"],
+                    "function_signature": f"{method.upper()} {path}",
+                    "abstract_functionality": operation.get("description")
+                    or operation.get("summary")
+                    or "",
+                    "input_output_description": json.dumps(io) if io else None,
+                    "start_line": handler["start_line"],
+                    "end_line": handler["end_line"],
+                }
+            )
+    return functions
+
+
+def persist_analysis(
+    store: CodeStore,
+    repo_url: str,
+    root_dir: str,
+    api_spec: Dict[str, Any],
+    file_paths: Iterable[str] = None,
+) -> Dict[str, Dict[str, float]]:
+    # Writes the repository's files, their syntax trees and the analyzed
+    # handlers in one transaction and returns rows/sec per table. With
+    # file_paths (relative paths, e.g. the files changed since the last run)
+    # only those files are rewritten, and the ones that no longer exist are
+    # removed; without it the whole tree is rewritten. Files whose content
+    # (sha256) matches what is stored keep their syntax tree rather than
+    # being chunked again.
+    ignore_filter = IgnoreFilter(root_dir)
+    if file_paths is None:
+        full = True
+        file_paths = [
+            os.path.relpath(file_path, root_dir).replace(os.sep, "/")
+            for file_path in ignore_filter.walk(list(LANGUAGE_EXTENSIONS))
+        ]
+    else:
+        full = False
+        file_paths = sorted(
+            path
+            for path in file_paths
+            if language_for_file(path) and not ignore_filter.ignored(path)
+        )
+    present = [
+        path for path in file_paths if os.path.isfile(os.path.join(root_dir, path))
+    ]
+    functions = spec_functions(api_spec)
+    owner, name = repository_identity(repo_url)
+
+    with store.session() as session:
+        repo_id = session.upsert_repository(name, owner, repo_url)
+        file_ids = session.upsert_files(
+            repo_id,
+            [
+                {"file_path": path, "programming_language": language_for_file(path)}
+                for path in present
+            ],
+        )
+        if full:
+            keep = set(present)
+            stale = [file_id for path, file_id in file_ids.items() if path not in keep]
+        else:
+            stale = [
+                file_ids[path]
+                for path in file_paths
+                if path not in present and path in file_ids
+            ]
+        session.delete_files(stale)
+
+        written = [file_ids[path] for path in present]
+        stored = session.file_digests(written)
+        changed, nodes = [], []
+        for path in present:
+            with open(os.path.join(root_dir, path), "rb") as f:
+                data = f.read()
+            digest = hashlib.sha256(data).hexdigest()
+            if stored.get(file_ids[path]) == digest:
+                continue
+            changed.append(file_ids[path])
+            # parent indices are per file; shift them into the shared list
+            base = len(nodes)
+            language = language_for_file(path)
+            code = data.decode("utf8", errors="replace")
+            for node in file_nodes(os.path.join(root_dir, path), language, code):
+                if node["parent"] is not None:
+                    node["parent"] += base
+                nodes.append(dict(node, file_id=file_ids[path]))
+            nodes[base]["properties"]["sha256"] = digest
+        session.replace_syntax_nodes(changed, nodes)
+        session.replace_functions(
+            written,
+            [
+                dict(function, file_id=file_ids[path])
+                for path in present
+                for function in functions.get(path, [])
+            ],
+        )
+        return session.throughput()
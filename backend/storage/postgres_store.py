@@ -0,0 +1,66 @@
+from typing import List, Sequence
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+from backend.storage.store import CodeStore, schema_statements
+
+
+class PostgresStore(CodeStore):
+    # Batches are sent as multi-row VALUES lists with execute_values, one
+    # round trip per batch instead of per row; ids come from the tables'
+    # SERIAL sequences in one query.
+
+    placeholder = "%s"
+
+    def __init__(self, dsn: str, **kwargs):
+        super().__init__(**kwargs)
+        self.dsn = dsn
+        self._conn = psycopg2.connect(dsn)
+
+    def create_schema(self):
+        with self._lock, self._conn, self._conn.cursor() as cursor:
+            for statement in schema_statements("postgresql"):
+                cursor.execute(statement)
+
+    def close(self):
+        self._conn.close()
+
+    def _begin(self):
+        # psycopg2 opens the transaction on the first statement
+        pass
+
+    def _commit(self):
+        self._conn.commit()
+
+    def _rollback(self):
+        self._conn.rollback()
+
+    def _query(self, sql: str, params: Sequence = ()) -> List[tuple]:
+        with self._conn.cursor() as cursor:
+            cursor.execute(sql, tuple(params))
+            return cursor.fetchall()
+
+    def _execute(self, sql: str, params: Sequence = ()):
+        with self._conn.cursor() as cursor:
+            cursor.execute(sql, tuple(params))
+
+    def _insert_batch(self, statement: str, columns: List[str], rows: List[tuple]):
+        with self._conn.cursor() as cursor:
+            execute_values(
+                cursor, statement.format(values="%s"), rows, page_size=len(rows)
+            )
+
+    def _reserve_ids(self, table: str, id_column: str, count: int) -> List[int]:
+        if not count:
+            return []
+        rows = self._query(
+            f"SELECT nextval(pg_get_serial_sequence('{table}', '{id_column}')) "
+            "FROM generate_series(1, %s)",
+            (count,),
+        )
+        return [row[0] for row in rows]
+
+    def _vector(self, vector: Sequence[float]) -> str:
+        # pgvector's text form
+        return "[" + ",".join(repr(float(value)) for value in vector) + "]"
@@ -0,0 +1,63 @@
+import os
+import sqlite3
+from array import array
+from typing import List, Sequence
+
+from backend.storage.store import CodeStore, schema_statements
+
+
+class SQLiteStore(CodeStore):
+    # Same schema and interface as PostgresStore, without pgvector: vectors
+    # are stored as float32 blobs. Batches go through executemany on one
+    # prepared statement inside a single BEGIN IMMEDIATE transaction.
+
+    placeholder = "?"
+
+    def __init__(self, path: str, **kwargs):
+        super().__init__(**kwargs)
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, timeout=30, isolation_level=None
+        )
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+
+    def create_schema(self):
+        with self._lock:
+            for statement in schema_statements("sqlite"):
+                self._conn.execute(statement)
+
+    def close(self):
+        self._conn.close()
+
+    def _begin(self):
+        self._conn.execute("BEGIN IMMEDIATE")
+
+    def _commit(self):
+        self._conn.execute("COMMIT")
+
+    def _rollback(self):
+        self._conn.execute("ROLLBACK")
+
+    def _query(self, sql: str, params: Sequence = ()) -> List[tuple]:
+        return self._conn.execute(sql, params).fetchall()
+
+    def _execute(self, sql: str, params: Sequence = ()):
+        self._conn.execute(sql, params)
+
+    def _insert_batch(self, statement: str, columns: List[str], rows: List[tuple]):
+        values = "(" + ", ".join([self.placeholder] * len(columns)) + ")"
+        self._conn.executemany(statement.format(values=values), rows)
+
+    def _reserve_ids(self, table: str, id_column: str, count: int) -> List[int]:
+        # The session holds the write lock, so max + 1 cannot race
+        (last,) = self._conn.execute(
+            f"SELECT COALESCE(MAX({id_column}), 0) FROM {table}"
+        ).fetchone()
+        return list(range(last + 1, last + 1 + count))
+
+    def _vector(self, vector: Sequence[float]) -> bytes:
+        return array("f", vector).tobytes()
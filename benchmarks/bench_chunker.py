@@ -0,0 +1,120 @@
+import argparse
+import time
+
+from backend.helpers.code_chunker import chunk_code
+from backend.helpers.tree_sitter_utils import ParserFactory, parse_code
+
+JS_BLOCK = """
+function handler{index}(req, res) {{
+  const id = parseInt(req.params.id, 10);
+  if (id % 2) {{
+    return res.status(404).json({{ error: 'not found' }});
+  }}
+  res.json({{ id, name: 'item{index}' }});
+}}
+
+class Service{index} {{
+  constructor(store) {{
+    this.store = store;
+  }}
+
+  load(id) {{
+    return this.store.get(id);
+  }}
+}}
+
+const useItem{index} = (id) => fetchItem(id);
+app.get('/api/items{index}/:id', handler{index});
+"""
+
+TS_BLOCK = """
+interface Item{index} {{
+  id: number;
+  name: string;
+}}
+
+export function load{index}(id: number): Item{index} {{
+  const item: Item{index} = {{ id, name: `item${{id}}` }};
+  if (id < 0) {{
+    throw new Error('invalid id');
+  }}
+  return item;
+}}
+
+export class Repository{index} {{
+  private items: Item{index}[] = [];
+
+  add(item: Item{index}): void {{
+    this.items.push(item);
+  }}
+}}
+"""
+
+BLOCKS = {"javascript": JS_BLOCK, "typescript": TS_BLOCK}
+
+
+def generate_source(language, lines):
+    block = BLOCKS[language]
+    per_block = block.count("\n")
+    return "".join(block.format(index=index) for index in range(lines // per_block + 1))
+
+
+def legacy_chunk(code, language):
+    # The parse work of the previous chunker: the whole file was re-parsed
+    # once for every node visited
+    tree = ParserFactory.get_parser(language).parse(code.encode("utf8"))
+
+    def process_node(node):
+        if parse_code(code, language) is None:
+            for child in node.children:
+                process_node(child)
+
+    process_node(tree.root_node)
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="chunk_code time on large files")
+    parser.add_argument("--lines", type=int, default=10000)
+    parser.add_argument(
+        "--legacy-lines",
+        type=int,
+        default=300,
+        help="File size for the previous, quadratic chunker (0 to skip)",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for language in BLOCKS:
+        code = generate_source(language, args.lines)
+        lines = code.count("\n")
+        elapsed, body = min(
+            (timed(chunk_code, code, language) for _ in range(args.repeat)),
+            key=lambda run: run[0],
+        )
+        chunks = sum(
+            len(section) for name, section in body.items() if name != "other_blocks"
+        )
+        print(
+            f"{language:<11} {lines:7d} lines {elapsed * 1000:9.1f} ms "
+            f"{lines / elapsed:10.0f} lines/s chunks={chunks}"
+        )
+
+        if args.legacy_lines:
+            small = generate_source(language, args.legacy_lines)
+            legacy, _ = timed(legacy_chunk, small, language)
+            current, _ = timed(chunk_code, small, language)
+            print(
+                f"{'':<11} {small.count(chr(10)):7d} lines legacy "
+                f"{legacy * 1000:9.1f} ms, single pass {current * 1000:7.1f} ms "
+                f"({legacy / current:.0f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from backend.app.ai_engine import estimate_tokens, format_route
+from backend.helpers.route_visitor import scan_file
+from backend.helpers.symbol_index import ContextSlicer, SymbolIndex
+
+MODEL = """
+
+class Address{index}(BaseModel):
+    street: str
+    city: str
+    postcode: str = ""
+
+
+class Resource{index}(BaseModel):
+    id: int
+    name: str = Field(..., max_length=MAX_NAME_LENGTH)
+    status: Status = Status.ACTIVE
+    address: Optional[Address{index}] = None
+    tags: List[str] = []
+
+
+class Resource{index}Create(BaseModel):
+    name: str
+    address: Optional[Address{index}] = None
+"""
+
+MODELS_HEADER = """from enum import Enum
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from app.config import MAX_NAME_LENGTH
+
+
+class Status(str, Enum):
+    ACTIVE = "active"
+    ARCHIVED = "archived"
+"""
+
+CONFIG = """MAX_NAME_LENGTH = 120
+PAGE_SIZE = 50
+DATABASE_URL = "sqlite:///app.db"
+"""
+
+DEPS = """from app.config import DATABASE_URL
+
+
+def get_db():
+    # One session per request
+    session = connect(DATABASE_URL)
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def get_current_user(token: str = Header(...)):
+    user = lookup_token(token)
+    if user is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return user
+"""
+
+ROUTER_HEADER = """from fastapi import APIRouter, Depends, HTTPException
+
+from app import models
+from app.config import PAGE_SIZE
+from app.deps import get_current_user, get_db
+
+router = APIRouter()
+"""
+
+ROUTES = """
+
+@router.get("/resources{index}/{{item_id}}", response_model=models.Resource{index})
+async def read_resource{index}(item_id: int, db=Depends(get_db)):
+    resource = db.get(models.Resource{index}, item_id)
+    if resource is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return resource
+
+
+@router.post("/resources{index}", response_model=models.Resource{index})
+async def create_resource{index}(
+    body: models.Resource{index}Create,
+    db=Depends(get_db),
+    user=Depends(get_current_user),
+):
+    return db.add(models.Resource{index}(id=0, **body.dict()))
+
+
+@router.get("/resources{index}")
+async def list_resources{index}(page: int = 0, db=Depends(get_db)):
+    return db.list(models.Resource{index}, offset=page * PAGE_SIZE, limit=PAGE_SIZE)
+"""
+
+
+def generate_app(root, models, routers):
+    # A layered FastAPI app: shared models, config and dependencies, and
+    # routers that each use a slice of them
+    package = os.path.join(root, "app")
+    os.makedirs(os.path.join(package, "routers"))
+    files = {
+        "__init__.py": "",
+        "config.py": CONFIG,
+        "deps.py": DEPS,
+        "models.py": MODELS_HEADER
+        + "".join(MODEL.format(index=index) for index in range(models)),
+        "routers/__init__.py": "",
+    }
+    for index in range(routers):
+        files[f"routers/r{index}.py"] = ROUTER_HEADER + ROUTES.format(
+            index=index % models
+        )
+    for name, content in files.items():
+        with open(os.path.join(package, name), "w") as f:
+            f.write(content)
+    return [os.path.join(package, name) for name in sorted(files)]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Prompt tokens per route: handler-only JSON vs sliced context"
+    )
+    parser.add_argument("--models", type=int, default=40)
+    parser.add_argument("--routers", type=int, default=40)
+    parser.add_argument("--budget", type=int, default=1024)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        file_paths = generate_app(root, args.models, args.routers)
+        imported = sum(
+            estimate_tokens(open(os.path.join(root, "app", name)).read())
+            for name in ("config.py", "deps.py", "models.py")
+        )
+        slicer = ContextSlicer(SymbolIndex(root, file_paths), args.budget)
+        routes = before = after = whole_files = symbols = 0
+        start = time.perf_counter()
+        for file_path in file_paths:
+            for route in scan_file(file_path)["routes"]:
+                payload = {
+                    "method": route["method"],
+                    "content": route["content"],
+                    "path": route["route"],
+                }
+                before += estimate_tokens(json.dumps(payload, indent=2))
+                whole_files += estimate_tokens(format_route(payload)) + imported
+                sliced = slicer.slice(file_path, route["content"])
+                payload["context"] = sliced["context"]
+                after += estimate_tokens(format_route(payload))
+                symbols += len(sliced["symbols"])
+                routes += 1
+        seconds = time.perf_counter() - start
+
+    print(f"{routes} routes, budget {args.budget} tokens")
+    print(f"handler-only indented JSON  {before / routes:8.0f} tokens/route")
+    print(f"handler + imported modules  {whole_files / routes:8.0f} tokens/route")
+    print(
+        f"handler + sliced context    {after / routes:8.0f} tokens/route "
+        f"({symbols / routes:.1f} definitions)"
+    )
+    print(f"scan + slice time           {seconds * 1000 / routes:8.2f} ms/route")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import argparse
+import os
+import tempfile
+import time
+
+from backend.helpers.route_visitor import scan_files
+from benchmarks.synthetic import generate_repo
+
+
+def collect(root):
+    file_paths = []
+    for dirpath, _, files in os.walk(root):
+        for file in files:
+            if file.endswith(".py"):
+                file_paths.append(os.path.join(dirpath, file))
+    return sorted(file_paths)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Static scan throughput by worker count"
+    )
+    parser.add_argument("--files", type=int, default=5000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        generate_repo(root, args.files)
+        file_paths = collect(root)
+        baseline = None
+        for workers in args.workers:
+            start = time.perf_counter()
+            routes = sum(
+                len(scan["routes"]) for scan in scan_files(file_paths, workers)
+            )
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(
+                f"workers={workers:<3} {len(file_paths) / elapsed:9.0f} files/s "
+                f"routes={routes} speedup={baseline / elapsed:.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import argparse
+import os
+import tempfile
+import time
+
+from backend.helpers.identify_apis import extract_routes, identify_framework
+from backend.helpers.route_queries import extract_routes as query_routes
+from backend.helpers.route_queries import language_for_file
+from benchmarks.synthetic import generate_repo
+
+
+def regex_scan(content, language):
+    return extract_routes(content, identify_framework(content))
+
+
+def query_scan(content, language):
+    return query_routes(content, language)
+
+
+def run(scan, sources):
+    start = time.perf_counter()
+    routes = 0
+    for content, language in sources:
+        routes += len(scan(content, language))
+    return time.perf_counter() - start, routes
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Route extraction time: line regexes vs tree-sitter queries"
+    )
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--frameworks", nargs="+", default=["express"])
+    parser.add_argument("--routes-per-file", type=int, default=20)
+    parser.add_argument(
+        "--plain-ratio",
+        type=float,
+        default=0.9,
+        help="Share of files without routes (most of a large codebase)",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        generate_repo(
+            root,
+            args.files,
+            frameworks=args.frameworks,
+            routes_per_file=args.routes_per_file,
+            plain_ratio=args.plain_ratio,
+        )
+        sources = []
+        for dirpath, _, files in os.walk(root):
+            for file in files:
+                with open(os.path.join(dirpath, file)) as f:
+                    sources.append((f.read(), language_for_file(file)))
+
+    megabytes = sum(len(content) for content, _ in sources) / 1e6
+    # Compile the queries outside the timed runs
+    query_scan(*sources[0])
+    for name, scan in (("regex", regex_scan), ("query", query_scan)):
+        elapsed, routes = min(run(scan, sources) for _ in range(args.repeat))
+        print(
+            f"{name:<6} {elapsed * 1000:9.1f} ms {megabytes / elapsed:7.1f} MB/s "
+            f"routes={routes}"
+        )
+
+
+if __name__ == "__main__":
+    main()
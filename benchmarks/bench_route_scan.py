@@ -0,0 +1,80 @@
+import argparse
+import ast
+import os
+import re
+import tempfile
+import time
+
+from backend.helpers.route_visitor import scan_source
+from benchmarks.synthetic import generate_repo
+
+LEGACY_FRAMEWORKS = {
+    "flask": r"from\s+flask\s+import",
+    "django": r"from\s+django\s+import",
+    "fastapi": r"from\s+fastapi\s+import",
+    "express": r"express\(\s*\)",
+    "react": r"import\s+React",
+    "angular": r"@angular/core",
+    "vue": r"new\s+Vue\(",
+}
+
+
+def legacy_scan(content):
+    # The per-file work CodebaseAnalyzer did before the single-pass visitor:
+    # two parses, two full walks and up to seven regex scans
+    tree = ast.parse(content)
+    framework = "Unknown"
+    for name, pattern in LEGACY_FRAMEWORKS.items():
+        if re.search(pattern, content):
+            framework = name
+            break
+    routes = []
+    route_tree = ast.parse(content)
+    for node in ast.walk(route_tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            for decorator in node.decorator_list:
+                if isinstance(decorator, ast.Call) and isinstance(
+                    decorator.func, ast.Attribute
+                ):
+                    routes.append((decorator.func.attr, node.name))
+    classes = [node for node in ast.walk(tree) if isinstance(node, ast.ClassDef)]
+    return framework, routes, classes
+
+
+def new_scan(content):
+    scan = scan_source(content)
+    return scan.framework, scan.routes, scan.classes
+
+
+def run(scan, contents):
+    start = time.process_time()
+    for content in contents:
+        scan(content)
+    return time.process_time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-file route extraction CPU time")
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        generate_repo(root, args.files)
+        contents = []
+        for dirpath, _, files in os.walk(root):
+            for file in files:
+                with open(os.path.join(dirpath, file)) as f:
+                    contents.append(f.read())
+
+    legacy = min(run(legacy_scan, contents) for _ in range(args.repeat))
+    single = min(run(new_scan, contents) for _ in range(args.repeat))
+    per_file = 1e6 / len(contents)
+    print(f"files: {len(contents)}")
+    print(f"legacy:      {legacy * per_file:8.1f} us/file")
+    print(f"single pass: {single * per_file:8.1f} us/file")
+    print(f"speedup:     {legacy / single:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
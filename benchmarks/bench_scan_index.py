@@ -0,0 +1,57 @@
+import argparse
+import os
+import tempfile
+import time
+
+from backend.app.scan_index import ScanIndex
+from backend.helpers.file_walker import walk_files
+from backend.helpers.route_visitor import scan_files
+from benchmarks.synthetic import generate_repo
+
+
+def run(index, root, file_paths, workers):
+    # The per-file part of CodebaseAnalyzer._process_directory
+    start = time.perf_counter()
+    indexed, to_scan = index.partition(root, root, file_paths)
+    writer = index.writer(root, root)
+    scans = scan_files(to_scan, workers=workers)
+    for file_path in file_paths:
+        if file_path not in indexed:
+            writer.add(file_path, next(scans))
+    writer.commit()
+    index.prune(root, root, file_paths)
+    return time.perf_counter() - start, len(indexed)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Scan time of a cold run vs runs served from the scan index"
+    )
+    parser.add_argument("--files", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        repo = os.path.join(root, "repo")
+        generate_repo(repo, args.files)
+        file_paths = walk_files(repo, [".py"])
+        index = ScanIndex(os.path.join(root, "index.sqlite3"))
+
+        cold, _ = run(index, repo, file_paths, args.workers)
+        warm, hits = run(index, repo, file_paths, args.workers)
+        # A fresh checkout: same content, new mtimes, so every file is hashed
+        for file_path in file_paths:
+            os.utime(file_path)
+        rehashed, rehash_hits = run(index, repo, file_paths, args.workers)
+
+    print(f"files:             {len(file_paths)}")
+    print(f"cold:              {cold:8.2f}s")
+    print(f"unchanged:         {warm:8.2f}s ({warm / cold:.1%}, {hits} hits)")
+    print(
+        f"new mtimes:        {rehashed:8.2f}s "
+        f"({rehashed / cold:.1%}, {rehash_hits} hits)"
+    )
+
+
+if __name__ == "__main__":
+    main()
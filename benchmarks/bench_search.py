@@ -0,0 +1,80 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from backend.search.vector_index import VectorIndex
+
+
+def clustered_vectors(rng, centers, count):
+    # Function embeddings are not uniform: draw them around cluster centers
+    labels = rng.integers(0, len(centers), count)
+    noise = rng.standard_normal((count, centers.shape[1])).astype(np.float32)
+    return centers[labels] + 0.5 * noise
+
+
+def timed_queries(index, queries, k, n_probe):
+    results = []
+    start = time.perf_counter()
+    for query in queries:
+        results.append(
+            [payload["i"] for _, payload in index.search(query, k, n_probe=n_probe)]
+        )
+    return (time.perf_counter() - start) / len(queries), results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Top-k latency of exact scans vs partitioned search"
+    )
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--dimensions", type=int, default=256)
+    parser.add_argument("--clusters", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--n-probe", type=int, nargs="+", default=[8, 32])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    centers = rng.standard_normal((args.clusters, args.dimensions))
+    centers = centers.astype(np.float32)
+    with tempfile.TemporaryDirectory() as root:
+        index = VectorIndex(os.path.join(root, "index"), args.dimensions, "bench")
+        start = time.perf_counter()
+        batch = 100_000
+        for offset in range(0, args.rows, batch):
+            count = min(batch, args.rows - offset)
+            vectors = clustered_vectors(rng, centers, count)
+            keys = [str(offset + i) for i in range(count)]
+            index.upsert(
+                "bench", keys, vectors, [{"i": offset + i} for i in range(count)], keys
+            )
+        print(f"rows:              {len(index)} x {args.dimensions}")
+        print(f"insert:            {time.perf_counter() - start:8.2f}s")
+
+        queries = clustered_vectors(rng, centers, args.queries)
+        exact, truth = timed_queries(index, queries, args.k, 0)
+        print(f"exact query:       {exact * 1000:8.1f}ms")
+
+        start = time.perf_counter()
+        index.partition()
+        print(
+            f"partition:         {time.perf_counter() - start:8.2f}s "
+            f"({len(index.centroids)} partitions)"
+        )
+        for n_probe in args.n_probe:
+            seconds, found = timed_queries(index, queries, args.k, n_probe)
+            recall = np.mean(
+                [len(set(a) & set(b)) / args.k for a, b in zip(found, truth)]
+            )
+            print(
+                f"n_probe={n_probe:<4}       {seconds * 1000:8.1f}ms "
+                f"({exact / seconds:.1f}x, recall@{args.k} {recall:.3f})"
+            )
+
+
+if __name__ == "__main__":
+    main()
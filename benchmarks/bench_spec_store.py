@@ -0,0 +1,82 @@
+import argparse
+import copy
+import json
+import os
+import tempfile
+import time
+
+from backend.app.spec_store import SpecStore
+
+
+def synthetic_spec(endpoints):
+    operation = {
+        "summary": "Fetch a resource",
+        "parameters": [{"name": "id", "in": "path", "schema": {"type": "integer"}}],
+        "responses": {"200": {"description": "OK"}, "404": {"description": "Missing"}},
+    }
+    return {
+        "openapi": "3.0.0",
+        "info": {"title": "Generated API", "version": "1.0.1"},
+        "paths": {
+            f"/resources{index}/{{id}}": {"get": dict(operation)}
+            for index in range(endpoints)
+        },
+        "components": {"schemas": {}},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Cost of a new spec version: store delta vs full JSON rewrite"
+    )
+    parser.add_argument("--endpoints", type=int, default=10000)
+    parser.add_argument("--versions", type=int, default=20)
+    parser.add_argument(
+        "--changes", type=int, default=5, help="Operations changed per version"
+    )
+    args = parser.parse_args()
+
+    spec = synthetic_spec(args.endpoints)
+    paths = list(spec["paths"])
+    with tempfile.TemporaryDirectory() as root:
+        store = SpecStore(os.path.join(root, "specs.sqlite3"))
+        store.put("bench", spec, 1)
+        put_seconds = rewrite_seconds = rewrite_bytes = 0.0
+        for version in range(2, args.versions + 2):
+            spec = copy.deepcopy(spec)
+            spec["info"]["version"] = f"1.0.{version}"
+            for change in range(args.changes):
+                path = paths[(version * args.changes + change) % len(paths)]
+                spec["paths"][path]["get"]["summary"] = f"Changed in {version}"
+
+            start = time.perf_counter()
+            store.put("bench", spec, version)
+            put_seconds += time.perf_counter() - start
+
+            start = time.perf_counter()
+            with open(os.path.join(root, "spec.json"), "w") as f:
+                json.dump(spec, f, indent=4)
+            rewrite_seconds += time.perf_counter() - start
+            rewrite_bytes += os.path.getsize(os.path.join(root, "spec.json"))
+
+        stats = store.stats("bench")
+        start = time.perf_counter()
+        store.get("bench", 2)
+        oldest = time.perf_counter() - start
+
+    versions = args.versions
+    delta_bytes = stats["delta_bytes"]
+    print(f"endpoints:         {args.endpoints}, {args.changes} changed per version")
+    print(
+        f"store put:         {put_seconds / versions * 1000:8.1f}ms/version, "
+        f"~{delta_bytes / versions / 1024:.1f} KiB of delta"
+    )
+    print(
+        f"full JSON rewrite: {rewrite_seconds / versions * 1000:8.1f}ms/version, "
+        f"{rewrite_bytes / versions / 1024:.1f} KiB"
+    )
+    print(f"read version 2:    {oldest * 1000:8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
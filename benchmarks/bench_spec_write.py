@@ -0,0 +1,68 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from backend.app.spec_files import ENCODERS, publish_spec
+from benchmarks.bench_spec_store import synthetic_spec
+
+
+def measure(write, repeat):
+    # (best seconds, peak traced bytes) of write()
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        write()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    write()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Spec write latency and peak memory: json.dump vs streaming"
+    )
+    parser.add_argument("--endpoints", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    spec = synthetic_spec(args.endpoints)
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "spec.json")
+
+        def dump():
+            with open(path, "w") as f:
+                json.dump(spec, f, indent=4)
+
+        cases = [("json.dump indent=4 (in place)", dump, lambda: path)]
+        for encoder in ENCODERS:
+            for compact in (False, True):
+                layout = "compact" if compact else "indent=4"
+                label = f"publish_spec {encoder} {layout} (+gzip)"
+                cases.append(
+                    (
+                        label,
+                        lambda e=encoder, c=compact: publish_spec(
+                            root, "published.json", spec, compact=c, encoder=e
+                        ),
+                        lambda: os.path.join(root, "published.json"),
+                    )
+                )
+
+        print(f"{args.endpoints} endpoints")
+        for label, write, output in cases:
+            seconds, peak = measure(write, args.repeat)
+            size = os.path.getsize(output())
+            print(
+                f"{label:<40} {seconds * 1000:8.1f} ms  "
+                f"peak {peak / 2**20:6.1f} MiB  {size / 2**20:5.1f} MiB on disk"
+            )
+
+
+if __name__ == "__main__":
+    main()
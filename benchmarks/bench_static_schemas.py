@@ -0,0 +1,69 @@
+import argparse
+import json
+import tempfile
+
+from benchmarks.bench_context import generate_app
+
+
+def inline_refs(value, schemas, depth=0):
+    # value with every $ref replaced by a copy of its component, which is what
+    # a spec without shared components repeats per operation
+    if isinstance(value, dict):
+        ref = value.get("$ref", "")
+        if ref.startswith("#/components/schemas/") and depth < 8:
+            return inline_refs(schemas[ref.rsplit("/", 1)[1]], schemas, depth + 1)
+        return {key: inline_refs(item, schemas, depth) for key, item in value.items()}
+    if isinstance(value, list):
+        return [inline_refs(item, schemas, depth) for item in value]
+    return value
+
+
+def run(root, static_schemas):
+    from backend import config
+    from backend.app import ai_engine
+    from backend.app.analyze_repo import CodebaseAnalyzer
+    from benchmarks.stub_llm import StubLLMProvider
+
+    config.LLM_CACHE_DIR = ""
+    config.SCAN_INDEX_PATH = ""
+    config.STORAGE_URL = ""
+    config.SEARCH_INDEX_DIR = ""
+    ai_engine.LLMProvider = StubLLMProvider
+    analyzer = CodebaseAnalyzer(root, static_schemas=static_schemas)
+    spec = analyzer.analyze()
+    return analyzer.run_metrics, spec
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="LLM calls and spec size with and without static schemas"
+    )
+    parser.add_argument("--models", type=int, default=20)
+    parser.add_argument("--routers", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        generate_app(root, args.models, args.routers)
+        for static_schemas in (False, True):
+            metrics, spec = run(root, static_schemas)
+            calls = {}
+            for call in metrics["llm_calls"]:
+                calls[call["operation"]] = calls.get(call["operation"], 0) + 1
+            print(
+                f"static_schemas={static_schemas!s:<5}  "
+                f"schema calls {calls.get('generate_api_spec', 0):4d}  "
+                f"insights calls {calls.get('generate_insights', 0):4d}  "
+                f"typed routes {metrics['schemas']['typed_routes']:4d}"
+            )
+        schemas = spec["components"]["schemas"]
+        paths = json.dumps(spec["paths"], separators=(",", ":"))
+        inlined = json.dumps(inline_refs(spec["paths"], schemas), separators=(",", ":"))
+        shared = len(paths) + len(json.dumps(schemas, separators=(",", ":")))
+        print(
+            f"{len(schemas)} components: paths + components {shared / 1024:.1f} KiB, "
+            f"same schemas inlined per operation {len(inlined) / 1024:.1f} KiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
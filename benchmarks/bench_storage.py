@@ -0,0 +1,46 @@
+import argparse
+import os
+import tempfile
+import time
+
+from backend.storage.ingest import persist_analysis
+from backend.storage.sqlite_store import SQLiteStore
+from benchmarks.synthetic import generate_repo
+
+
+def run(path, repo, batch_size):
+    store = SQLiteStore(path, batch_size=batch_size)
+    store.create_schema()
+    start = time.perf_counter()
+    throughput = persist_analysis(store, repo, repo, {"paths": {}})
+    seconds = time.perf_counter() - start
+    store.close()
+    return seconds, throughput
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Storage rows/sec per table, bulk batches vs one row per statement"
+    )
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 1000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        repo = os.path.join(root, "repo")
+        generate_repo(repo, args.files)
+        for batch_size in args.batch_sizes:
+            path = os.path.join(root, f"store_{batch_size}.sqlite3")
+            seconds, throughput = run(path, repo, batch_size)
+            rows = sum(stats["rows"] for stats in throughput.values())
+            writing = sum(stats["seconds"] for stats in throughput.values())
+            print(
+                f"batch {batch_size:>5}: {rows} rows written in {writing:.3f}s "
+                f"({rows / writing:.0f} rows/s), {seconds:.2f}s with chunking"
+            )
+            for table, stats in throughput.items():
+                print(f"  {table:<22} {stats['rows']:>8} {stats['rows_per_sec']:>12}/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.synthetic import generate_repo
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_REPOS = os.path.join(os.path.dirname(BENCHMARK_DIR), "sample_repos")
+CASES = ("identify_apis", "analyzer", "chunk_code")
+CHUNK_LANGUAGES = {".py": "python", ".js": "javascript", ".ts": "typescript"}
+# Compared against the baseline; lower is better for all of them
+COMPARED = ("seconds", "peak_rss_mb")
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _source_files(root, extensions):
+    file_paths = []
+    for dirpath, _, files in os.walk(root):
+        for file in files:
+            if file.endswith(extensions):
+                file_paths.append(os.path.join(dirpath, file))
+    return sorted(file_paths)
+
+
+def _bench_identify_apis(root, options):
+    from backend.helpers.identify_apis import analyze_directory
+
+    files = len(_source_files(root, (".py", ".js", ".ts", ".jsx", ".tsx")))
+    start = time.perf_counter()
+    results = analyze_directory(root)
+    seconds = time.perf_counter() - start
+    routes = sum(len(result["routes"]) for result in results.values())
+    return {"files": files, "routes": routes, "seconds": seconds}
+
+
+def _bench_analyzer(root, options):
+    from backend import config
+    from backend.app import ai_engine
+    from backend.app.analyze_repo import CodebaseAnalyzer
+    from benchmarks.stub_llm import StubLLMProvider
+
+    # Every run starts cold: no response cache, no scan index and a fresh
+    # stub provider
+    config.LLM_CACHE_DIR = ""
+    config.SCAN_INDEX_PATH = ""
+    ai_engine.LLMProvider = lambda: StubLLMProvider(
+        latency=options["llm_latency"], seed=options["seed"]
+    )
+    analyzer = CodebaseAnalyzer(
+        root,
+        max_concurrency=options["max_concurrency"],
+        scan_workers=options["scan_workers"],
+        batch_token_budget=options["batch_token_budget"],
+    )
+    files = len(_source_files(root, (".py",)))
+    start = time.perf_counter()
+    if options["analyzer_mode"] == "async":
+        import asyncio
+
+        spec = asyncio.run(analyzer.analyze_async())
+    else:
+        spec = analyzer.analyze()
+    seconds = time.perf_counter() - start
+    metrics = analyzer.run_metrics or {}
+    return {
+        "files": files,
+        "routes": sum(len(methods) for methods in spec["paths"].values()),
+        "seconds": seconds,
+        "llm_calls": metrics.get("llm", {}).get("calls"),
+        "stages": metrics.get("stages"),
+    }
+
+
+def _bench_chunk_code(root, options):
+    from backend.helpers.code_chunker import chunk_code
+
+    file_paths = _source_files(root, tuple(CHUNK_LANGUAGES))
+    file_paths = file_paths[: options["chunk_files"]]
+    sources = []
+    for file_path in file_paths:
+        with open(file_path) as f:
+            sources.append((f.read(), CHUNK_LANGUAGES[os.path.splitext(file_path)[1]]))
+    start = time.perf_counter()
+    chunks = 0
+    for code, language in sources:
+        body = chunk_code(code, language)
+        chunks += sum(
+            len(section) for name, section in body.items() if name != "other_blocks"
+        )
+    seconds = time.perf_counter() - start
+    return {"files": len(sources), "chunks": chunks, "seconds": seconds}
+
+
+BENCHMARKS = {
+    "identify_apis": _bench_identify_apis,
+    "analyzer": _bench_analyzer,
+    "chunk_code": _bench_chunk_code,
+}
+
+
+def _run_case(case, root, options):
+    # Runs in a freshly spawned process so peak RSS belongs to this case alone
+    result = BENCHMARKS[case](root, options)
+    result["peak_rss_mb"] = round(_peak_rss_mb(), 1)
+    seconds = result["seconds"]
+    if seconds > 0:
+        result["files_per_sec"] = round(result["files"] / seconds, 1)
+        if result.get("routes") is not None:
+            result["routes_per_sec"] = round(result["routes"] / seconds, 1)
+    result["seconds"] = round(seconds, 4)
+    return result
+
+
+def run_case(case, target, root, options):
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        try:
+            result = executor.submit(_run_case, case, root, options).result()
+        except ImportError as e:
+            # e.g. tree-sitter grammars or kaizen not installed
+            return {"case": case, "target": target, "skipped": str(e)}
+    return {"case": case, "target": target, **result}
+
+
+def targets(sizes, frameworks, seed, tmp_dir):
+    for name in sorted(os.listdir(SAMPLE_REPOS)):
+        yield f"sample_repos/{name}", os.path.join(SAMPLE_REPOS, name)
+    for size in sizes:
+        root = os.path.join(tmp_dir, f"synthetic_{size}")
+        generate_repo(root, size, frameworks=frameworks, seed=seed)
+        yield f"synthetic/{size}", root
+
+
+def compare(results, baseline, tolerance):
+    # Returns the (case, target, metric, baseline, current) entries that got
+    # more than tolerance worse than the baseline
+    previous = {
+        (entry["case"], entry["target"]): entry for entry in baseline["results"]
+    }
+    regressions = []
+    for entry in results:
+        before = previous.get((entry["case"], entry["target"]))
+        if before is None or "skipped" in entry or "skipped" in before:
+            continue
+        for metric in COMPARED:
+            old, new = before.get(metric), entry.get(metric)
+            if old and new is not None and new > old * (1 + tolerance):
+                regressions.append((entry["case"], entry["target"], metric, old, new))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Analyzer throughput over sample_repos and synthetic repositories"
+    )
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument(
+        "--frameworks", nargs="+", default=["flask", "fastapi", "express"]
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--llm-latency", type=float, default=0.0, help="Stub LLM seconds per call"
+    )
+    parser.add_argument("--analyzer-mode", choices=["sync", "async"], default="sync")
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    parser.add_argument("--scan-workers", type=int, default=1)
+    parser.add_argument("--batch-token-budget", type=int, default=None)
+    parser.add_argument(
+        "--chunk-files", type=int, default=500, help="Files chunked per target"
+    )
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    # Timings depend on the machine, so no baseline is committed: record one
+    # with --save-baseline before a change and pass it as --baseline after
+    parser.add_argument(
+        "--baseline", help="Exit non-zero on regressions against this report"
+    )
+    parser.add_argument(
+        "--save-baseline", metavar="PATH", help="Store the results as a baseline"
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="Allowed slowdown (0.2 = 20%%)"
+    )
+    args = parser.parse_args()
+
+    options = {
+        "seed": args.seed,
+        "llm_latency": args.llm_latency,
+        "analyzer_mode": args.analyzer_mode,
+        "max_concurrency": args.max_concurrency,
+        "scan_workers": args.scan_workers,
+        "batch_token_budget": args.batch_token_budget,
+        "chunk_files": args.chunk_files,
+    }
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for target, root in targets(args.sizes, args.frameworks, args.seed, tmp_dir):
+            for case in args.cases:
+                entry = run_case(case, target, root, options)
+                results.append(entry)
+                if "skipped" in entry:
+                    print(f"{case:<14} {target:<28} skipped: {entry['skipped']}")
+                    continue
+                print(
+                    f"{case:<14} {target:<28} {entry['seconds']:9.3f}s "
+                    f"{entry.get('files_per_sec', 0):10.0f} files/s "
+                    f"{entry.get('routes_per_sec', 0):10.0f} routes/s "
+                    f"{entry['peak_rss_mb']:8.1f} MB"
+                )
+
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "options": options,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.save_baseline}")
+
+    if args.baseline is None:
+        return
+    if not os.path.exists(args.baseline):
+        sys.exit(f"No baseline at {args.baseline}; record one with --save-baseline")
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    for case, target, metric, old, new in regressions:
+        print(f"REGRESSION {case} {target} {metric}: {old} -> {new}")
+    if regressions:
+        sys.exit(1)
+    print(f"No regressions beyond {args.tolerance:.0%} of the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import argparse
+import asyncio
+import tempfile
+import time
+
+from benchmarks.bench_context import generate_app
+
+
+def pending(spec):
+    return sum(
+        1
+        for methods in spec["paths"].values()
+        for operation in methods.values()
+        if operation.get("x-enrichment") == "pending"
+    )
+
+
+def run(root, latency, requests_per_minute, flush_seconds):
+    from backend import config
+    from backend.app import ai_engine
+    from backend.app.analyze_repo import CodebaseAnalyzer
+    from backend.helpers.rate_limiter import RateLimiter
+    from benchmarks.stub_llm import StubLLMProvider
+
+    config.LLM_CACHE_DIR = ""
+    config.SCAN_INDEX_PATH = ""
+    config.STORAGE_URL = ""
+    config.SEARCH_INDEX_DIR = ""
+    config.ENRICH_FLUSH_SECONDS = flush_seconds
+    ai_engine.LLMProvider = lambda: StubLLMProvider(latency=latency)
+
+    start = time.perf_counter()
+    snapshots = []
+
+    def on_spec(spec):
+        snapshots.append(
+            (time.perf_counter() - start, len(spec["paths"]), pending(spec))
+        )
+
+    rate_limiter = RateLimiter(requests_per_minute) if requests_per_minute else None
+    analyzer = CodebaseAnalyzer(root)
+    spec = asyncio.run(
+        analyzer.analyze_in_phases(on_spec=on_spec, rate_limiter=rate_limiter)
+    )
+    return snapshots, spec, analyzer.run_metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time to the static skeleton spec vs the fully enriched one"
+    )
+    parser.add_argument("--models", type=int, default=10)
+    parser.add_argument("--routers", type=int, default=20)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--requests-per-minute", type=float, default=0)
+    parser.add_argument("--flush-seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        generate_app(root, args.models, args.routers)
+        snapshots, spec, metrics = run(
+            root, args.llm_latency, args.requests_per_minute, args.flush_seconds
+        )
+    for seconds, paths, waiting in snapshots:
+        print(f"{seconds:7.2f}s  spec saved: {paths:4d} paths, {waiting:4d} pending")
+    llm = metrics["llm"]
+    print(
+        f"skeleton after {snapshots[0][0]:.2f}s, fully enriched after "
+        f"{snapshots[-1][0]:.2f}s ({llm['calls']} LLM calls)"
+    )
+
+
+if __name__ == "__main__":
+    main()
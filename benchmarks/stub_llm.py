@@ -0,0 +1,85 @@
+import json
+import random
+import re
+import threading
+import time
+
+from backend.app.ai_engine import estimate_tokens
+
+
+def _normalize_path(path):
+    # Same rewrite CodebaseAnalyzer applies before looking the path up
+    return re.sub(r"<(?:[^<>:]+:)?([^<>]+)>", r"{\1}", path)
+
+
+def _operation(method, path):
+    return {
+        "summary": f"{method.upper()} {path}",
+        "description": f"Stub operation for {method.upper()} {path}",
+        "responses": {"200": {"description": "Successful response"}},
+    }
+
+
+INSIGHTS = {
+    "performance_insights": ["Stub performance insight"],
+    "security_insights": ["Stub security insight"],
+    "optimization_insights": ["Stub optimization insight"],
+    "additional_metadata": {},
+}
+
+
+class StubLLMProvider:
+    # Deterministic stand-in for kaizen's LLMProvider. Answers the AIEngine
+    # prompts with well-formed JSON after latency + per_token_latency * tokens
+    # seconds (plus up to jitter seconds drawn from a seeded generator)
+
+    def __init__(self, latency=0.0, per_token_latency=0.0, jitter=0.0, seed=0):
+        self.latency = latency
+        self.per_token_latency = per_token_latency
+        self.jitter = jitter
+        self.models = [{"model_name": "default", "litellm_params": {"model": "stub"}}]
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def chat_completion_with_json(self, prompt):
+        # The payload is the block between the first two blank lines: a
+        # "METHOD /path" line for single routes, JSON otherwise
+        block = prompt.split("\n\n")[1]
+        if prompt.startswith("Generate a detailed OpenAPI"):
+            method, _, path = block.partition(" ")
+            response = self._api_spec({"method": method, "path": path})
+        elif prompt.startswith("Analyze the following"):
+            response = dict(INSIGHTS)
+        else:
+            payload = json.loads(block)
+            response = self._batch(payload, "insights" in prompt.split("\n\n")[-1])
+
+        prompt_tokens = estimate_tokens(prompt)
+        completion_tokens = estimate_tokens(json.dumps(response))
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + self.jitter * self._rng.random()
+        time.sleep(delay + self.per_token_latency * (prompt_tokens + completion_tokens))
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        return response, usage
+
+    @staticmethod
+    def _api_spec(payload):
+        method = payload["method"].lower()
+        path = _normalize_path(payload["path"])
+        return {"paths": {path: {method: _operation(method, path)}}}
+
+    @staticmethod
+    def _batch(routes, include_insights):
+        response = {}
+        for route in routes:
+            entry = {"operation": _operation(route["method"].lower(), route["path"])}
+            if include_insights:
+                entry["insights"] = dict(INSIGHTS)
+            response[route["id"]] = entry
+        return response
@@ -0,0 +1,130 @@
+import os
+import random
+
+FLASK_HEADER = """from flask import Flask, jsonify, request
+
+app = Flask(__name__)
+"""
+
+FLASK_ROUTE = """
+
+@app.route("/api/{module}/{name}/<int:item_id>", methods=["GET", "POST"])
+def {name}_handler(item_id):
+    payload = request.get_json(silent=True) or {{}}
+    result = {{"id": item_id, "module": "{module}", "payload": payload}}
+    if item_id % 2:
+        result["odd"] = True
+    return jsonify(result)
+"""
+
+FASTAPI_HEADER = """from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+app = FastAPI()
+"""
+
+FASTAPI_ROUTE = """
+
+class {Name}Item(BaseModel):
+    name: str
+    price: float
+    quantity: int = 1
+
+
+@app.get("/api/{module}/{name}/{{item_id}}")
+async def get_{name}(item_id: int, q: str = None):
+    if item_id < 0:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return {{"item_id": item_id, "q": q, "module": "{module}"}}
+
+
+@app.post("/api/{module}/{name}")
+async def create_{name}(item: {Name}Item):
+    return {{"total": item.price * item.quantity}}
+"""
+
+EXPRESS_HEADER = """const express = require('express');
+const app = express();
+app.use(express.json());
+"""
+
+EXPRESS_ROUTE = """
+app.get('/api/{module}/{name}/:id', (req, res) => {{
+  const id = parseInt(req.params.id, 10);
+  res.json({{ id, module: '{module}' }});
+}});
+
+app.post('/api/{module}/{name}', (req, res) => {{
+  res.status(201).json(req.body);
+}});
+"""
+
+PYTHON_FILLER = """
+
+def helper_{index}(values):
+    total = 0
+    for value in values:
+        if value % 3 == 0:
+            total += value * 2
+        else:
+            total -= value
+    return total
+"""
+
+JS_FILLER = """
+function helper{index}(values) {{
+  let total = 0;
+  for (const value of values) {{
+    total += value % 3 === 0 ? value * 2 : -value;
+  }}
+  return total;
+}}
+"""
+
+TEMPLATES = {
+    "flask": (".py", FLASK_HEADER, FLASK_ROUTE, PYTHON_FILLER),
+    "fastapi": (".py", FASTAPI_HEADER, FASTAPI_ROUTE, PYTHON_FILLER),
+    "express": (".js", EXPRESS_HEADER, EXPRESS_ROUTE, JS_FILLER),
+}
+
+
+def render_file(framework: str, module: str, routes: int, filler: int) -> str:
+    _, header, route, helper = TEMPLATES[framework]
+    parts = [header]
+    for index in range(routes):
+        name = f"r{index}"
+        parts.append(route.format(module=module, name=name, Name=name.title()))
+    for index in range(filler):
+        parts.append(helper.format(index=index))
+    return "".join(parts)
+
+
+def generate_repo(
+    root: str,
+    files: int,
+    frameworks=("flask", "fastapi"),
+    routes_per_file: int = 3,
+    filler_per_file: int = 10,
+    plain_ratio: float = 0.5,
+    seed: int = 0,
+) -> str:
+    # Writes a deterministic synthetic repository: a plain_ratio share of the
+    # files contain only helper code, the rest are route modules spread over
+    # nested packages
+    rng = random.Random(seed)
+    for index in range(files):
+        framework = frameworks[index % len(frameworks)]
+        extension = TEMPLATES[framework][0]
+        package = os.path.join(root, f"pkg{index % 50}", f"sub{index % 7}")
+        os.makedirs(package, exist_ok=True)
+        module = f"m{index}"
+        if rng.random() < plain_ratio:
+            helper = TEMPLATES[framework][3]
+            content = "".join(
+                helper.format(index=i) for i in range(filler_per_file + routes_per_file)
+            )
+        else:
+            content = render_file(framework, module, routes_per_file, filler_per_file)
+        with open(os.path.join(package, module + extension), "w") as f:
+            f.write(content)
+    return root
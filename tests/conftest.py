@@ -0,0 +1,18 @@
+import pytest
+
+
+@pytest.fixture
+def stub_llm(monkeypatch):
+    # Runs the analyzer offline: no caches, stores or search index, and
+    # provider answering every prompt in place of kaizen's LLMProvider
+    from backend import config
+    from backend.app import ai_engine
+
+    for name in ("LLM_CACHE_DIR", "SCAN_INDEX_PATH", "STORAGE_URL", "SEARCH_INDEX_DIR"):
+        monkeypatch.setattr(config, name, "")
+
+    def install(provider):
+        monkeypatch.setattr(ai_engine, "LLMProvider", lambda: provider)
+        return provider
+
+    return install
@@ -0,0 +1,57 @@
+import asyncio
+import json
+
+from benchmarks.bench_context import generate_app
+from benchmarks.stub_llm import StubLLMProvider
+
+
+class NonJSONBatchProvider(StubLLMProvider):
+    # Like kaizen's provider, fails to parse a batched reply that is not JSON
+    def __init__(self):
+        super().__init__()
+        self.batch_calls = 0
+
+    def chat_completion_with_json(self, prompt):
+        if prompt.startswith("Generate detailed OpenAPI"):
+            self.batch_calls += 1
+            return json.loads("Sorry, here are the operations you asked for:")
+        return super().chat_completion_with_json(prompt)
+
+
+def test_generate_batch_returns_nothing_on_non_json_reply(stub_llm):
+    from backend.app.ai_engine import AIEngine
+
+    provider = stub_llm(NonJSONBatchProvider())
+    engine = AIEngine()
+    routes = [
+        {"id": "r0", "method": "GET", "path": "/items", "content": "def a(): ..."},
+        {"id": "r1", "method": "POST", "path": "/items", "content": "def b(): ..."},
+    ]
+    results, usage = engine.generate_batch(routes)
+
+    assert results == {}
+    assert usage["total_tokens"] == 0
+    assert provider.batch_calls == 1
+
+
+def test_routes_fall_back_to_single_calls_on_non_json_batch(stub_llm, tmp_path):
+    from backend.app.analyze_repo import CodebaseAnalyzer
+
+    provider = stub_llm(NonJSONBatchProvider())
+    generate_app(str(tmp_path), 2, 2)
+    analyzer = CodebaseAnalyzer(
+        str(tmp_path), batch_token_budget=100_000, static_schemas=False
+    )
+    spec = asyncio.run(analyzer.analyze_in_phases())
+
+    operations = [
+        operation
+        for methods in spec["paths"].values()
+        for operation in methods.values()
+    ]
+    assert operations
+    assert provider.batch_calls > 0
+    assert all(
+        operation.get("x-enrichment") not in ("pending", "failed")
+        for operation in operations
+    )
@@ -0,0 +1,102 @@
+import asyncio
+import os
+import subprocess
+
+from backend.helpers.schema_extractor import referenced_schemas
+from benchmarks.bench_context import generate_app
+from benchmarks.stub_llm import StubLLMProvider
+
+
+class FailingProvider(StubLLMProvider):
+    # Errors out on every prompt about the given path
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+
+    def chat_completion_with_json(self, prompt):
+        if self.path in prompt:
+            raise RuntimeError("model unavailable")
+        return super().chat_completion_with_json(prompt)
+
+
+def enrichment(spec):
+    return {
+        (path, method): operation.get("x-enrichment")
+        for path, methods in spec["paths"].items()
+        for method, operation in methods.items()
+    }
+
+
+def commit(root, message):
+    for args in (
+        ["add", "--all", "."],
+        ["-c", "user.name=test", "-c", "user.email=test@example.com"]
+        + ["commit", "-q", "-m", message],
+    ):
+        subprocess.run(["git", *args], cwd=root, check=True)
+
+
+def git_repo(root):
+    generate_app(root, 2, 2)
+    subprocess.run(["git", "init", "-q"], cwd=root, check=True)
+    commit(root, "app")
+
+
+def test_failed_unit_is_marked_and_the_rest_enriched(stub_llm, tmp_path):
+    from backend.app.analyze_repo import CodebaseAnalyzer
+
+    stub_llm(FailingProvider("/resources1"))
+    generate_app(str(tmp_path), 2, 2)
+    analyzer = CodebaseAnalyzer(str(tmp_path), static_schemas=False)
+    spec = asyncio.run(analyzer.analyze_in_phases())
+
+    states = enrichment(spec)
+    assert states
+    for (path, _), state in states.items():
+        assert state == ("failed" if path.startswith("/resources1") else None)
+
+
+def test_update_requeues_incomplete_operations_of_unchanged_files(stub_llm, tmp_path):
+    from backend.app.analyze_repo import CodebaseAnalyzer
+
+    git_repo(str(tmp_path))
+    stub_llm(FailingProvider("/resources1"))
+    previous = asyncio.run(
+        CodebaseAnalyzer(str(tmp_path), static_schemas=False).analyze_in_phases()
+    )
+    assert "failed" in enrichment(previous).values()
+
+    stub_llm(StubLLMProvider())
+    spec = CodebaseAnalyzer(str(tmp_path), static_schemas=False).analyze_changes(
+        previous
+    )
+
+    assert set(enrichment(spec)) == set(enrichment(previous))
+    assert set(enrichment(spec).values()) == {None}
+
+
+def test_update_rebuilds_components_from_changed_models(stub_llm, tmp_path):
+    from backend.app.analyze_repo import CodebaseAnalyzer
+
+    root = str(tmp_path)
+    git_repo(root)
+    stub_llm(StubLLMProvider())
+    previous = CodebaseAnalyzer(root).analyze()
+    assert {"Address0", "Resource1"} <= set(previous["components"]["schemas"])
+
+    models = os.path.join(root, "app", "models.py")
+    with open(models) as f:
+        source = f.read()
+    with open(models, "w") as f:
+        f.write(
+            source.replace("    city: str\n", "    city: str\n    country: str\n", 1)
+        )
+    os.remove(os.path.join(root, "app", "routers", "r1.py"))
+    commit(root, "models")
+
+    spec = CodebaseAnalyzer(root).analyze_changes(previous)
+
+    schemas = spec["components"]["schemas"]
+    assert "country" in schemas["Address0"]["properties"]
+    assert "Resource1" not in schemas and "Address1" not in schemas
+    assert set(schemas) == referenced_schemas(spec["paths"], schemas)
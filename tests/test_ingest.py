@@ -0,0 +1,38 @@
+from backend.storage import ingest
+from backend.storage.sqlite_store import SQLiteStore
+
+SPEC = {"paths": {}}
+
+
+def test_unchanged_files_are_not_chunked_again(tmp_path, monkeypatch):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "a.py").write_text("def a():\n    return 1\n")
+    (repo / "b.py").write_text("def b():\n    return 2\n")
+    store = SQLiteStore(str(tmp_path / "store.db"))
+    store.create_schema()
+
+    chunked = []
+
+    def chunk_spans(code, language):
+        chunked.append(code)
+        return []
+
+    monkeypatch.setattr(ingest, "chunk_spans", chunk_spans)
+    ingest.persist_analysis(store, str(repo), str(repo), SPEC)
+    assert len(chunked) == 2
+
+    chunked.clear()
+    ingest.persist_analysis(store, str(repo), str(repo), SPEC)
+    assert chunked == []
+
+    (repo / "b.py").write_text("def b():\n    return 3\n")
+    ingest.persist_analysis(store, str(repo), str(repo), SPEC)
+    assert chunked == ["def b():\n    return 3\n"]
+    # One module node per file, each still carrying its digest
+    rows = store._query(
+        "SELECT COUNT(*) FROM syntax_nodes JOIN node_properties "
+        "ON node_properties.node_id = syntax_nodes.node_id "
+        "WHERE property_name = 'sha256'"
+    )
+    assert rows == [(2,)]
@@ -0,0 +1,38 @@
+import threading
+
+import pytest
+
+from backend.app.jobs import CANCELLED, SUCCEEDED, JobCancelled, JobManager
+
+
+def test_job_cancelled_before_it_starts_fails_its_future():
+    manager = JobManager(max_workers=1)
+    started, release = threading.Event(), threading.Event()
+
+    def blocking(job):
+        started.set()
+        release.wait(5)
+        return "first"
+
+    first = manager.submit("test", blocking)
+    started.wait(5)
+    # As when cancel() comes after a worker took the job but before it ran:
+    # the event is set and the future was not cancelled
+    second = manager.submit("test", lambda job: "second")
+    second.cancel_event.set()
+    release.set()
+
+    assert first.future.result(5) == "first"
+    assert first.status == SUCCEEDED
+    with pytest.raises(JobCancelled):
+        second.future.result(5)
+    assert second.status == CANCELLED
+    assert second.finished_at is not None
+
+
+def test_submitted_job_has_its_future():
+    manager = JobManager(max_workers=1)
+    job = manager.submit("test", lambda job: "done")
+
+    assert manager.get(job.id).future is job.future
+    assert job.future.result(5) == "done"
@@ -0,0 +1,46 @@
+import os
+import subprocess
+
+from backend.app.analyze_repo import SOURCE_PATTERNS
+from backend.app.repo_cache import RepoMirrorCache
+from backend.helpers.file_walker import IgnoreFilter
+
+FILES = {
+    ".gitignore": "generated/\n",
+    "app.py": "print('app')\n",
+    "generated/client.py": "print('generated')\n",
+    "pkg/.gitignore": "vendored/\n",
+    "pkg/views.py": "print('views')\n",
+    "pkg/vendored/lib.py": "print('vendored')\n",
+}
+
+
+def source_repo(root):
+    for name, content in FILES.items():
+        path = os.path.join(root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+    for args in (
+        ["init", "-q"],
+        ["add", "--force", "."],
+        ["-c", "user.name=test", "-c", "user.email=test@example.com"]
+        + ["commit", "-q", "-m", "app"],
+    ):
+        subprocess.run(["git", *args], cwd=root, check=True)
+
+
+def test_sparse_checkout_keeps_gitignore_rules(tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+    source_repo(str(source))
+    cache = RepoMirrorCache(root=str(tmp_path / "cache"))
+
+    with cache.checkout(f"file://{source}", sparse_patterns=SOURCE_PATTERNS) as tree:
+        assert os.path.isfile(os.path.join(tree, "pkg", ".gitignore"))
+        walked = [
+            os.path.relpath(path, tree).replace(os.sep, "/")
+            for path in IgnoreFilter(tree).walk([".py"])
+        ]
+
+    assert walked == ["app.py", "pkg/views.py"]
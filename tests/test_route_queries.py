@@ -0,0 +1,93 @@
+import os
+
+import pytest
+
+from backend.helpers.identify_apis import analyze_directory
+from backend.helpers.route_queries import extract_routes, get_query
+
+SAMPLE_REPOS = os.path.join(os.path.dirname(__file__), "..", "sample_repos")
+
+pytestmark = pytest.mark.skipif(
+    any(get_query(language) is None for language in ("python", "javascript", "tsx")),
+    reason="tree-sitter grammars are not installed",
+)
+
+
+def sample_routes(name):
+    results = analyze_directory(os.path.join(SAMPLE_REPOS, name))
+    ((framework, routes),) = [
+        (
+            result["framework"],
+            [(route["method"], route["path"]) for route in result["routes"]],
+        )
+        for result in results.values()
+    ]
+    return framework, routes
+
+
+@pytest.mark.parametrize(
+    "name, framework, routes",
+    [
+        (
+            "fastapi_app",
+            "fastapi",
+            [
+                ("get", "/api/items/{item_id}"),
+                ("post", "/api/items"),
+                ("get", "/api/calculate"),
+            ],
+        ),
+        (
+            "flask_app",
+            "flask",
+            [
+                ("get", "/api/hello"),
+                ("post", "/api/echo"),
+                ("get", "/api/users/<int:user_id>"),
+            ],
+        ),
+        (
+            "express_app",
+            "express",
+            [
+                ("get", "/api/greet"),
+                ("post", "/api/calculate"),
+                ("get", "/api/users/:id"),
+            ],
+        ),
+        (
+            "typescript_app",
+            "react",
+            [
+                ("get", "http://api.example.com/api/greet"),
+                ("get", "http://api.example.com/api/users/1"),
+                ("post", "http://api.example.com/api/calculate"),
+            ],
+        ),
+    ],
+)
+def test_sample_repos(name, framework, routes):
+    assert sample_routes(name) == (framework, routes)
+
+
+@pytest.mark.parametrize(
+    "code, language",
+    [
+        ('print("hello")\n', "python"),
+        ('const express = require("express");\n', "javascript"),
+        ('const id = map.get("key");\n', "typescript"),
+    ],
+)
+def test_calls_failing_predicates_are_not_routes(code, language):
+    assert extract_routes(code, language) == []
+
+
+def test_calls_inside_jsx():
+    code = (
+        "export const Button = () => (\n"
+        '  <button onClick={() => fetch("/api/items")}>Load</button>\n'
+        ");\n"
+    )
+    assert [
+        (route["method"], route["path"]) for route in extract_routes(code, "tsx")
+    ] == [("get", "/api/items")]
@@ -0,0 +1,91 @@
+import textwrap
+
+from backend.helpers.schema_extractor import SchemaExtractor
+from backend.helpers.symbol_index import SymbolIndex
+
+MODULE = """
+from fastapi import APIRouter, File, Form, UploadFile
+from pydantic import BaseModel
+
+router = APIRouter()
+
+
+class Item(BaseModel):
+    name: str
+"""
+
+
+def operation(tmp_path, handler):
+    handler = textwrap.dedent(handler).strip()
+    file_path = tmp_path / "api.py"
+    file_path.write_text(MODULE + "\n\n" + handler + "\n")
+    decorator = handler.splitlines()[0]
+    method, route = decorator.split(".", 1)[1].split('("', 1)
+    route_info = {
+        "method": method.upper(),
+        "route": route.split('"', 1)[0],
+        "content": handler,
+    }
+    extractor = SchemaExtractor(SymbolIndex(str(tmp_path), [str(file_path)]))
+    return extractor.operation(str(file_path), route_info)
+
+
+def test_json_body(tmp_path):
+    result = operation(
+        tmp_path,
+        """
+        @router.post("/items")
+        def create_item(item: Item) -> Item:
+            return item
+        """,
+    )
+    assert result["typed"]
+    assert result["operation"]["requestBody"] == {
+        "required": True,
+        "content": {
+            "application/json": {"schema": {"$ref": "#/components/schemas/Item"}}
+        },
+    }
+
+
+def test_form_fields(tmp_path):
+    result = operation(
+        tmp_path,
+        """
+        @router.post("/login")
+        def login(username: str = Form(...), password: str = Form(...)) -> dict:
+            return {}
+        """,
+    )
+    assert result["operation"]["requestBody"] == {
+        "required": True,
+        "content": {
+            "application/x-www-form-urlencoded": {
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "username": {"type": "string"},
+                        "password": {"type": "string"},
+                    },
+                    "required": ["username", "password"],
+                }
+            }
+        },
+    }
+
+
+def test_file_upload(tmp_path):
+    result = operation(
+        tmp_path,
+        """
+        @router.post("/upload")
+        def upload(file: UploadFile, note: str = Form("")) -> dict:
+            return {}
+        """,
+    )
+    content = result["operation"]["requestBody"]["content"]
+    assert list(content) == ["multipart/form-data"]
+    assert content["multipart/form-data"]["schema"]["properties"]["file"] == {
+        "type": "string",
+        "format": "binary",
+    }
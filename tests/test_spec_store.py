@@ -0,0 +1,70 @@
+import pytest
+
+from backend.app.spec_store import SpecStore, VersionConflict, flatten, unflatten
+
+
+def spec(paths, components):
+    return {
+        "openapi": "3.0.0",
+        "info": {"title": "Generated API", "version": "1.0.1"},
+        "paths": paths,
+        "components": components,
+    }
+
+
+def test_flatten_round_trips_empty_containers():
+    for components in ({}, {"schemas": {}}):
+        original = spec({}, components)
+        assert unflatten(flatten(original).items()) == original
+
+
+def test_store_round_trips_empty_containers(tmp_path):
+    store = SpecStore(str(tmp_path / "specs.sqlite3"))
+    empty = spec({}, {})
+    operation = {"summary": "List items", "responses": {}}
+    full = spec({"/items": {"get": operation}}, {"schemas": {"Item": {}}})
+
+    assert store.put("repo", empty) == 1
+    assert store.put("repo", full) == 2
+    assert store.put("repo", empty) == 3
+    assert store.get("repo") == empty
+    assert store.get("repo", 1) == empty
+    assert store.get("repo", 2) == full
+
+
+def stamp(spec, version):
+    spec["info"]["version"] = f"1.0.{version}"
+
+
+def test_put_stamps_the_allocated_version(tmp_path):
+    store = SpecStore(str(tmp_path / "specs.sqlite3"))
+    for expected in (1, 2):
+        saved = spec({}, {})
+        assert store.put("repo", saved, stamp=stamp) == expected
+        assert store.get("repo")["info"]["version"] == f"1.0.{expected}"
+
+
+def test_amend_rewrites_the_head_in_place(tmp_path):
+    store = SpecStore(str(tmp_path / "specs.sqlite3"))
+    store.put("repo", spec({}, {}), stamp=stamp)
+    skeleton = spec({"/items": {"get": {"x-enrichment": "pending"}}}, {})
+    version = store.put("repo", skeleton, stamp=stamp)
+    enriched = spec({"/items": {"get": {"summary": "List items"}}}, {})
+
+    assert store.amend("repo", enriched, version, stamp) == version
+    assert [entry["version"] for entry in store.versions("repo")] == [1, 2]
+    assert store.get("repo") == enriched
+    assert enriched["info"]["version"] == "1.0.2"
+    # Against version 1 only the enriched operation is new; the skeleton
+    # left no trace
+    changes = {tuple(change["key"]): change for change in store.diff("repo", 1)}
+    assert changes[("paths", "/items", "get")]["before"] is None
+    assert changes[("paths", "/items", "get")]["after"] == {"summary": "List items"}
+
+
+def test_amend_refuses_a_moved_head(tmp_path):
+    store = SpecStore(str(tmp_path / "specs.sqlite3"))
+    version = store.put("repo", spec({}, {}), stamp=stamp)
+    store.put("repo", spec({}, {}), stamp=stamp)
+    with pytest.raises(VersionConflict):
+        store.amend("repo", spec({}, {}), version, stamp)